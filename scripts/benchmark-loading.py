@@ -0,0 +1,79 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Helper script to time loading a large, synthetic election.json file.
+
+Usage: python scripts/benchmark-loading.py [--areas N] [--contests N]
+         [--choices N] [--repeat N]
+
+The synthetic election is based on sampledata/test-minimal, scaled up
+to the given numbers of areas, contests, and choices per contest.
+Prints the best and median load times to stdout.
+"""
+
+import argparse
+from datetime import datetime
+from pathlib import Path
+import statistics
+from tempfile import TemporaryDirectory
+import time
+
+import orr.dataloading as dataloading
+import orr.testing.synthetic as synthetic
+
+
+def time_load(input_dir, repeat):
+    """
+    Return a list of the times (in seconds) taken to load the context.
+    """
+    build_time = datetime.now()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        dataloading.load_context(input_dir, build_time=build_time)
+        times.append(time.perf_counter() - start)
+
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='time loading a synthetic election.json')
+    parser.add_argument('--areas', metavar='N', type=int, default=20000)
+    parser.add_argument('--contests', metavar='N', type=int, default=2000)
+    parser.add_argument('--choices', metavar='N', type=int, default=40,
+                        help='the number of choices per contest')
+    parser.add_argument('--repeat', metavar='N', type=int, default=5)
+    ns = parser.parse_args()
+
+    data = synthetic.make_election_data(ns.areas, contest_count=ns.contests,
+                                        choice_count=ns.choices)
+
+    with TemporaryDirectory() as temp_dir:
+        input_dir = Path(temp_dir)
+        synthetic.write_election_json(input_dir, data)
+        times = time_load(input_dir, repeat=ns.repeat)
+
+    print(f'areas={ns.areas} contests={ns.contests} choices/contest={ns.choices}')
+    print(f'best: {min(times):.3f}s  median: {statistics.median(times):.3f}s')
+
+
+if __name__ == '__main__':
+    main()
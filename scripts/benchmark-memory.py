@@ -0,0 +1,143 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Helper script to measure the memory used by the data model objects
+of a large, synthetic election.json file.
+
+Usage: python scripts/benchmark-memory.py [--areas N] [--contests N]
+         [--choices N]
+
+The synthetic election is the same as for benchmark-loading.py.  The
+script uses tracemalloc to report:
+
+  * the memory held by the loaded context as a whole, and
+  * for each data model class, the bytes per object taken by the
+    object itself (i.e. not counting its attribute values, which are
+    shared with the loaded objects).
+
+To compare two versions of the data model, run the script against each.
+"""
+
+import argparse
+import copy
+import gc
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import tracemalloc
+
+import orr.dataloading as dataloading
+import orr.datamodel as datamodel
+import orr.testing.synthetic as synthetic
+
+
+MODEL_CLASSES = [
+    datamodel.Area,
+    datamodel.ReportingGroup,
+    datamodel.Choice,
+    datamodel.Candidate,
+    datamodel.Header,
+    datamodel.ResultStatType,
+    datamodel.ResultStyle,
+    datamodel.Contest,
+]
+
+
+def measure_load(input_dir):
+    """
+    Load the context under tracemalloc.
+
+    Returns: (context, total_bytes)
+    """
+    gc.collect()
+    tracemalloc.start()
+    start_bytes = tracemalloc.get_traced_memory()[0]
+    context = dataloading.load_context(input_dir, build_time=datetime.now())
+    gc.collect()
+    total_bytes = tracemalloc.get_traced_memory()[0] - start_bytes
+    tracemalloc.stop()
+
+    return context, total_bytes
+
+
+def get_objects_by_class():
+    """
+    Return a dict mapping each class in MODEL_CLASSES to its live instances.
+    """
+    objects_by_class = {cls: [] for cls in MODEL_CLASSES}
+    for obj in gc.get_objects():
+        objects = objects_by_class.get(type(obj))
+        if objects is not None:
+            objects.append(obj)
+
+    return objects_by_class
+
+
+def measure_bytes_per_object(objects):
+    """
+    Return the average number of bytes a shallow copy of each object
+    takes, as measured by tracemalloc.
+    """
+    # Create the list to hold the copies ahead of time, so it isn't
+    # counted.
+    copies = [None] * len(objects)
+    gc.collect()
+    tracemalloc.start()
+    start_bytes = tracemalloc.get_traced_memory()[0]
+    for i, obj in enumerate(objects):
+        copies[i] = copy.copy(obj)
+    total_bytes = tracemalloc.get_traced_memory()[0] - start_bytes
+    tracemalloc.stop()
+
+    return total_bytes / len(objects)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='measure the memory of the data model')
+    parser.add_argument('--areas', metavar='N', type=int, default=20000)
+    parser.add_argument('--contests', metavar='N', type=int, default=2000)
+    parser.add_argument('--choices', metavar='N', type=int, default=40,
+                        help='the number of choices per contest')
+    ns = parser.parse_args()
+
+    data = synthetic.make_election_data(ns.areas, contest_count=ns.contests,
+                                        choice_count=ns.choices)
+
+    with TemporaryDirectory() as temp_dir:
+        input_dir = Path(temp_dir)
+        synthetic.write_election_json(input_dir, data)
+        del data
+        context, total_bytes = measure_load(input_dir)
+
+    print(f'areas={ns.areas} contests={ns.contests} choices/contest={ns.choices}')
+    print(f'loaded context: {total_bytes / 2**20:.1f} MiB')
+
+    objects_by_class = get_objects_by_class()
+    for cls, objects in objects_by_class.items():
+        if not objects:
+            continue
+        bytes_per_object = measure_bytes_per_object(objects)
+        print(f'{cls.__name__:>15}: {len(objects):>8} objects, '
+              f'{bytes_per_object:6.1f} bytes/object')
+
+
+if __name__ == '__main__':
+    main()
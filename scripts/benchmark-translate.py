@@ -0,0 +1,106 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Helper script to time the translate() filter on the i18n text of a
+large, synthetic election.json file.
+
+Usage: python scripts/benchmark-translate.py [--areas N] [--contests N]
+         [--choices N] [--repeat N]
+
+The synthetic election is the same as for benchmark-loading.py.  Each
+repetition translates the title, designation, and party of every
+candidate into each of the election's languages, and the script prints
+the best and median number of translate() calls per second.
+"""
+
+import argparse
+from datetime import datetime
+from pathlib import Path
+import statistics
+from tempfile import TemporaryDirectory
+import time
+
+from jinja2.utils import Namespace
+
+import orr.dataloading as dataloading
+import orr.templating as templating
+import orr.testing.synthetic as synthetic
+
+
+def get_i18n_values(election):
+    values = []
+    for contest in election.contests:
+        for choice in contest.choices:
+            values.extend((choice.ballot_title, choice.ballot_designation,
+                           choice.candidate_party))
+
+    return values
+
+
+def time_translate(context, values, languages, repeat):
+    """
+    Return a list of the translate() calls per second, one for each
+    repetition.
+    """
+    # Call the function the contextfilter decorator wraps.
+    translate = templating.translate
+    options = context['options']
+    rates = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for lang in languages:
+            options.lang = lang
+            for value in values:
+                translate(context, value)
+        elapsed = time.perf_counter() - start
+        rates.append(len(languages) * len(values) / elapsed)
+
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description='time translating i18n text')
+    parser.add_argument('--areas', metavar='N', type=int, default=2000)
+    parser.add_argument('--contests', metavar='N', type=int, default=2000)
+    parser.add_argument('--choices', metavar='N', type=int, default=40,
+                        help='the number of choices per contest')
+    parser.add_argument('--repeat', metavar='N', type=int, default=5)
+    ns = parser.parse_args()
+
+    data = synthetic.make_election_data(ns.areas, contest_count=ns.contests,
+                                        choice_count=ns.choices)
+
+    with TemporaryDirectory() as temp_dir:
+        input_dir = Path(temp_dir)
+        synthetic.write_election_json(input_dir, data)
+        context = dataloading.load_context(input_dir, build_time=datetime.now())
+
+    context['options'] = Namespace(lang=templating.ENGLISH_LANG)
+    values = get_i18n_values(context['election'])
+    rates = time_translate(context, values, languages=context['languages'],
+                           repeat=ns.repeat)
+
+    print(f'values={len(values)} languages={len(context["languages"])}')
+    print(f'best: {max(rates):,.0f} calls/s  median: {statistics.median(rates):,.0f} calls/s')
+
+
+if __name__ == '__main__':
+    main()
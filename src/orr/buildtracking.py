@@ -0,0 +1,630 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Support for incremental rebuilds of the output files.
+
+While a BuildTracker is active, each output file rendered (by a template
+or by a function like create_pdf()) gets an OutputRecord of the inputs
+it used:
+
+  * the templates rendered, including those it extends or includes,
+  * the results of each contest it read ("results:<contest id>"),
+  * the status of each contest it read ("status:<contest id>"),
+  * each translation it looked up ("translation:<key>"),
+  * the rest of election.json ("election"), and
+  * the build time, if one of its templates refers to build_time.
+
+The contest inputs are recorded by the data model as they are accessed
+(see record_input()).  The template and build time inputs are found by
+parsing the templates.
+
+At the end of the build, the records and a fingerprint of each input
+are written to a manifest.  The next build with the same manifest
+carries each output forward (copying it from the previous output
+directory, if different) instead of rendering it again, provided its
+inputs' fingerprints, its template and language, and those of any
+outputs it created (e.g. with subtemplate()) are unchanged.  The
+parameters of a subtemplate's output also include a hash of the option
+values, since templates use them to pass values (e.g. computed from a
+contest's results) to the subtemplates they render.
+
+This assumes an output's contents are determined by those inputs,
+which holds as long as the templates get their data from the context
+and the data model.
+"""
+
+from contextlib import contextmanager
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import shutil
+
+import jinja2
+import jinja2.meta
+
+# This module and orr.utils import each other.  Python 3.6 supports
+# circular imports only in the "from package import module" form.
+from orr import utils
+
+
+_log = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = 'build-manifest.json'
+# Increment this whenever the manifest format or the meaning of the
+# fingerprints changes.
+MANIFEST_FORMAT_VERSION = 1
+
+# The kinds of inputs.
+INPUT_BUILD_TIME = 'build_time'
+INPUT_ELECTION = 'election'
+INPUT_RESULTS = 'results'
+INPUT_STATUS = 'status'
+INPUT_TEMPLATE = 'template'
+INPUT_TRANSLATION = 'translation'
+
+# The context variable whose value is the build time.
+BUILD_TIME_NAME = 'build_time'
+
+# The active BuildTracker object, or None if builds aren't being tracked.
+# This is a module global (rather than e.g. an option value) so the
+# data model can record the inputs it's asked for.
+_tracker = None
+
+
+def get_tracker():
+    """
+    Return the active BuildTracker object, or None.
+    """
+    return _tracker
+
+
+@contextmanager
+def tracking(tracker):
+    """
+    Return a context manager that makes a BuildTracker the active one.
+    """
+    global _tracker
+    _tracker = tracker
+    try:
+        yield tracker
+    finally:
+        _tracker = None
+
+
+@contextmanager
+def capturing_inputs():
+    """
+    Return a context manager that collects the keys of the inputs
+    recorded by the active BuildTracker object.
+
+    The context manager's value is a set of input keys, or None if there
+    is no active BuildTracker object.
+    """
+    if _tracker is None:
+        yield None
+        return
+
+    with _tracker.capturing_inputs() as keys:
+        yield keys
+
+
+def record_input_keys(keys):
+    """
+    Record that the output being rendered, if any, used the inputs with
+    the given keys (e.g. as returned by capturing_inputs()).
+    """
+    if _tracker is not None:
+        for key in keys:
+            _tracker.record_input_key(key)
+
+
+def record_input(kind, name=None):
+    """
+    Record that the output being rendered, if any, used an input.
+
+    Args:
+      kind: one of the INPUT_* values.
+      name: the name of the input among those of its kind (e.g. a
+        contest id), or None if there's only one.
+    """
+    if _tracker is not None:
+        _tracker.record_input(kind, name)
+
+
+def make_input_key(kind, name=None):
+    if name is None:
+        return kind
+
+    return f'{kind}:{name}'
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode(utils.UTF8_ENCODING)).hexdigest()
+
+
+def hash_json(data):
+    return hash_text(json.dumps(data, sort_keys=True, ensure_ascii=False, default=str))
+
+
+class OutputRecord:
+
+    """
+    The inputs and other outputs of an output file.
+
+    Instance attributes:
+
+      rel_path: the path to the output file relative to the output
+        directory, as a string.
+      params: a string describing the parameters the output was created
+        with (e.g. the template and language).
+      inputs: the set of keys of the inputs used (see make_input_key()).
+      children: the relative paths of the other files created while
+        creating this one, as a list of strings.
+      volatile: whether the output should be created again in every
+        build (e.g. because it depends on something not recorded).
+    """
+
+    def __init__(self, rel_path, params, inputs=None, children=None, volatile=False):
+        if inputs is None:
+            inputs = set()
+        if children is None:
+            children = []
+
+        self.rel_path = rel_path
+        self.params = params
+        self.inputs = set(inputs)
+        self.children = list(children)
+        self.volatile = volatile
+
+    def __repr__(self):
+        return (f'<OutputRecord {self.rel_path!r}: {len(self.inputs)} inputs, '
+                f'{len(self.children)} children>')
+
+    @classmethod
+    def from_json(cls, rel_path, data):
+        return cls(rel_path, params=data['params'], inputs=data['inputs'],
+                   children=data['children'], volatile=data['volatile'])
+
+    def to_json(self):
+        return dict(params=self.params, inputs=sorted(self.inputs), children=self.children,
+                    volatile=self.volatile)
+
+    def add_child(self, rel_path):
+        if rel_path not in self.children:
+            self.children.append(rel_path)
+
+
+class BuildTracker:
+
+    """
+    Records the inputs of each output file during a build, and decides
+    which outputs of the previous build can be carried forward.
+
+    Instance attributes:
+
+      manifest_path: the path to the manifest file, as a Path object.
+      output_dir: the output directory of this build, as a Path object.
+      version: the ORR version, as a string.
+      rebuilt: the relative paths of the outputs created in this build.
+      carried: the relative paths of the outputs carried forward from the
+        previous build.
+    """
+
+    def __init__(self, manifest_path, output_dir, env, context, election_paths, version):
+        """
+        Args:
+          env: the Jinja2 Environment object.
+          context: the top-level context dict the templates are rendered with.
+          election_paths: the paths to the election.json files the
+            election was loaded from.
+        """
+        self.manifest_path = Path(manifest_path)
+        self.output_dir = Path(output_dir).resolve()
+        self.version = version
+
+        self.rebuilt = []
+        self.carried = []
+
+        self._env = env
+        self._context = context
+        self._election_paths = [Path(path) for path in election_paths]
+
+        # The records of this build, as a dict mapping relative path to
+        # OutputRecord object.
+        self._records = {}
+        # The records of the outputs being created, innermost last.
+        self._stack = []
+        # Whether recording inputs is suspended (e.g. while computing
+        # fingerprints).
+        self._suspend_count = 0
+        # The sets of input keys being collected (see capturing_inputs()).
+        self._captures = []
+        # A dict mapping input key to fingerprint, for this build.
+        self._fingerprints = {}
+        # A dict mapping template name to the pair (input_keys, is_dynamic).
+        self._template_infos = {}
+        # A dict mapping relative path to whether the previous output
+        # and the outputs it created are unchanged.
+        self._unchanged = {}
+
+        self._previous_dir, self._previous_records, self._previous_fingerprints = (
+            self._load_manifest())
+
+    def __repr__(self):
+        return (f'<BuildTracker {self.output_dir}: rebuilt={len(self.rebuilt)}, '
+                f'carried={len(self.carried)}>')
+
+    def _get_generator(self):
+        """
+        Return a dict identifying the code generating the outputs.
+        """
+        # Include a hash of ORR's source files since the program version
+        # doesn't change with every change to e.g. the filters or model.
+        return dict(orr_version=self.version, source_hash=utils.get_package_source_hash(),
+                    jinja2_version=jinja2.__version__)
+
+    def _load_manifest(self):
+        """
+        Return the previous build's (output_dir, records, fingerprints),
+        or (None, {}, {}) if there's no usable manifest.
+        """
+        no_manifest = (None, {}, {})
+        try:
+            data = utils.read_json(self.manifest_path)
+        except FileNotFoundError:
+            return no_manifest
+        except Exception:
+            _log.warning(f'ignoring unreadable build manifest: {self.manifest_path}')
+            return no_manifest
+
+        if (data.get('format_version') != MANIFEST_FORMAT_VERSION or
+            data.get('generator') != self._get_generator()):
+            _log.info(f'ignoring build manifest from a different version: {self.manifest_path}')
+            return no_manifest
+
+        records = {rel_path: OutputRecord.from_json(rel_path, record_data)
+                   for rel_path, record_data in data['outputs'].items()}
+
+        return (Path(data['output_dir']), records, data['fingerprints'])
+
+    def write_manifest(self):
+        """
+        Write the manifest of this build.
+        """
+        records = self._records
+        input_keys = set()
+        for record in records.values():
+            input_keys.update(record.inputs)
+        fingerprints = {key: self.get_fingerprint(key) for key in sorted(input_keys)}
+
+        data = dict(
+            format_version=MANIFEST_FORMAT_VERSION,
+            generator=self._get_generator(),
+            output_dir=str(self.output_dir),
+            fingerprints=fingerprints,
+            outputs={rel_path: records[rel_path].to_json() for rel_path in sorted(records)},
+        )
+
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.manifest_path.with_name(f'{self.manifest_path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'w', encoding=utils.UTF8_ENCODING) as f:
+            json.dump(data, f, **utils.DEFAULT_JSON_DUMPS_ARGS)
+        os.replace(temp_path, self.manifest_path)
+
+        _log.debug(f'wrote build manifest: {self.manifest_path}')
+
+    @contextmanager
+    def suspended(self):
+        """
+        Return a context manager that stops recording inputs.
+        """
+        self._suspend_count += 1
+        try:
+            yield
+        finally:
+            self._suspend_count -= 1
+
+    #--- Recording ---
+
+    @contextmanager
+    def capturing_inputs(self):
+        """
+        Return a context manager that collects the keys of the inputs
+        recorded, as a set.
+        """
+        keys = set()
+        self._captures.append(keys)
+        try:
+            yield keys
+        finally:
+            self._captures.pop()
+
+    def record_input_key(self, key):
+        if self._suspend_count:
+            return
+        if self._stack:
+            self._stack[-1].inputs.add(key)
+        for keys in self._captures:
+            keys.add(key)
+
+    def record_input(self, kind, name=None):
+        self.record_input_key(make_input_key(kind, name))
+
+    def record_file(self, rel_path):
+        """
+        Record that the output being created also created a file that
+        isn't tracked separately.
+        """
+        if self._stack:
+            self._stack[-1].add_child(str(rel_path))
+
+    def record_hashed_file(self, rel_path):
+        """
+        Record that the output being created includes the hash of a file.
+        """
+        if not self._stack:
+            return
+
+        record = self._stack[-1]
+        if str(rel_path) not in record.children:
+            # Then the hashed file could change without this output's
+            # inputs changing.
+            record.volatile = True
+
+    def _get_template_info(self, template_name):
+        """
+        Return the pair (input_keys, is_dynamic) for a template, where
+        input_keys are the keys of the templates it consists of (itself
+        and the templates it extends, includes or imports), along with
+        the build time if any of them refer to it.  The value is_dynamic
+        is whether a template name couldn't be determined by parsing.
+        """
+        try:
+            return self._template_infos[template_name]
+        except KeyError:
+            pass
+
+        env = self._env
+        source = env.loader.get_source(env, template_name)[0]
+        ast = env.parse(source)
+
+        input_keys = {make_input_key(INPUT_TEMPLATE, template_name)}
+        if BUILD_TIME_NAME in jinja2.meta.find_undeclared_variables(ast):
+            input_keys.add(make_input_key(INPUT_BUILD_TIME))
+        is_dynamic = False
+        # Store a value first in case the templates refer to each other.
+        self._template_infos[template_name] = (input_keys, is_dynamic)
+
+        for name in jinja2.meta.find_referenced_templates(ast):
+            if name is None:
+                is_dynamic = True
+                continue
+            other_keys, other_dynamic = self._get_template_info(name)
+            input_keys |= other_keys
+            is_dynamic = is_dynamic or other_dynamic
+
+        info = (input_keys, is_dynamic)
+        self._template_infos[template_name] = info
+
+        return info
+
+    @contextmanager
+    def tracking_output(self, rel_path, params, template_name=None):
+        """
+        Return a context manager to use while creating an output, which
+        records the inputs used.
+
+        Args:
+          rel_path: the path to the output relative to the output directory.
+          params: the value returned by make_params() for the output.
+          template_name: the name of the template being rendered, if any.
+        """
+        rel_path = str(rel_path)
+        record = OutputRecord(rel_path, params=params)
+        record.inputs.add(make_input_key(INPUT_ELECTION))
+        if template_name is not None:
+            input_keys, is_dynamic = self._get_template_info(template_name)
+            record.inputs |= input_keys
+            record.volatile = is_dynamic
+
+        self._stack.append(record)
+        try:
+            yield record
+        finally:
+            self._stack.pop()
+
+        self._records[rel_path] = record
+        self.rebuilt.append(rel_path)
+
+    def make_params(self, **kwargs):
+        """
+        Return a string describing the parameters of an output, including
+        the current language.
+        """
+        params = dict(lang=self._env.globals['options'].lang)
+        params.update(kwargs)
+
+        return json.dumps(params, sort_keys=True, default=str)
+
+    #--- Fingerprints ---
+
+    def _compute_fingerprint(self, kind, name):
+        context = self._context
+        if kind == INPUT_TEMPLATE:
+            env = self._env
+            try:
+                source = env.loader.get_source(env, name)[0]
+            except jinja2.TemplateNotFound:
+                return None
+            return hash_text(source)
+
+        if kind == INPUT_BUILD_TIME:
+            return context[BUILD_TIME_NAME].isoformat()
+
+        if kind == INPUT_ELECTION:
+            # Translations are fingerprinted individually.
+            datas = []
+            for path in self._election_paths:
+                data = utils.read_json(path)
+                data.pop('translations', None)
+                datas.append(data)
+            return hash_json(datas)
+
+        if kind == INPUT_TRANSLATION:
+            return hash_json(context.get('translations', {}).get(name))
+
+        election = context['election']
+        contest = election.contests_by_id.get(name)
+        if contest is None:
+            return None
+        # The statuses are also needed to load the results (e.g. for the
+        # number of RCV rounds).
+        election.load_contest_statuses()
+
+        if kind == INPUT_STATUS:
+            return hash_json(contest.get_status())
+
+        if kind == INPUT_RESULTS:
+            return contest.get_results_fingerprint()
+
+        return None
+
+    def get_fingerprint(self, input_key):
+        """
+        Return the current fingerprint of an input, or None if the input
+        doesn't exist.
+        """
+        try:
+            return self._fingerprints[input_key]
+        except KeyError:
+            pass
+
+        kind, _, name = input_key.partition(':')
+        with self.suspended():
+            fingerprint = self._compute_fingerprint(kind, name)
+        self._fingerprints[input_key] = fingerprint
+
+        return fingerprint
+
+    #--- Carrying forward ---
+
+    def _get_previous_path(self, rel_path):
+        return self._previous_dir / rel_path
+
+    def _is_unchanged(self, rel_path):
+        """
+        Return whether a previous output and the outputs it created would
+        be the same if created again in this build.
+        """
+        try:
+            return self._unchanged[rel_path]
+        except KeyError:
+            pass
+
+        # Store a value first in case of a cycle.
+        self._unchanged[rel_path] = False
+        record = self._previous_records[rel_path]
+        is_unchanged = (
+            not record.volatile and
+            self._get_previous_path(rel_path).exists() and
+            all(self.get_fingerprint(key) == self._previous_fingerprints.get(key)
+                for key in sorted(record.inputs)) and
+            all(self._is_unchanged(child) if child in self._previous_records
+                else self._get_previous_path(child).exists()
+                for child in record.children)
+        )
+        self._unchanged[rel_path] = is_unchanged
+
+        return is_unchanged
+
+    def _carry_forward(self, rel_path):
+        """
+        Copy a previous output (and the files it created) to the output
+        directory, and add its record to this build.
+        """
+        if self._previous_dir != self.output_dir:
+            source_path = self._get_previous_path(rel_path)
+            target_path = self.output_dir / rel_path
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source_path, target_path)
+
+        record = self._previous_records.get(rel_path)
+        if record is None:
+            return
+
+        self._records[rel_path] = record
+        self.carried.append(rel_path)
+        _log.debug(f'carried forward unchanged output: {rel_path}')
+        for child in record.children:
+            self._carry_forward(child)
+
+    def reuse_output(self, rel_path, params):
+        """
+        Carry forward the previous build's output at a path if it's
+        unchanged, and return whether it was carried forward.
+
+        This should be called before creating an output, so the output
+        is also recorded as created by the output being created.
+        """
+        rel_path = str(rel_path)
+        self.record_file(rel_path)
+
+        record = self._previous_records.get(rel_path)
+        if record is None or record.params != params:
+            return False
+        if not self._is_unchanged(rel_path):
+            return False
+
+        self._carry_forward(rel_path)
+
+        return True
+
+    #--- Worker processes ---
+
+    def start_job(self):
+        """
+        Reset the records before a renderscheduler job in a worker
+        process, so get_job_records() returns only the job's records.
+        """
+        self._records = {}
+        self._stack = []
+        self._captures = []
+        self.rebuilt = []
+        self.carried = []
+
+    def get_job_records(self):
+        """
+        Return the records created in a worker process, in a form that
+        can be passed to add_job_records() in the main process.
+        """
+        records = {rel_path: record.to_json() for rel_path, record in self._records.items()}
+
+        return (records, self.rebuilt, self.carried)
+
+    def add_job_records(self, job_records):
+        records, rebuilt, carried = job_records
+        for rel_path, record_data in records.items():
+            self._records[rel_path] = OutputRecord.from_json(rel_path, record_data)
+        self.rebuilt.extend(rebuilt)
+        self.carried.extend(carried)
@@ -26,32 +26,48 @@ Contains functions to help configure ORR.
 from pathlib import Path
 
 import jinja2
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import FileSystemLoader
 from jinja2.utils import Namespace
 
+from orr.fragmentcache import FragmentCacheExtension
 import orr.templating as templating
+from orr.templatecache import TimedEnvironment
 import orr.utils as utils
 from orr.templating import ENGLISH_LANG
 from orr.utils import SHA256SUMS_FILENAME
 
 
-def create_jinja_env(output_dir, template_dirs=None, deterministic=None):
+def create_jinja_env(output_dir, template_dirs=None, deterministic=None,
+    bytecode_cache=None, fragment_cache=None):
     """
     Create and return the Jinja2 Environment object.
 
+    The environment's compile_timer attribute records the time spent
+    compiling templates (see templatecache.TimedEnvironment).
+
     Args:
       output_dir: a path-like object.
       deterministic: for deterministic PDF generation.  Defaults to False.
+      bytecode_cache: an optional Jinja2 bytecode cache to store the
+        compiled templates in (e.g. a templatecache.TemplateCache object).
+      fragment_cache: an optional fragmentcache.FragmentCache object to
+        store the blocks enclosed by the "cache" tag in.  Without one,
+        the tag simply renders its block.
     """
     if template_dirs is None:
         template_dirs = []
+    # Jinja2 2.10's FileSystemLoader.list_templates() (which the template
+    # and fragment caches use) supports only string search paths.
+    template_dirs = [str(template_dir) for template_dir in template_dirs]
 
-    env = Environment(
+    env = TimedEnvironment(
         loader=FileSystemLoader(template_dirs),
+        bytecode_cache=bytecode_cache,
         autoescape=jinja2.select_autoescape(['html', 'xml']),
         # Enable the expression-statement extension:
         # http://jinja.pocoo.org/docs/2.10/templates/#expression-statement
-        extensions=['jinja2.ext.do'],
+        # and the "cache" tag (see orr.fragmentcache).
+        extensions=['jinja2.ext.do', FragmentCacheExtension],
         # Remove excess whitespace with lstrip_blocks and trim_blocks.
         lstrip_blocks=True,
         trim_blocks=True,
@@ -68,6 +84,11 @@ def create_jinja_env(output_dir, template_dirs=None, deterministic=None):
     # Initialize with a default of English.
     options['lang'] = ENGLISH_LANG
     options['deterministic'] = deterministic
+    # The renderscheduler.RenderScheduler object to use to render
+    # subtemplates in parallel, or None to render them serially.
+    options['render_scheduler'] = None
+    # The fragmentcache.FragmentCache object to use for the "cache" tag.
+    options['fragment_cache'] = fragment_cache
 
     env.globals.update(options=options,
         create_pdf=templating.create_pdf,
@@ -27,16 +27,25 @@ The main function this module exposes is load_context().
 """
 
 from collections import OrderedDict
+import concurrent.futures
 from datetime import datetime
 import functools
 import itertools
 import logging
 from pathlib import Path
 
+import numpy as np
+
 import orr.datamodel as datamodel
+import orr.i18n as i18n
+import orr.rcvtabulation as rcvtabulation
+import orr.rollup as rollup
+import orr.sparseresults as sparseresults
+from orr.resultscache import get_source_key
 from orr.tsvio import TSVReader
 from orr.datamodel import (Candidate, Choice, Contest, Election,
-    Header, ResultStatType, ResultStyle, ResultsMapping, VotingGroup)
+    Header, ReportingGroupTable, ResultStatType, ResultStyle, ResultsMapping,
+    VotingGroup)
 import orr.utils as utils
 from orr.utils import truncate
 
@@ -55,8 +64,26 @@ CONTEST_STATUS_PATH = RESULTS_DIR / 'contest-status.json'
 # containing the detailed results for a contest.
 CONTEST_RESULTS_FILE_NAME_FORMAT = 'results-{}.tsv'
 
-
-def load_context(input_dir, build_time):
+# The format string for the name of the file in the results directory
+# containing the ballots for an RCV contest to tabulate (see the
+# orr.rcvtabulation module).
+CONTEST_BALLOTS_FILE_NAME_FORMAT = 'ballots-{}.tsv'
+
+# The definitions that the shards of a sharded input share, as tuples
+# (context key, kind, attr_names), where attr_names are the names of
+# the attributes that must be the same in each shard, or None if the
+# values themselves must be the same (see merge_shard_contexts()).
+SHARED_DEFINITIONS = [
+    ('result_stat_types_by_id', 'result stat type', ('heading', 'is_percent')),
+    ('voting_groups_by_id', 'voting group', ('heading', )),
+    ('result_styles_by_id', 'result style',
+     ('description', 'is_rcv', 'voting_groups', 'result_stat_types')),
+    ('translations', 'translation', None),
+]
+
+
+def load_context(input_dir, build_time, results_store=None, results_cache=None,
+    results_manager=None, snapshot_cache=None):
     """
     Read the input data, and return the context to use for Jinja2.
 
@@ -64,6 +91,15 @@ def load_context(input_dir, build_time):
       input_dir: the directory containing the input data, as a Path object.
       build_time: a datetime object representing the current build time,
         e.g. datetime.datetime.now().
+      results_store: how to store each contest's detailed results in
+        memory.  This should be one of the values in
+        datamodel.RESULTS_STORES.  Defaults to RESULTS_STORE_LIST.
+      results_cache: an optional resultscache.ResultsCache object to
+        use when loading contest results.
+      results_manager: an optional resultsmanager.ResultsManager object
+        to own the loaded contest results.
+      snapshot_cache: an optional modelsnapshot.ModelSnapshotCache object
+        to use instead of loading election.json when possible.
 
     Returns a dict with keys:
 
@@ -76,19 +112,235 @@ def load_context(input_dir, build_time):
       translations:
       voting_groups_by_id:
     """
+    path = utils.find_input_path(input_dir / 'election.json')
+
+    if snapshot_cache is None:
+        snapshot_key = None
+    else:
+        # Take the key before reading the file, so it's also the key to
+        # store a snapshot of what's read with (see ModelSnapshotCache.store()).
+        snapshot_key = snapshot_cache.make_key(path)
+        context = snapshot_cache.load(path, key=snapshot_key)
+        if context is not None:
+            context['build_time'] = build_time
+            election = context['election']
+            election.set_run_options(input_dir, results_store=results_store,
+                                     results_cache=results_cache, results_manager=results_manager)
+            return context
+
     context = dict(build_time=build_time)
 
-    path = input_dir / 'election.json'
     data = utils.read_json(path)
 
     cls_info = dict(context=context)
-    root_loader = RootLoader(input_dir=input_dir)
+    root_loader = RootLoader(input_dir=input_dir, results_store=results_store,
+                             results_cache=results_cache, results_manager=results_manager)
 
     # This load_object() call returns a ModelRoot object, but we don't need
     # or use that object.  Instead, the context is the entry way we provide
     # for access to the election data from the top level.
     load_object(root_loader, data, cls_info=cls_info, context=context)
 
+    if snapshot_cache is not None:
+        snapshot_cache.store(path, key=snapshot_key, context=context)
+
+    return context
+
+
+def load_shard_context(input_dir, build_time, snapshot_cache=None):
+    """
+    Load the context for one of several input directories.
+
+    This is the function run by each worker in load_sharded_context(),
+    so it must be picklable.
+
+    Returns (context, snapshot_cache).  The snapshot cache is returned so
+    its hit and miss counts can be collected from a worker process.
+    """
+    context = load_context(input_dir, build_time=build_time, snapshot_cache=snapshot_cache)
+
+    return (context, snapshot_cache)
+
+
+def merge_objects_by_id(merged, objects_by_id, shard_dir, kind, allow_ids=()):
+    """
+    Add the objects from one shard to a dict mapping id to object,
+    raising an error if an id is already present.
+
+    Args:
+      merged: the dict to add to.
+      objects_by_id: a dict of objects from one shard.
+      shard_dir: the shard's input directory, for error messages.
+      kind: the kind of object, for error messages (e.g. "contest").
+      allow_ids: ids that are allowed to appear in several shards.  For
+        these, the object from the first shard is kept.
+    """
+    for id_, obj in objects_by_id.items():
+        if id_ not in merged:
+            merged[id_] = obj
+            continue
+
+        if id_ in allow_ids:
+            continue
+
+        msg = f'{kind} id {id_!r} in input directory {shard_dir} is also in an earlier input directory'
+        raise RuntimeError(msg)
+
+
+def make_definition_key(obj, attr_names):
+    """
+    Return a value to compare to check whether two shards define an id
+    the same way.
+
+    Args:
+      obj: the object (or translation) with the id.
+      attr_names: the names of the attributes defining the object, or
+        None to compare the object itself (e.g. for a translation).
+    """
+    if attr_names is None:
+        return obj
+
+    key = []
+    for name in attr_names:
+        value = getattr(obj, name, None)
+        if isinstance(value, list):
+            # Then the value is a list of other shared definitions.
+            value = [item.id for item in value]
+        key.append(value)
+
+    return key
+
+
+def merge_shared_by_id(merged, objects_by_id, shard_dir, kind, attr_names):
+    """
+    Add to a dict mapping id to object the objects from one shard whose
+    ids aren't already present, raising an error if an object with an
+    id already present is defined differently.
+
+    This is for definitions that the shards share (e.g. voting groups).
+
+    Args:
+      merged: the dict to add to.
+      objects_by_id: a dict of objects from one shard.
+      shard_dir: the shard's input directory, for error messages.
+      kind: the kind of object, for error messages (e.g. "voting group").
+      attr_names: the names of the attributes to compare (see
+        make_definition_key()).
+    """
+    for id_, obj in objects_by_id.items():
+        other = merged.setdefault(id_, obj)
+        if other is obj:
+            continue
+
+        if make_definition_key(obj, attr_names) != make_definition_key(other, attr_names):
+            msg = (f'{kind} id {id_!r} in input directory {shard_dir} is defined '
+                   'differently in an earlier input directory')
+            raise RuntimeError(msg)
+
+
+def merge_shard_contexts(contexts, input_dirs):
+    """
+    Merge the contexts loaded from several input directories into the
+    first context, and return the first context.
+
+    The contests, headers and areas of different shards must have
+    different ids, except for the "All Precincts" area.  The definitions
+    the shards share (result stat types, voting groups, result styles,
+    and translations) must be the same in each shard that has them.
+
+    Args:
+      contexts: the loaded contexts, as a list of dicts.
+      input_dirs: the input directories, as a list of Path objects.
+    """
+    merged = contexts[0]
+    election = merged['election']
+
+    for name, kind, attr_names in SHARED_DEFINITIONS:
+        values = merged[name]
+        for context, input_dir in zip(contexts[1:], input_dirs[1:]):
+            merge_shared_by_id(values, context[name], shard_dir=input_dir, kind=kind,
+                               attr_names=attr_names)
+
+    languages = merged['languages']
+    for context in contexts[1:]:
+        languages.extend(lang for lang in context['languages'] if lang not in languages)
+
+    areas_by_id = OrderedDict()
+    headers_by_id = OrderedDict()
+    contests_by_id = OrderedDict()
+    for context, input_dir in zip(contexts, input_dirs):
+        shard_election = context['election']
+        if shard_election.date != election.date:
+            msg = (f'election date {shard_election.date} in input directory {input_dir} '
+                   f'differs from: {election.date}')
+            raise RuntimeError(msg)
+
+        merge_objects_by_id(areas_by_id, context['areas_by_id'], shard_dir=input_dir,
+                            kind='area', allow_ids=(datamodel.AREA_ID_ALL,))
+        merge_objects_by_id(headers_by_id, shard_election.headers_by_id,
+                            shard_dir=input_dir, kind='header')
+        merge_objects_by_id(contests_by_id, shard_election.contests_by_id,
+                            shard_dir=input_dir, kind='contest')
+
+        for contest in shard_election.contests:
+            contest.election = election
+            contest.shard_input_dir = input_dir
+            contest.areas_by_id = areas_by_id
+            contest.all_voting_groups_by_id = merged['voting_groups_by_id']
+
+    index_objects(headers_by_id.values())
+    index_objects(contests_by_id.values())
+
+    merged['areas_by_id'] = areas_by_id
+    election.headers_by_id = headers_by_id
+    election.contests_by_id = contests_by_id
+
+    return merged
+
+
+def load_sharded_context(input_dirs, build_time, results_store=None, results_cache=None,
+    results_manager=None, snapshot_cache=None, use_threads=False):
+    """
+    Read the input data from several input directories (or "shards"),
+    and return a single context to use for Jinja2.
+
+    Each input directory is a complete input directory, e.g. for one
+    county or results server.  The directories are loaded concurrently,
+    and the results are merged using merge_shard_contexts().  Each
+    contest's contest status and results files are read from the input
+    directory the contest was loaded from.
+
+    Args:
+      input_dirs: the input directories, as a list of Path objects.
+      use_threads: whether to use a thread pool instead of a process pool.
+
+    See load_context() for the remaining arguments and the return value.
+    """
+    executor_cls = (concurrent.futures.ThreadPoolExecutor if use_threads
+                    else concurrent.futures.ProcessPoolExecutor)
+    _log.info(f'loading {len(input_dirs)} input directories')
+
+    with executor_cls(max_workers=len(input_dirs)) as executor:
+        futures = [executor.submit(load_shard_context, input_dir, build_time=build_time,
+                                   snapshot_cache=snapshot_cache)
+                   for input_dir in input_dirs]
+        # Collect the results in order so the merged order doesn't depend
+        # on the order in which the workers finish.
+        shard_infos = [future.result() for future in futures]
+
+    contexts = []
+    for context, shard_snapshot_cache in shard_infos:
+        if snapshot_cache is not None and shard_snapshot_cache is not snapshot_cache:
+            # Then the shard was loaded in a worker process.
+            snapshot_cache.hits += shard_snapshot_cache.hits
+            snapshot_cache.misses += shard_snapshot_cache.misses
+        contexts.append(context)
+
+    context = merge_shard_contexts(contexts, input_dirs=input_dirs)
+    election = context['election']
+    election.set_run_options(input_dirs[0], results_store=results_store,
+                             results_cache=results_cache, results_manager=results_manager)
+
     return context
 
 
@@ -96,7 +348,8 @@ def parse_as_is(obj, value):
     """
     Return the given value as is, without any validation, etc.
     """
-    _log.debug(f'parsing as is: {truncate(value)}')
+    if _log.isEnabledFor(logging.DEBUG):
+        _log.debug(f'parsing as is: {truncate(value)}')
     return value
 
 
@@ -105,7 +358,8 @@ def parse_id(obj, value):
     """
     Remove and parse an id string from the given data.
     """
-    _log.debug(f'parsing id: {value}')
+    if _log.isEnabledFor(logging.DEBUG):
+        _log.debug(f'parsing id: {value}')
     return value
 
 
@@ -113,7 +367,8 @@ def parse_int(obj, value):
     """
     Remove and parse an int string from the given data.
     """
-    _log.debug(f'parsing int: {value}')
+    if _log.isEnabledFor(logging.DEBUG):
+        _log.debug(f'parsing int: {value}')
     if value is None or value == '':
         value = None
     else:
@@ -130,7 +385,8 @@ def parse_bool(obj, value):
     string maps to None. [The distinction facilitates import from
     untyped input, e.g. TSV.]
     """
-    _log.debug(f'parsing bool: {value}')
+    if _log.isEnabledFor(logging.DEBUG):
+        _log.debug(f'parsing bool: {value}')
     if type(value) is str:
         if value == '':
             value = None
@@ -181,9 +437,20 @@ def parse_date_time(obj, dt_string):
 def parse_i18n(obj, value):
     """
     Remove and parse an i18n string from the given data.
+
+    Returns the interned value (see orr.i18n), so equal values share a
+    single object.
     """
-    _log.debug(f'processing parse_i18n: {truncate(value)}')
-    return value
+    if _log.isEnabledFor(logging.DEBUG):
+        _log.debug(f'processing parse_i18n: {truncate(value)}')
+    return i18n.intern_i18n(value)
+
+
+def parse_translations(obj, translations):
+    """
+    Parse the dict mapping translation key to i18n value.
+    """
+    return {key: i18n.intern_i18n(value) for key, value in translations.items()}
 
 
 class AutoAttr:
@@ -217,6 +484,8 @@ class AutoAttr:
 
         self.attr_name = attr_name
         self.context_keys = set(context_keys)
+        # Also store the keys in a fixed order, for fast iteration.
+        self._context_keys = tuple(sorted(self.context_keys))
         self.data_key = data_key
         self.load_value = load_value
         self.unpack_context = unpack_context
@@ -238,24 +507,24 @@ class AutoAttr:
         Args:
           context: the current Jinja2 context.
         """
-        context_keys = self.context_keys
+        if not self._context_keys:
+            # This is the common case, so return early.
+            return {}
 
-        # Check that the context has the needed specified keys
-        if context_keys and not context_keys <= set(context):
-            missing = context_keys - set(context)
+        # Only pass the context keys that are needed / recognized.
+        try:
+            context = {key: context[key] for key in self._context_keys}
+        except KeyError:
+            # Then the context doesn't have the needed specified keys.
+            missing = self.context_keys - set(context)
             msg = (f'context does not have keys {sorted(missing)} '
                    f'while calling {self.load_value}: {sorted(context)}')
             raise RuntimeError(msg)
 
-        # Only pass the context keys that are needed / recognized.
-        context = {key: context[key] for key in context_keys}
-
         if self.unpack_context:
             kwargs = context
-        elif context:
-            kwargs = dict(context=context)
         else:
-            kwargs = {}
+            kwargs = dict(context=context)
 
         return kwargs
 
@@ -343,32 +612,85 @@ def load_objects_to_mapping(load_data, seq, should_index=False):
     return objects_by_id
 
 
-def process_auto_attr(loader, model_obj, attr, data, context):
+def make_auto_attr(attr):
     """
-    Process an attribute in a Loader's auto_attrs list.
+    Return an element of a Loader's auto_attrs list as an AutoAttr object.
 
     Args:
-      loader: an instance of a Loader class.
-      model_obj: the data model object on which to set an attribute.
-      attr: an element of loader.auto_attrs, which can be a tuple or
-        AutoAttr object.
-      data: the dict of data containing the key-values to process.
-      context: the current Jinja2 context.
+      attr: a tuple of AutoAttr constructor arguments, or an AutoAttr object.
     """
     if type(attr) != AutoAttr:
         assert type(attr) == tuple
         attr = AutoAttr(*attr)
 
-    _log.debug(f'processing auto_attr {attr!r} for: {model_obj!r}')
-    try:
-        value = attr.process_key(loader, data=data, context=context)
-    except Exception:
-        raise RuntimeError(f'while processing auto_attr {attr!r} for: {model_obj!r}')
+    return attr
 
-    try:
-        setattr(model_obj, attr.attr_name, value)
-    except Exception:
-        raise RuntimeError(f"couldn't set {attr_name!r} on {model_obj!r}")
+
+class LoaderPlan:
+
+    """
+    The loading steps for a Loader class, prepared once and then reused
+    for every object loaded with that class.
+
+    Preparing a plan converts the class's auto_attrs tuples to AutoAttr
+    objects, so that loading many objects (e.g. areas and choices)
+    doesn't repeat that work for each object.
+
+    Instance attributes:
+
+      auto_attrs: the class's auto_attrs, as a tuple of AutoAttr objects.
+      model_class: the data model class to instantiate.
+      should_finalize: whether to call finalize() on each loaded object.
+    """
+
+    def __init__(self, loader_cls):
+        """
+        Args:
+          loader_cls: a Loader class.
+        """
+        self.auto_attrs = tuple(make_auto_attr(attr) for attr in loader_cls.auto_attrs)
+        self.model_class = loader_cls.model_class
+        self.should_finalize = hasattr(loader_cls, 'finalize')
+
+    def process_auto_attrs(self, loader, model_obj, data, context):
+        """
+        Set all of the auto_attrs attributes on a model object.
+
+        Args:
+          loader: an instance of the Loader class.
+          model_obj: the data model object on which to set attributes.
+          data: the dict of data containing the key-values to process.
+          context: the current Jinja2 context.
+        """
+        is_debug = _log.isEnabledFor(logging.DEBUG)
+        for attr in self.auto_attrs:
+            if is_debug:
+                _log.debug(f'processing auto_attr {attr!r} for: {model_obj!r}')
+            try:
+                # This inlines the common case of attr.process_key(), where
+                # the attribute needs a data value and no context.
+                data_key = attr.data_key
+                if data_key is False or attr._context_keys:
+                    value = attr.process_key(loader, data=data, context=context)
+                else:
+                    value = data.pop(data_key, None)
+                    if value is not None:
+                        value = attr.load_value(loader, value)
+            except Exception:
+                raise RuntimeError(f'while processing auto_attr {attr!r} for: {model_obj!r}')
+
+            try:
+                setattr(model_obj, attr.attr_name, value)
+            except Exception:
+                raise RuntimeError(f"couldn't set {attr.attr_name!r} on {model_obj!r}")
+
+
+@functools.lru_cache(maxsize=None)
+def get_loader_plan(loader_cls):
+    """
+    Return the (cached) LoaderPlan object for a Loader class.
+    """
+    return LoaderPlan(loader_cls)
 
 
 # TODO: make context required?
@@ -398,8 +720,8 @@ def load_object(loader, data, cls_info=None, context=None):
     if context is None:
         context = {}
 
-    auto_attrs = loader.auto_attrs
-    model_cls = loader.model_class
+    plan = get_loader_plan(type(loader))
+    model_cls = plan.model_class
 
     try:
         # This is where we use composition over inheritance.
@@ -415,15 +737,14 @@ def load_object(loader, data, cls_info=None, context=None):
 
     # Set all of the (remaining) object attributes -- iterating over all
     # of the auto_attrs and parsing the corresponding JSON key values.
-    for attr in auto_attrs:
-        process_auto_attr(loader, model_obj, attr, data=data, context=context)
+    plan.process_auto_attrs(loader, model_obj, data=data, context=context)
 
     # Check that all keys in the JSON have been processed.
     if data:
         msg = f'unrecognized keys for model object {model_obj!r}: {sorted(data.keys())}'
         raise RuntimeError(msg)
 
-    if hasattr(loader, 'finalize'):
+    if plan.should_finalize:
         # Perform class-specific init after data is loaded
         model_obj.finalize()
 
@@ -482,38 +803,91 @@ def load_contest_status(election):
     """
     Load contest results statuses from the contest status file.
 
+    If the election was loaded from several input directories, the
+    statuses are loaded from each directory's contest status file.
+
     Args:
       election: an Election object.
     """
-    input_dir = election.input_dir
-    path = input_dir / CONTEST_STATUS_PATH
-
-    contests_data = utils.read_json(path)
+    # Group the contests by input directory, starting with the
+    # election's input directory.
+    contests_by_input_dir = OrderedDict([(election.input_dir, OrderedDict())])
+    for contest in election.contests:
+        contests_by_id = contests_by_input_dir.setdefault(contest.input_dir, OrderedDict())
+        contests_by_id[contest.id] = contest
 
     process_attrs = dict(reporting_time=parse_date_time,
         total_precincts=parse_int,
         precincts_reporting=parse_int,
         rcv_rounds=parse_int)
 
-    _set_attributes(contests_data, objects_by_id=election.contests_by_id,
-                     id_key='_id', process_attrs=process_attrs)
+    for input_dir, contests_by_id in contests_by_input_dir.items():
+        path = utils.find_input_path(input_dir / CONTEST_STATUS_PATH)
+        contests_data = utils.read_json(path)
+
+        _set_attributes(contests_data, objects_by_id=contests_by_id,
+                         id_key='_id', process_attrs=process_attrs)
+
+    for contest in election.contests:
+        tabulate_contest_ballots(contest)
 
 
 def get_contest_results_path(contest):
     """
     Return the path to the input file containing the detailed results for
     a contest.
+
+    If only a compressed variant of the file exists (e.g. with a ".gz"
+    suffix), the path to that file is returned.
     """
-    election = contest.election
-    input_dir = election.input_dir
-    results_dir = input_dir / RESULTS_DIR
+    results_dir = contest.input_dir / RESULTS_DIR
 
     file_name = CONTEST_RESULTS_FILE_NAME_FORMAT.format(contest.id)
-    path = results_dir / file_name
+    path = utils.find_input_path(results_dir / file_name)
 
     return path
 
 
+def get_contest_ballots_path(contest):
+    """
+    Return the path to the input file containing the ballots for an RCV
+    contest, allowing for a compressed variant.  The file needn't exist.
+    """
+    results_dir = contest.input_dir / RESULTS_DIR
+
+    file_name = CONTEST_BALLOTS_FILE_NAME_FORMAT.format(contest.id)
+    path = utils.find_input_path(results_dir / file_name)
+
+    return path
+
+
+def tabulate_contest_ballots(contest):
+    """
+    Tabulate a contest's RCV rounds from its ballots file, if it has one.
+
+    This sets the contest's rcv_tabulation and rcv_rounds attributes.
+    The ballots are tabulated again only if the file changed.
+    """
+    path = get_contest_ballots_path(contest)
+    if not path.exists():
+        contest.rcv_tabulation = None
+        return
+
+    if contest.number_elected != 1:
+        raise RuntimeError(f'only single-winner RCV contests can be tabulated: {contest!r}')
+
+    source_key = get_source_key(path, with_hash=False)
+    if contest.rcv_tabulation is None or contest.rcv_tabulation[0] != source_key:
+        choice_ids = [choice.id for choice in contest.choices]
+        ballot_set = rcvtabulation.read_ballots(path, choice_ids=choice_ids)
+        rounds = rcvtabulation.tabulate(ballot_set, choice_count=len(choice_ids))
+        rcv_totals = rcvtabulation.make_rcv_totals(rounds, contest.results_mapping)
+        _log.info(f'tabulated {len(rounds)} RCV rounds from {ballot_set}: {path}')
+        contest.rcv_tabulation = (source_key, rcv_totals)
+
+    contest.rcv_rounds = len(contest.rcv_tabulation[1])
+
+
 # TODO: eliminate the need to pass both tsv_stream and iter_rows.
 def read_rcv_totals(tsv_stream, iter_rows, rounds):
     """
@@ -533,48 +907,318 @@ def read_rcv_totals(tsv_stream, iter_rows, rounds):
         yield tuple(None if x == '' else int(x) for x in row[2:])
 
 
+def make_results_array(rows, column_count):
+    """
+    Convert results rows of strings into a 2-D int64 numpy array.
+
+    The strings are passed to numpy in a single flat sequence, so the
+    values are never converted to individual Python int objects.
+
+    Args:
+      rows: a list of lists of integer strings, each of length column_count.
+      column_count: the number of columns in each row.
+    """
+    values = list(itertools.chain.from_iterable(rows))
+    array = np.array(values, dtype=datamodel.RESULTS_DTYPE)
+
+    return array.reshape(len(rows), column_count)
+
+
+def read_contest_results(path, column_count, rcv_rounds):
+    """
+    Parse a contest's results file.
+
+    Returns (results, rcv_totals, row_keys), where results is a list of
+    rows (one for each reporting group), each a list of integer strings,
+    rcv_totals is a list of tuples, one for each round, starting with the
+    first round, and row_keys is the pair (area_id, voting_group_id) of
+    each row, as a list of tuples.
+
+    Args:
+      path: the path to the results file.
+      column_count: the number of stat and choice columns expected.
+      rcv_rounds: the number of RCV rounds in the file.
+    """
+    with TSVReader(path) as tsv_stream:
+        iter_rows = iter(tsv_stream)
+        rcv_totals = read_results_header(tsv_stream, iter_rows, path=path,
+                                         column_count=column_count, rcv_rounds=rcv_rounds)
+        rows, row_keys = read_results_rows(tsv_stream, iter_rows, path=path)
+
+    return (rows, rcv_totals, row_keys)
+
+
+def read_results_header(tsv_stream, iter_rows, path, column_count, rcv_rounds):
+    """
+    Read the header line and RCV rows at the start of a results file.
+
+    Returns rcv_totals, as a list of tuples, one for each round, starting
+    with the first round.
+
+    Args:
+      tsv_stream: a TSVStream object.
+      iter_rows: an iterator over tsv_stream.
+      path: the path to the results file, for error messages.
+      column_count: the number of stat and choice columns expected.
+      rcv_rounds: the number of RCV rounds in the file.
+    """
+    headers = next(iter_rows)
+
+    # Simple check, just validate the column count
+    # We could validate the header if we like later
+    if tsv_stream.num_columns != 2 + column_count:
+        raise RuntimeError(
+            f'Mismatched column heading in {path}: {tsv_stream.line} columns={column_count}')
+
+    # The RCV rounds are first, starting with the last round.
+    rcv_totals = list(read_rcv_totals(tsv_stream, iter_rows, rounds=rcv_rounds))
+    # Call reversed() so the first round occurs first.
+    rcv_totals.reverse()
+
+    return rcv_totals
+
+
+def read_results_rows(tsv_stream, iter_rows, path):
+    """
+    Read the remaining (reporting group) rows of a results file.
+
+    Returns (rows, row_keys), where rows is a list of rows, each a list of
+    integer strings, and row_keys is the pair (area_id, voting_group_id)
+    of each row, as a list of tuples.
+
+    Args:
+      tsv_stream: a TSVStream object.
+      iter_rows: an iterator over tsv_stream.
+      path: the path to the results file, for error messages.
+    """
+    rows = []
+    row_keys = []
+    for row in iter_rows:
+        if len(row) != tsv_stream.num_columns:
+            raise RuntimeError(
+                f'Mismatched columns in {path}: {tsv_stream.line}')
+        row_keys.append((row[0], row[1]))
+        rows.append(row[2:])
+
+    return (rows, row_keys)
+
+
+def parse_contest_results(path, column_count, rcv_rounds, as_array):
+    """
+    Parse a contest's results file, and return (results, rcv_totals,
+    row_keys) (see read_contest_results()).
+
+    This function depends only on its arguments (and not on any model
+    objects), so it can be run in a worker process.
+
+    Args:
+      path: the path to the results file.
+      column_count: the number of stat and choice columns expected.
+      rcv_rounds: the number of RCV rounds in the file.
+      as_array: whether to return the results as a 2-D numpy array
+        rather than a list of lists of ints.
+    """
+    rows, rcv_totals, row_keys = read_contest_results(path, column_count=column_count,
+                                                      rcv_rounds=rcv_rounds)
+    if as_array:
+        results = make_results_array(rows, column_count=column_count)
+    else:
+        results = [[int(v) for v in row] for row in rows]
+
+    return (results, rcv_totals, row_keys)
+
+
+def get_results_parse_info(contest):
+    """
+    Return the arguments to pass to parse_contest_results() for a contest,
+    as a dict.
+    """
+    # TODO: set this as an auto_attr?
+    contest.choice_count = len(contest.choices_by_id)
+
+    election = contest.election
+    # We need an array if we are going to write it to the cache.
+    as_array = (election.results_cache is not None or
+                election.results_store == datamodel.RESULTS_STORE_ARRAY)
+
+    # The results file of a contest tabulated from ballots has no RCV rows.
+    rcv_rounds = 0 if contest.rcv_tabulation is not None else contest.rcv_rounds
+
+    return dict(
+        path=get_contest_results_path(contest),
+        column_count=contest.result_stat_count + contest.choice_count,
+        rcv_rounds=rcv_rounds,
+        as_array=as_array,
+    )
+
+
+def load_cached_contest_results(contest, parse_info):
+    """
+    Return the (results, rcv_totals, row_keys) for a contest from the
+    election's results cache, or None if the election has no cache or the cache
+    doesn't have fresh data.
+    """
+    results_cache = contest.election.results_cache
+    if results_cache is None:
+        return None
+
+    path = parse_info['path']
+    cached = results_cache.load(path, rcv_rounds=parse_info['rcv_rounds'])
+    if cached is None:
+        return None
+
+    results = cached[0]
+    if results.shape[1] != parse_info['column_count']:
+        raise RuntimeError(
+            f'Mismatched column heading in {path}: (cached) stats={contest.result_stat_count} choices={contest.choice_count}')
+
+    return cached
+
+
+def get_cache_source_key(contest, parse_info):
+    """
+    Return the source key of a contest's results file to store in the
+    election's results cache, or None if the election has no cache.
+
+    This should be called before the file is parsed, so that if the file
+    changes while being parsed, the cache entry has the key of the older
+    contents and is treated as stale.
+    """
+    if contest.election.results_cache is None:
+        return None
+
+    return get_source_key(parse_info['path'])
+
+
+def store_cached_contest_results(contest, parse_info, source_key, results, rcv_totals,
+    row_keys):
+    """
+    Write newly parsed results to the election's results cache, if any.
+
+    Args:
+      source_key: the return value of get_cache_source_key(), called
+        before parsing the file.
+    """
+    results_cache = contest.election.results_cache
+    if results_cache is None:
+        return
+
+    results_cache.store(parse_info['path'], source_key=source_key,
+                        rcv_rounds=parse_info['rcv_rounds'], results=results,
+                        rcv_totals=rcv_totals, row_keys=row_keys)
+
+
+def check_contest_results(contest, path, results, rcv_totals, row_keys):
+    """
+    Validate loaded results, and return the pair (results, rcv_totals)
+    in the form the contest should store.
+
+    Args:
+      path: the path to the results file, for error messages.
+      row_keys: the pair (area_id, voting_group_id) of each row of the
+        file, as a list of tuples.
+    """
+    rollup_plan = contest.reporting_group_table.rollup_plan
+    if (len(results) != contest.reporting_group_count and rollup_plan is not None and
+        rollup_plan.is_base_rows(row_keys)):
+        # Then the file has only the base rows, so compute the others.
+        if not datamodel.is_results_array(results):
+            results = np.array(results, dtype=datamodel.RESULTS_DTYPE).reshape(
+                len(results), contest.result_stat_count + contest.choice_count)
+        results = rollup_plan.apply(results)
+
+    if contest.election.results_store != datamodel.RESULTS_STORE_ARRAY:
+        if datamodel.is_results_array(results):
+            results = results.tolist()
+    elif datamodel.is_results_array(results):
+        results = sparseresults.maybe_make_sparse(results)
+
+    if len(results) != contest.reporting_group_count:
+        raise RuntimeError(
+            f'Mismatched reporting groups in {path}')
+
+    if contest.rcv_tabulation is not None:
+        rcv_totals = contest.rcv_tabulation[1]
+
+    return (results, rcv_totals)
+
+
 def load_contest_results(contest):
     """
     Load the detailed results for this contest with reporting groups with
     a breakdown by precinct/district.
 
+    If the election has a results cache, the results are read from the
+    cache when possible, and the cache is updated otherwise.
+
+    Returns the pair (results, rcv_totals).
+
     Args:
       contest: a Contest object.
     """
-    path = get_contest_results_path(contest)
+    parse_info = get_results_parse_info(contest)
+    path = parse_info['path']
 
     _log.debug(f'load_results_details({path})')
 
-    # TODO: set this as an auto_attr?
-    contest.choice_count = len(contest.choices_by_id)
-    contest.results = []
-    contest.rcv_totals = []
+    loaded = load_cached_contest_results(contest, parse_info)
+    if loaded is None:
+        source_key = get_cache_source_key(contest, parse_info)
+        loaded = parse_contest_results(**parse_info)
+        store_cached_contest_results(contest, parse_info, source_key, *loaded)
 
-    with TSVReader(path) as tsv_stream:
-        iter_rows = iter(tsv_stream)
-        headers = next(iter_rows)
+    return check_contest_results(contest, path, *loaded)
 
-        # Simple check, just validate the column count
-        # We could validate the header if we like later
-        if tsv_stream.num_columns != 2 + contest.result_stat_count + contest.choice_count:
-            raise RuntimeError(
-                f'Mismatched column heading in {path}: {tsv_stream.line} stats={contest.result_stat_count} choices={contest.choice_count}')
 
-        # The RCV rounds are first, starting with the last round.
-        rcv_totals = list(read_rcv_totals(tsv_stream, iter_rows, rounds=contest.rcv_rounds))
-        # Call reversed() so the first round occurs first.
-        contest.rcv_totals.extend(reversed(rcv_totals))
+def preload_all_results(election, workers, use_threads=False):
+    """
+    Load the results details for all contests up front, parsing the
+    results files in parallel.
 
-        for row in iter_rows:
-            if len(row) != tsv_stream.num_columns:
-                raise RuntimeError(
-                    f'Mismatched columns in {path}: {tsv_stream.line}')
-            # We could verify the reporting group but will skip
-            contest.results.append([ int(v) for v in row[2:]])
+    The files are parsed on a pool of worker processes (or threads), but
+    the results are attached to the contests in the main thread and in
+    election order, so the outcome (including which error is raised, if
+    any) doesn't depend on the order in which the workers finish.
 
-        if len(contest.results) != contest.reporting_group_count:
-            raise RuntimeError(
-                f'Mismatched reporting groups in {path}')
+    The contest statuses must already be loaded since they determine
+    the number of RCV rounds in each file.
+
+    Args:
+      election: an Election object.
+      workers: the maximum number of workers to use.
+      use_threads: whether to use a thread pool instead of a process pool.
+    """
+    # Skip any contests whose results were already loaded.
+    contests = [contest for contest in election.contests
+                if not contest.is_results_loaded]
+
+    # Consult the cache first, since reading from the cache is cheap.
+    pending = []
+    for contest in contests:
+        parse_info = get_results_parse_info(contest)
+        loaded = load_cached_contest_results(contest, parse_info)
+        if loaded is None:
+            source_key = get_cache_source_key(contest, parse_info)
+            pending.append((contest, parse_info, source_key))
+        else:
+            data = check_contest_results(contest, parse_info['path'], *loaded)
+            contest.set_results_data(*data)
+
+    if not pending:
+        return
+
+    executor_cls = (concurrent.futures.ThreadPoolExecutor if use_threads
+                    else concurrent.futures.ProcessPoolExecutor)
+    _log.info(f'parsing {len(pending)} results files using {workers} workers')
+
+    with executor_cls(max_workers=workers) as executor:
+        futures = [executor.submit(parse_contest_results, **parse_info)
+                   for contest, parse_info, source_key in pending]
+        for (contest, parse_info, source_key), future in zip(pending, futures):
+            loaded = future.result()
+            store_cached_contest_results(contest, parse_info, source_key, *loaded)
+            data = check_contest_results(contest, parse_info['path'], *loaded)
+            contest.set_results_data(*data)
 
 
 def load_all_results_details(election, filedir=None, filename_format=None):
@@ -711,6 +1355,7 @@ class AreaLoader:
         ('short_name', parse_i18n),
         ('is_vbm', parse_bool),
         ('consolidated_ids', parse_as_is),
+        ('district_ids', parse_as_is),
         ('reporting_group_ids', parse_as_is),
     ]
 
@@ -816,7 +1461,8 @@ def load_results_mapping(contest_loader, data):
     contest = contest_loader.model_object
     choice_count = len(contest.choices_by_id)
     result_style = contest.result_style
-    return ResultsMapping(result_style.result_stat_types, choice_count=choice_count)
+    return ResultsMapping(result_style.result_stat_types, choice_count=choice_count,
+                          selector_cache=result_style.column_selectors)
 
 
 def load_voting_district(contest_loader, value, areas_by_id):
@@ -1054,7 +1700,38 @@ def load_result_styles(root_loader, styles_data, context):
     return load_objects_to_mapping(load_data, styles_data)
 
 
-def load_areas(root_loader, areas_data):
+def make_reporting_group_tables(areas_by_id, voting_groups_by_id):
+    """
+    Set the reporting_group_table attribute of each area that has
+    reporting_group_ids.
+
+    Areas with the same reporting_group_ids share the same table.
+    """
+    members_by_area_id = rollup.get_members_by_area_id(areas_by_id.values())
+    precinct_ids = {area.id for area in areas_by_id.values()
+                    if area.classification == datamodel.AREA_CLASSIFICATION_PRECINCT}
+
+    tables = {}
+    for area in areas_by_id.values():
+        ids_text = area.reporting_group_ids
+        if not ids_text:
+            continue
+
+        try:
+            table = tables[ids_text]
+        except KeyError:
+            groups = list(area.iter_reporting_groups(areas_by_id,
+                                                     voting_groups_by_id=voting_groups_by_id))
+            keys = [(group.area.id, group.voting_group.id) for group in groups]
+            rollup_plan = rollup.make_rollup_plan(keys, members_by_area_id=members_by_area_id,
+                                                  precinct_ids=precinct_ids)
+            table = ReportingGroupTable(groups, rollup_plan=rollup_plan)
+            tables[ids_text] = table
+
+        area.reporting_group_table = table
+
+
+def load_areas(root_loader, areas_data, voting_groups_by_id):
     """
     Process source data representing an area (e.g. precinct or district).
     """
@@ -1062,6 +1739,9 @@ def load_areas(root_loader, areas_data):
         return load_object(AreaLoader(), data)
 
     areas_by_id = load_objects_to_mapping(load_data, areas_data)
+    # This needs to be done after all areas are loaded since the
+    # reporting groups can reference any area.
+    make_reporting_group_tables(areas_by_id, voting_groups_by_id=voting_groups_by_id)
 
     return areas_by_id
 
@@ -1071,7 +1751,10 @@ def load_election(root_loader, election_data, context):
     Args:
       root_loader: a RootLoader object.
     """
-    cls_info = dict(input_dir=root_loader.input_dir)
+    cls_info = dict(input_dir=root_loader.input_dir,
+                    results_store=root_loader.results_store,
+                    results_cache=root_loader.results_cache,
+                    results_manager=root_loader.results_manager)
     election_loader = ElectionLoader()
     return load_object(election_loader, election_data, cls_info=cls_info, context=context)
 
@@ -1082,7 +1765,7 @@ class RootLoader:
 
     auto_attrs = [
         ('languages', parse_as_is),
-        ('translations', parse_as_is),
+        ('translations', parse_translations),
         # Set "result_stat_types_by_id" and "voting_groups_by_id" now since
         # processing "election" depends on them.
         ('result_stat_types_by_id', load_result_stat_types, 'result_stat_types'),
@@ -1090,14 +1773,23 @@ class RootLoader:
         # Processing result_styles requires result_stat_types and voting_groups.
         AutoAttr('result_styles_by_id', load_result_styles, data_key='result_styles',
             context_keys=('result_stat_types_by_id', 'voting_groups_by_id')),
-        ('areas_by_id', load_areas, 'areas'),
+        # Processing areas requires voting_groups.
+        AutoAttr('areas_by_id', load_areas, data_key='areas',
+            context_keys=('voting_groups_by_id',), unpack_context=True),
         AutoAttr('election', load_election,
             context_keys=('areas_by_id', 'result_styles_by_id', 'voting_groups_by_id')),
     ]
 
-    def __init__(self, input_dir):
+    def __init__(self, input_dir, results_store=None, results_cache=None,
+        results_manager=None):
         """
         Args:
           input_dir: the directory containing the input data, as a Path object.
+          results_store: one of the values in datamodel.RESULTS_STORES.
+          results_cache: an optional resultscache.ResultsCache object.
+          results_manager: an optional resultsmanager.ResultsManager object.
         """
         self.input_dir = input_dir
+        self.results_cache = results_cache
+        self.results_manager = results_manager
+        self.results_store = results_store
@@ -25,23 +25,58 @@ Class definitions to represent an election definition, with
 contests containing a list of choices, either an OfficeContest with list
 of candidates or MeasureContest with list of named choices, usually
 yes/no.
+
+The classes for objects an election can have many of (e.g. areas,
+reporting groups, choices, and contests) define __slots__, listing
+every attribute the loaders set.  This keeps a large election's model
+compact.  An attribute that is declared but not yet set raises
+AttributeError, the same as a missing attribute without __slots__.
 """
 
 from collections import OrderedDict
 from datetime import datetime
+import hashlib
 import logging
 import re
 
+import numpy as np
+
+import orr.buildtracking as buildtracking
+from orr.buildtracking import INPUT_RESULTS, INPUT_STATUS
 from orr.models.rcvresults import RCVResults
-import orr.utils as utils
-from orr.utils import truncate
+import orr.numberformat as numberformat
+from orr.resultscube import ResultsCube
+import orr.sparseresults as sparseresults
+from orr.sparseresults import SparseResults
+from orr.utils import UTF8_ENCODING, truncate
 
 _log = logging.getLogger(__name__)
 
 
 AREA_ID_ALL = '*'
+# The classification of the areas that are precincts.
+AREA_CLASSIFICATION_PRECINCT = 'Precinct'
 VOTING_GROUP_ID_ALL = 'TO'
 
+# The names of the contest attributes set from the contest status file
+# (or from tabulating a ballots file).
+CONTEST_STATUS_ATTRS = ('reporting_time', 'total_precincts', 'precincts_reporting', 'rcv_rounds',
+                        'rcv_tabulation')
+
+# The supported ways of storing a contest's detailed results in memory.
+# With RESULTS_STORE_LIST, Contest.results is a list of lists of ints, one
+# list per reporting group.  With RESULTS_STORE_ARRAY, Contest.results is
+# a single 2-D int64 numpy array indexed by (reporting group, column),
+# where the columns are the result stats followed by the choices.  (If
+# most of the rows are all zeros, the array is instead a
+# sparseresults.SparseResults object, which stores only the other rows.)
+RESULTS_STORE_LIST = 'list'
+RESULTS_STORE_ARRAY = 'array'
+RESULTS_STORES = (RESULTS_STORE_LIST, RESULTS_STORE_ARRAY)
+
+# The numpy dtype used for results stored with RESULTS_STORE_ARRAY.
+RESULTS_DTYPE = np.int64
+
 # Besides the votes for candidates and measure choices counted, there
 # are a set of summary results with ballots not counted by category,
 # and a summary result for totals. These have a set of IDs and a generic title.
@@ -107,13 +142,21 @@ def make_indexes_by_id(objects):
     return make_index_map(obj.id for obj in objects)
 
 
+def is_results_array(results):
+    """
+    Return whether contest results are stored as a numpy array (i.e.
+    using RESULTS_STORE_ARRAY) as opposed to a list of lists.
+    """
+    return isinstance(results, np.ndarray)
+
+
 # TODO: test this.
 def i18n_repr(i18n_text):
     """
     Return a representation suitable for direct inclusion in a __repr__
     value, for example f'<Item title={i18n_repr(self.title)}>'.
     """
-    if type(i18n_text) == dict and 'en' in i18n_text:
+    if isinstance(i18n_text, dict) and 'en' in i18n_text:
         # Add a prefix to indicate the English was picked out.
         return '[en]{}'.format(truncate(i18n_text['en']))
 
@@ -142,6 +185,8 @@ class VotingGroup:
       heading:
     """
 
+    __slots__ = ('id', 'heading', 'is_percent')
+
     def __init__(self, id_=None, heading=None):
         self.id = id_
         self.heading = heading
@@ -162,6 +207,8 @@ class ResultStatType:
       is_percent:
     """
 
+    __slots__ = ('id', 'heading', 'is_percent')
+
     def __init__(self, _id=None, heading=None):
         self.id = _id
         self.heading = heading
@@ -182,11 +229,21 @@ class ResultStyle:
       result_stat_types:
       voting_group_indexes_by_id:
       voting_groups:
+      column_selectors: a dict to share as the selector_cache of the
+        ResultsMapping objects of the contests with this style.
     """
 
+    __slots__ = ('id', 'description', 'is_rcv', 'result_stat_types',
+                 'voting_group_indexes_by_id', 'voting_groups', 'column_selectors',
+                 '_indexes_by_idlist')
+
     def __init__(self):
         self.id = None
         self.voting_group_indexes_by_id = None
+        self.column_selectors = {}
+        # A dict mapping idlist to the return value of
+        # voting_group_indexes_from_idlist().
+        self._indexes_by_idlist = {}
 
     def __repr__(self):
         return f'<ResultStyle id={self.id!r}>'
@@ -218,9 +275,18 @@ class ResultStyle:
         """
         Returns the list of voting group index values by the
         space-separated list of ids. Unmatched ids are omitted.
+
+        The list is computed once for each idlist, so it shouldn't be
+        modified.
         """
+        try:
+            return self._indexes_by_idlist[idlist]
+        except KeyError:
+            pass
+
         ids = self.voting_group_ids_from_idlist(idlist)
         indexes = [self.voting_group_indexes_by_id[id_] for id_ in ids]
+        self._indexes_by_idlist[idlist] = indexes
 
         return indexes
 
@@ -297,10 +363,20 @@ class Area:
       name:
       short_name:
       is_vbm:
-      consolidated_ids:
+      consolidated_ids: the space-separated ids of the areas making up
+        this area, if any (see orr.rollup).
+      district_ids: the space-separated ids of the districts containing
+        this area, if any, e.g. for a precinct (see orr.rollup).
       reporting_group_ids:
+      reporting_group_table: the area's reporting groups, as a
+        ReportingGroupTable object, or None if the area has no
+        reporting_group_ids.  This is set after all areas are loaded.
     """
 
+    __slots__ = ('id', 'classification', 'name', 'short_name', 'is_vbm',
+                 'consolidated_ids', 'district_ids', 'reporting_group_ids',
+                 'reporting_group_table')
+
     reporting_group_pattern = re.compile(r'(.*)~(.*)')
 
     def __init__(self, id_=None, short_name=None):
@@ -310,6 +386,7 @@ class Area:
         self.classification = None
         self.name = None
         self.is_vbm = False
+        self.reporting_group_table = None
 
     def __repr__(self):
         return f'<Area {self.classification!r}: id={self.id!r}>'
@@ -347,6 +424,8 @@ class ReportingGroup:
     tuples.
     """
 
+    __slots__ = ('area', 'voting_group', 'index')
+
     def __init__(self, area, voting_group, index=None):
         """
         Args:
@@ -370,6 +449,57 @@ class ReportingGroup:
         return text
 
 
+class ReportingGroupTable:
+
+    """
+    The reporting groups of an area, in results row order.
+
+    The tables are created once when loading, and areas with the same
+    reporting_group_ids share a single table (and hence all contests
+    with those voting districts share it, too).  For this reason, a
+    table shouldn't be modified after it is created.
+
+    Instance attributes:
+
+      reporting_groups: a tuple of ReportingGroup objects.
+      rollup_plan: a rollup.RollupPlan object for computing the results
+        rows of roll-up areas from the other rows, or None if the table
+        has no roll-up areas.
+    """
+
+    def __init__(self, reporting_groups, rollup_plan=None):
+        """
+        Args:
+          reporting_groups: an iterable of ReportingGroup objects, whose
+            index attributes are their positions in the iterable.
+        """
+        self.reporting_groups = tuple(reporting_groups)
+        self.rollup_plan = rollup_plan
+        # A dict mapping (area_id, voting_group_id) to row index.
+        self._indexes_by_key = {}
+        for group in self.reporting_groups:
+            key = (group.area.id, group.voting_group.id)
+            self._indexes_by_key.setdefault(key, group.index)
+
+    def __repr__(self):
+        return f'<ReportingGroupTable: {len(self.reporting_groups)} reporting groups>'
+
+    def __len__(self):
+        return len(self.reporting_groups)
+
+    def __iter__(self):
+        return iter(self.reporting_groups)
+
+    def get_index(self, area_id, voting_group_id):
+        """
+        Return the results row index of the reporting group with the
+        given area id and voting group id.
+
+        Raises KeyError if the table has no such reporting group.
+        """
+        return self._indexes_by_key[(area_id, voting_group_id)]
+
+
 # --- Ballot Item definitions
 
 class Header:
@@ -385,6 +515,9 @@ class Header:
       parent_header: the parent header of the item, as a Header object.
     """
 
+    __slots__ = ('id', 'ballot_title', 'classification', 'ballot_items',
+                 'parent_header', 'index', '_header_id')
+
     def __init__(self):
         self.ballot_title = None
         self.ballot_items = []
@@ -416,6 +549,8 @@ class Choice:
       contest: back-reference to a Contest object.
     """
 
+    __slots__ = ('id', 'ballot_title', 'contest', 'index')
+
     def __init__(self, contest=None):
         self.ballot_title = None
         self.id = None
@@ -441,6 +576,9 @@ class Candidate(Choice):
       contest: back-reference to a Contest object.
     """
 
+    # The remaining slots are inherited from Choice.
+    __slots__ = ('ballot_designation', 'candidate_party')
+
     def __init__(self, contest=None):
         self.ballot_title = None
         self.id = None
@@ -478,19 +616,38 @@ class ResultsMapping:
     """
     Encapsulates the association between (1) result stat types and choices,
     and (2) index in the results row.
+
+    Id lists (e.g. "CHOICES *") are compiled into index arrays the first
+    time they are used, and the arrays are cached in selector_cache.
+
+    Instance attributes:
+
+      choice_count: the number of choices in the contest.
+      indexes_by_id: a dict mapping ResultStatType id to index.
+      result_stat_types: the list of ResultStatType objects.
+      selector_cache: a dict mapping the pair (stat_idlist, choice_count)
+        to the compiled index array for the id list.  This can be shared
+        by the contests with the same ResultStyle, since the arrays
+        depend only on the result stat types and the number of choices.
     """
 
-    def __init__(self, result_stat_types, choice_count):
+    def __init__(self, result_stat_types, choice_count, selector_cache=None):
         """
         Args:
           result_stat_types: an iterable of ResultStatType objects.
           choice_count: the number of choices in the contest.
+          selector_cache: an optional dict to use as the selector_cache
+            attribute, for sharing compiled id lists with other contests.
         """
+        if selector_cache is None:
+            selector_cache = {}
+
         indexes_by_id = make_indexes_by_id(result_stat_types)
 
         self.choice_count = choice_count
         self.indexes_by_id = indexes_by_id
         self.result_stat_types = result_stat_types
+        self.selector_cache = selector_cache
 
     @property
     def result_stat_count(self):
@@ -525,33 +682,74 @@ class ResultsMapping:
 
         return [self.stat_index_by_id[label_or_id]]
 
+    def compile_id_list(self, stat_idlist):
+        """
+        Convert a space-separated list of ids into a (read-only) numpy
+        array of indices.
+
+        Raises RuntimeError if the list contains ids that aren't
+        ResultStatType ids or special strings.
+        """
+        stat_ids = parse_ids_text(stat_idlist)
+
+        unknown_ids = [stat_id for stat_id in stat_ids
+                       if stat_id not in ('*', 'CHOICES') and stat_id not in self.indexes_by_id]
+        if unknown_ids:
+            known_ids = ' '.join(self.indexes_by_id)
+            msg = (f'unknown result stat ids {unknown_ids!r} in id list {stat_idlist!r} '
+                   f'(known ids: {known_ids})')
+            raise RuntimeError(msg)
+
+        indices = []
+        for label_or_id in stat_ids:
+            new_indices = self.get_indices_by_id(label_or_id)
+            indices.extend(new_indices)
+
+        index_array = np.array(indices, dtype=np.intp)
+        index_array.flags.writeable = False
+
+        return index_array
+
+    def get_index_array_by_id_list(self, stat_idlist=None):
+        """
+        Return the same indices as get_indexes_by_id_list(), but as a
+        numpy integer array suitable for selecting columns from a results
+        array in a single (vectorized) operation.
+
+        The array is cached and read-only.
+        """
+        if stat_idlist is None:
+            stat_idlist = '*'
+
+        key = (stat_idlist, self.choice_count)
+        try:
+            return self.selector_cache[key]
+        except KeyError:
+            pass
+
+        index_array = self.compile_id_list(stat_idlist)
+        self.selector_cache[key] = index_array
+
+        return index_array
+
     def get_indexes_by_id_list(self, stat_idlist=None):
         """
         Convert a space-separated list of ids into a list of indices.
 
         Map a space-separated ID list into a set of result type index values.
         The index can be used to access the result_stat_types[].header or
-        results[] value. If the id is not available, it will be skipped. The
-        value '*' will return 0..result_stat_count-1. The value 'CHOICES'
-        will insert the index values for all choices,
+        results[] value. The value '*' will return 0..result_stat_count-1.
+        The value 'CHOICES' will insert the index values for all choices,
         result_stat_count..result_stat_count+choice_count-1
 
         This routine allows an API to access the heading and result value
         for a specific set of result stat types in set order. When the
         CHOICES id is included, the stat values can be reordered before and
         after choices.
-        """
-        if stat_idlist is None:
-            stat_idlist = '*'
 
-        stat_ids = parse_ids_text(stat_idlist)
-
-        indices = []
-        for label_or_id in stat_ids:
-            new_indices = self.get_indices_by_id(label_or_id)
-            indices.extend(new_indices)
-
-        return indices
+        Raises RuntimeError if an id is not available.
+        """
+        return self.get_index_array_by_id_list(stat_idlist).tolist()
 
     def result_stats_by_id(self, stat_idlist=None):
         """
@@ -581,13 +779,35 @@ class Contest:
       header_id: id of the parent header object containing this item
         (or a falsey value for root).
       parent_header: the parent header of the item, as a Header object.
+      shard_input_dir: the input directory the contest was loaded from,
+        if the election was merged from several input directories (see
+        dataloading.load_sharded_context()).  Otherwise, None.
       results_mapping: a ResultsMapping object.
+      results: the detailed results, one row for each reporting group,
+        either as a list of lists or a 2-D numpy array, depending on the
+        election's results_store (see RESULTS_STORES).
       rcv_totals: a list of tuples, one for each round, starting with the
         first round.
+      rcv_tabulation: if the contest's RCV rounds are tabulated from a
+        ballots file (see orr.rcvtabulation), a pair (source_key,
+        rcv_totals), where source_key identifies the version of the file
+        tabulated.  Otherwise, None.
 
     Private attributes:
-      _load_contest_results_data: a function that loads the results details
-        for the contest.  The function should have signature: load(contest).
+      _load_contest_results_data: a function that loads and returns the
+        results details for the contest, as a pair (results, rcv_totals).
+        The function should have signature: load(contest).
+      _results_data: the loaded pair (results, rcv_totals), or None if not
+        loaded.  This is used only if the election has no results manager.
+      _rcv_results_cache: a pair (rcv_totals, rcv_results_by_stat_id) of
+        the RCVResults objects made from the given rcv_totals, or None.
+      _formatted_rows_cache: a dict mapping (choice_stat_idlist,
+        locale_name) to the formatted values of every results row, as
+        returned by get_formatted_rows().  This is reset when the results
+        change.
+      _results_fingerprint: the value returned by
+        get_results_fingerprint(), or None if not computed since the
+        results last changed.
 
     A Contest with type_name "office" represents an elected office where
     choices are a set of candidates.
@@ -609,6 +829,22 @@ class Contest:
     on the incumbent/candidate can be defined.
     """
 
+    __slots__ = (
+        'id', 'type_name', 'election', 'areas_by_id', 'all_voting_groups_by_id',
+        'parent_header', 'shard_input_dir', 'index', '_header_id',
+        '_load_contest_results_data', '_results_data', '_rcv_results_cache',
+        '_formatted_rows_cache', '_results_fingerprint',
+        # Attributes loaded from the election data.
+        'ballot_subtitle', 'ballot_title', 'choice_names', 'choices_by_id',
+        'instructions_text', 'is_partisan', 'number_elected', 'question_text',
+        'result_style', 'results_mapping', 'voting_district', 'type',
+        'vote_for_msg', 'writeins_allowed', 'choice_count',
+        # Attributes loaded from the contest status data, which are
+        # accessed using the properties named in CONTEST_STATUS_ATTRS.
+        '_reporting_time', '_total_precincts', '_precincts_reporting', '_rcv_rounds',
+        '_rcv_tabulation',
+    )
+
     # TODO: don't pass election.
     def __init__(self, type_name, id_=None, election=None, areas_by_id=None,
         voting_groups_by_id=None):
@@ -622,13 +858,27 @@ class Contest:
         self.all_voting_groups_by_id = voting_groups_by_id
 
         self.parent_header = None
+        self.shard_input_dir = None
 
         self.results_mapping = None
         self.rcv_rounds = 0         # Number of RCV elimination rounds loaded
+        self.rcv_tabulation = None
+
+        self._results_data = None
+        self._rcv_results_cache = None
+        self._formatted_rows_cache = {}
+        self._results_fingerprint = None
 
     def __repr__(self):
         return f'<Contest {self.type_name!r}: id={self.id!r}>'
 
+    def get_status(self):
+        """
+        Return the contest's status attributes, as a tuple, using None
+        for the attributes not loaded.
+        """
+        return tuple(getattr(self, name, None) for name in CONTEST_STATUS_ATTRS)
+
     @property
     def is_rcv(self):
         """
@@ -643,18 +893,38 @@ class Contest:
         yield from self.choices_by_id.values()
 
     @property
-    def reporting_groups(self):
+    def input_dir(self):
+        """
+        Return the directory containing the contest's input data, as a
+        Path object.
+        """
+        if self.shard_input_dir is not None:
+            return self.shard_input_dir
+
+        return self.election.input_dir
+
+    @property
+    def reporting_group_table(self):
         """
-        Create and return a list of ReportingGroup objects.
+        Return the voting district's ReportingGroupTable object.
         """
         area = self.voting_district
-        voting_groups_by_id = self.all_voting_groups_by_id
-        iterator = area.iter_reporting_groups(self.areas_by_id, voting_groups_by_id=voting_groups_by_id)
-        return list(iterator)
+        table = area.reporting_group_table
+        if table is None:
+            raise RuntimeError(f'voting district has no reporting groups for contest {self.id!r}: {area!r}')
+
+        return table
+
+    @property
+    def reporting_groups(self):
+        """
+        Return the reporting groups, as a tuple of ReportingGroup objects.
+        """
+        return self.reporting_group_table.reporting_groups
 
     @property
     def reporting_group_count(self):
-        return len(self.reporting_groups)
+        return len(self.reporting_group_table)
 
     @property
     def result_stat_count(self):
@@ -717,6 +987,81 @@ class Contest:
         """
         return self.result_style.voting_groups_from_idlist(group_idlist)
 
+    def _get_results_data(self):
+        """
+        Return the pair (results, rcv_totals), loading it if necessary.
+        """
+        buildtracking.record_input(INPUT_RESULTS, self.id)
+        manager = self.election.results_manager
+        if manager is not None:
+            return manager.get(self, load=self._load_contest_results_data)
+
+        if self._results_data is None:
+            self._results_data = self._load_contest_results_data(self)
+
+        return self._results_data
+
+    def set_results_data(self, results, rcv_totals):
+        """
+        Set already loaded results details on the contest.
+        """
+        data = (results, rcv_totals)
+        manager = self.election.results_manager
+        if manager is not None:
+            manager.put(self, data)
+        else:
+            self._results_data = data
+
+        self._formatted_rows_cache = {}
+        self._results_fingerprint = None
+        self.election.update_results_cube(self, results)
+
+    @property
+    def is_results_loaded(self):
+        """
+        Return whether the results details are currently loaded.
+        """
+        manager = self.election.results_manager
+        if manager is not None:
+            return self in manager
+
+        return self._results_data is not None
+
+    @property
+    def results(self):
+        return self._get_results_data()[0]
+
+    @property
+    def rcv_totals(self):
+        return self._get_results_data()[1]
+
+    def get_results_fingerprint(self):
+        """
+        Return a SHA-256 hash of the contest's results and RCV totals, as
+        a hexadecimal string.
+
+        The hash is the same however the results are stored.
+        """
+        fingerprint = self._results_fingerprint
+        if fingerprint is not None:
+            # Record reading the results, as when computing the hash.
+            buildtracking.record_input(INPUT_RESULTS, self.id)
+            return fingerprint
+
+        results = self.results
+        if isinstance(results, SparseResults):
+            results = results.toarray()
+        array = np.ascontiguousarray(results, dtype='<i8')
+
+        sha = hashlib.sha256()
+        sha.update(repr(array.shape).encode(UTF8_ENCODING))
+        sha.update(array.tobytes())
+        sha.update(repr(self.rcv_totals).encode(UTF8_ENCODING))
+        fingerprint = sha.hexdigest()
+        self._results_fingerprint = fingerprint
+
+        return fingerprint
+
     def load_results_details(self):
         """
         Loads the results details for the contest.
@@ -724,10 +1069,7 @@ class Contest:
         Returns '' so this can be called from templates. No action is taken
         if the details have already been loaded.
         """
-        # We use the results attribute as a marker to tell if the data
-        # has already been loaded.  Skip if already loaded.
-        if not hasattr(self, 'results'):
-            self._load_contest_results_data(self)
+        self._get_results_data()
 
         return ''
 
@@ -739,8 +1081,6 @@ class Contest:
 
         The stat_type may be a ResultStatType or Choice object.
         """
-        # Load the results if not already loaded
-        self.load_results_details()
         table = self.results_mapping
 
         if type(stat_type) == ResultStatType:
@@ -751,8 +1091,15 @@ class Contest:
             stat_index = table.get_candidate_index(stat_type)
 
         # TODO: check stat_index
-        return [self.results[i][stat_index] for i in
-                self.result_style.voting_group_indexes_from_idlist(group_idlist)]
+        row_indexes = self.result_style.voting_group_indexes_from_idlist(group_idlist)
+        buildtracking.record_input(INPUT_RESULTS, self.id)
+        cube = self.election.get_results_cube()
+        if not cube.has_contest(self):
+            # Then fill in only this contest's part of the cube, loading
+            # just its own results.
+            cube.set_contest_results(self, self.results)
+
+        return cube.get_values(self, column_index=stat_index, group_indexes=row_indexes)
 
     def get_round_stat_by_index(self, index, round_num):
         ensure_int(round_num, 'round_num')
@@ -770,18 +1117,88 @@ class Contest:
 
     def make_rcv_results(self, continuing_stat_id):
         """
+        Return an RCVResults object for the contest.
+
+        The object is cached on the contest until the contest's RCV
+        totals change, so templates rendered for each language share it.
+
         Args:
           continuing_stat_id: the id of the ResultStatType object
             corresponding to continuing ballots.
         """
+        rcv_totals = self.rcv_totals
+        if self._rcv_results_cache is None or self._rcv_results_cache[0] is not rcv_totals:
+            self._rcv_results_cache = (rcv_totals, {})
+        rcv_results_by_stat_id = self._rcv_results_cache[1]
+
+        try:
+            return rcv_results_by_stat_id[continuing_stat_id]
+        except KeyError:
+            pass
+
         # Convert the choices from a generator to a list before passing
         # to RCVResults.
         candidates = list(self.choices)
         continuing_stat = self.results_mapping.get_stat_by_id(continuing_stat_id)
-        return RCVResults(self.rcv_totals, results_mapping=self.results_mapping,
-                          candidates=candidates, continuing_stat=continuing_stat)
+        rcv_results = RCVResults(rcv_totals, results_mapping=self.results_mapping,
+                                 candidates=candidates, continuing_stat=continuing_stat)
+        rcv_results_by_stat_id[continuing_stat_id] = rcv_results
 
-    def detail_rows(self, choice_stat_idlist, reporting_groups=None):
+        return rcv_results
+
+    def get_formatted_rows(self, choice_stat_idlist, locale_name=None):
+        """
+        Return the formatted values of the given columns for every
+        results row, as a list of lists of strings.  The lists shouldn't
+        be modified.
+
+        The values don't depend on the language being rendered, so they
+        are cached and shared by the pages for each language.  However,
+        they aren't cached if the election has a results manager, so the
+        manager's budget continues to bound the memory used.
+
+        Args:
+          locale_name: the locale to use to format the numbers.  Defaults
+            to numberformat.DEFAULT_LOCALE.
+        """
+        # Record reading the results even if the rows are cached.
+        buildtracking.record_input(INPUT_RESULTS, self.id)
+        formatter = numberformat.get_formatter(locale_name)
+        key = (choice_stat_idlist, formatter.locale_name)
+        try:
+            return self._formatted_rows_cache[key]
+        except KeyError:
+            pass
+
+        results = self.results
+        if isinstance(results, SparseResults):
+            # Format only the stored rows, and share a single row for the
+            # rows that are all zeros.
+            indices = self.results_mapping.get_index_array_by_id_list(choice_stat_idlist)
+            zero_row = formatter.format_row(np.zeros(len(indices), dtype=results.dtype))
+            rows = [zero_row] * len(results)
+            formatted = formatter.format_rows(results.values[:, indices])
+            for row_index, row in zip(results.row_indexes.tolist(), formatted):
+                rows[row_index] = row
+        else:
+            if is_results_array(results):
+                # Select all of the needed cells in one operation instead of
+                # indexing into the results one cell at a time.
+                indices = self.results_mapping.get_index_array_by_id_list(choice_stat_idlist)
+                selected = results[:, indices]
+            else:
+                indices = self.results_mapping.get_indexes_by_id_list(choice_stat_idlist)
+                selected = [[results_row[i] for i in indices] for results_row in results]
+
+            rows = formatter.format_rows(selected)
+
+        if self.election.results_manager is None:
+            self._formatted_rows_cache[key] = rows
+
+        return rows
+
+    def detail_rows(self, choice_stat_idlist, reporting_groups=None, locale_name=None,
+        skip_zero_rows=False):
         """
         Yield rows of vote stat and choice values for the given reporting
         groups.
@@ -789,24 +1206,48 @@ class Contest:
         Args:
           reporting_groups: an iterable of ReportingGroup objects.  Defaults
             to all of the contest's reporting groups.
+          locale_name: the locale to use to format the numbers.  Defaults
+            to numberformat.DEFAULT_LOCALE.
+          skip_zero_rows: whether to omit the reporting groups whose
+            results are all zeros (e.g. precincts where the contest
+            wasn't on the ballot).
         """
         if reporting_groups is None:
             reporting_groups = self.reporting_groups
 
-        self.load_results_details()
+        if skip_zero_rows:
+            nonzero_mask = sparseresults.get_nonzero_mask(self.results)
+            reporting_groups = [rg for rg in reporting_groups if nonzero_mask[rg.index]]
 
-        results_mapping = self.results_mapping
-        indices = results_mapping.get_indexes_by_id_list(choice_stat_idlist)
-
-        results = self.results
+        formatted_rows = self.get_formatted_rows(choice_stat_idlist, locale_name=locale_name)
         for rg in reporting_groups:
-            results_row = results[rg.index]
             row = [rg.display()]
-            row.extend(utils.format_number(results_row[i]) for i in indices)
+            row.extend(formatted_rows[rg.index])
 
             yield row
 
 
+def _make_status_property(name):
+    """
+    Return a property for a contest status attribute that records the
+    access for the active build tracker (see orr.buildtracking).
+    """
+    slot_name = f'_{name}'
+
+    def get_value(contest):
+        buildtracking.record_input(INPUT_STATUS, contest.id)
+        return getattr(contest, slot_name)
+
+    def set_value(contest, value):
+        setattr(contest, slot_name, value)
+
+    return property(get_value, set_value)
+
+
+for _name in CONTEST_STATUS_ATTRS:
+    setattr(Contest, _name, _make_status_property(_name))
+
+
 class Election:
 
     """
@@ -820,6 +1261,13 @@ class Election:
     Instance attributes:
 
       input_dir: the directory containing the input data, as a Path object.
+      results_store: how to store each contest's detailed results in
+        memory.  This should be one of the values in RESULTS_STORES.
+      results_cache: a resultscache.ResultsCache object to use when
+        loading contest results, or None to always parse the input files.
+      results_manager: a resultsmanager.ResultsManager object that owns
+        the loaded contest results, or None to keep each contest's results
+        loaded for the whole run.
 
       ballot_title:
       date:
@@ -831,22 +1279,78 @@ class Election:
       _load_contest_status_data: a function that loads the contest results
         status data into each contest.  The function should have signature:
           load(election).
+      _results_cube: the election's resultscube.ResultsCube object, or
+        None if it hasn't been created yet (see get_results_cube()).  It
+        is filled in one contest at a time, as results are loaded.
     """
 
-    def __init__(self, input_dir):
+    def __init__(self, input_dir, results_store=None, results_cache=None,
+        results_manager=None):
         """
         Args:
           input_dir: the directory containing the input data, as a Path object.
+          results_store: one of the values in RESULTS_STORES.  Defaults
+            to RESULTS_STORE_LIST.
+          results_cache: an optional resultscache.ResultsCache object.
+          results_manager: an optional resultsmanager.ResultsManager object.
         """
-        assert input_dir is not None
-        self.input_dir = input_dir
+        self.set_run_options(input_dir, results_store=results_store,
+                             results_cache=results_cache, results_manager=results_manager)
 
         self.ballot_title = None
         self.date = None
+        self._results_cube = None
 
     def __repr__(self):
         return f'<Election ballot_title={i18n_repr(self.ballot_title)} election_date={self.date!r}>'
 
+    def __getstate__(self):
+        # The cache and manager belong to the current run, so don't
+        # include them when pickling (e.g. for a model snapshot).
+        state = self.__dict__.copy()
+        state.update(results_cache=None, results_manager=None, _results_cube=None)
+
+        return state
+
+    def set_run_options(self, input_dir, results_store=None, results_cache=None,
+        results_manager=None):
+        """
+        Set the attributes that depend on the current run rather than on
+        election.json.
+
+        This is also called when restoring an election from a model
+        snapshot.  See the __init__() docstring for the arguments.
+        """
+        assert input_dir is not None
+        if results_store is None:
+            results_store = RESULTS_STORE_LIST
+        if results_store not in RESULTS_STORES:
+            raise ValueError(f'invalid results_store: {results_store!r}')
+
+        self.input_dir = input_dir
+        self.results_cache = results_cache
+        self.results_manager = results_manager
+        self.results_store = results_store
+
+    def get_results_cube(self):
+        """
+        Return the election's ResultsCube object, creating it if necessary.
+
+        Creating the cube doesn't load any contest's results.  Contests
+        whose results haven't been set or looked up yet aren't filled in
+        (see ResultsCube.has_contest()).
+        """
+        if self._results_cube is None:
+            self._results_cube = ResultsCube(self.contests)
+
+        return self._results_cube
+
+    def update_results_cube(self, contest, results):
+        """
+        Copy a contest's newly set results into the results cube.
+        """
+        self.get_results_cube().set_contest_results(contest, results)
+
     # Also expose the dict values as an (ordered) list, for convenience.
     @property
     def headers(self):
@@ -892,6 +1396,15 @@ class Election:
         if hasattr(self, '_contest_status_loaded'):
             return ''
 
+        return self.reload_contest_statuses()
+
+    def reload_contest_statuses(self):
+        """
+        Load the contest results status data into each contest, even if
+        it was already loaded (e.g. because the status file changed).
+
+        Returns ''.
+        """
         self._load_contest_status_data(self)
 
         self._contest_status_loaded = True
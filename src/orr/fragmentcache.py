@@ -0,0 +1,321 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Support for caching rendered template fragments.
+
+The "cache" tag renders the block it encloses once for each distinct
+cache key, and reuses the rendered text after that, e.g.--
+
+    {% cache "summary-results", contest %}
+      ...
+    {% endcache %}
+
+The key is made of the tag's arguments, the current language (i.e.
+options.lang), whether the output is autoescaped, and a hash of the
+block's contents (so the same block rendered from several templates
+shares its entries).  An argument that is a Contest object contributes
+a fingerprint of the contest's results and status rather than just its
+id, so a fragment is rendered again when the contest's results change.
+Any other values the block depends on (e.g. a loop variable) should be
+passed as arguments.
+
+A FragmentCache object keeps the rendered fragments in memory, and also
+on disk so that later runs (and the render worker processes) can reuse
+them.  The disk entries are stored under a "namespace" that changes
+whenever ORR's code (e.g. after an upgrade), election.json, or any
+template changes (see make_namespace()).  If no FragmentCache is in use (see
+get_fragment_cache()), the tag simply renders its block.
+
+Since a cached fragment is rendered without accessing the model, the
+build tracker inputs recorded while first rendering a fragment are
+stored with it and recorded again each time it is reused (see
+orr.buildtracking).
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import shutil
+
+import jinja2
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+import orr.buildtracking as buildtracking
+from orr.datamodel import Contest
+import orr.utils as utils
+
+
+_log = logging.getLogger(__name__)
+
+FRAGMENT_FILE_SUFFIX = '.json'
+
+# The types of the tag arguments that can be used as is in a key.
+_KEY_VALUE_TYPES = (str, int, float, bool, type(None))
+
+
+def get_fragment_cache(env):
+    """
+    Return the FragmentCache object for a Jinja2 Environment, or None if
+    fragments shouldn't be cached.
+    """
+    return env.globals['options'].fragment_cache
+
+
+def _hash_strings(strings):
+    sha = hashlib.sha256()
+    for text in strings:
+        sha.update(text.encode(utils.UTF8_ENCODING))
+        # Separate the strings so different splits hash differently.
+        sha.update(b'\0')
+
+    return sha.hexdigest()
+
+
+def make_namespace(env, election_paths, version):
+    """
+    Return the namespace to store fragments on disk under, as a string.
+
+    Args:
+      env: the Jinja2 Environment object.
+      election_paths: the paths to the election.json files.
+      version: the program version.
+    """
+    # Include a hash of ORR's source files since the program version
+    # doesn't change with every change to e.g. the filters or model.
+    strings = [version, utils.get_package_source_hash(), jinja2.__version__]
+    for path in election_paths:
+        strings.append(utils.hash_file(path))
+    for name in env.list_templates():
+        try:
+            source = env.loader.get_source(env, name)[0]
+        except UnicodeDecodeError:
+            # Then the file isn't a template (e.g. an image).
+            continue
+        strings.extend((name, source))
+
+    return _hash_strings(strings)[:16]
+
+
+def _make_key_part(value):
+    """
+    Return the string to use in a fragment key for a tag argument.
+    """
+    if isinstance(value, Contest):
+        status = buildtracking.hash_json(value.get_status())
+        return f'contest:{value.id}:{value.get_results_fingerprint()}:{status}'
+
+    if isinstance(value, (list, tuple)):
+        parts = ','.join(_make_key_part(item) for item in value)
+        return f'[{parts}]'
+
+    if isinstance(value, _KEY_VALUE_TYPES):
+        return repr(value)
+
+    # Otherwise, use the object's id (e.g. for a Header or Area object),
+    # since the rest of the model comes from election.json.
+    try:
+        return f'{type(value).__name__}:{value.id}'
+    except AttributeError:
+        raise RuntimeError(f'unsupported value in cache tag key: {value!r}')
+
+
+class FragmentCache:
+
+    """
+    Stores rendered template fragments in memory and on disk.
+
+    Instance attributes:
+
+      cache_dir: the directory containing the fragment files of the
+        namespace, as a Path object, or None to keep fragments only in
+        memory.
+      hits: the number of fragments found in memory.
+      disk_hits: the number of fragments found on disk.
+      misses: the number of fragments that needed rendering.
+    """
+
+    def __init__(self, cache_dir=None, namespace=None, rebuild=False):
+        """
+        Args:
+          cache_dir: the directory in which to store fragments on disk,
+            or None to keep fragments only in memory.
+          namespace: the namespace to store the fragments under (see
+            make_namespace()).  Required if cache_dir is given.
+          rebuild: whether to delete the existing fragment files.
+        """
+        if cache_dir is not None:
+            cache_dir = Path(cache_dir)
+            if rebuild and cache_dir.exists():
+                shutil.rmtree(cache_dir)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            # Delete the fragments of other namespaces, since they were
+            # rendered from different templates or election data.
+            for path in cache_dir.iterdir():
+                if path.is_dir() and path.name != namespace:
+                    _log.debug(f'deleting stale fragment cache directory: {path}')
+                    shutil.rmtree(path, ignore_errors=True)
+            cache_dir = cache_dir / namespace
+            cache_dir.mkdir(exist_ok=True)
+
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        # A dict mapping key to the pair (text, input_keys).
+        self._fragments = {}
+
+    def __repr__(self):
+        return f'<FragmentCache {self.cache_dir}: {self.format_stats()}>'
+
+    def format_stats(self):
+        return f'hits={self.hits}, disk_hits={self.disk_hits}, misses={self.misses}'
+
+    def make_key(self, body_hash, args, lang, autoescape):
+        """
+        Return the key of a fragment, as a string.
+
+        Args:
+          body_hash: a hash of the contents of the block.
+          args: the arguments passed to the tag.
+          lang: the current language.
+          autoescape: whether the output is autoescaped.
+        """
+        strings = [body_hash, lang, str(autoescape)]
+        strings.extend(_make_key_part(arg) for arg in args)
+
+        return _hash_strings(strings)
+
+    def _get_path(self, key):
+        return self.cache_dir / f'{key}{FRAGMENT_FILE_SUFFIX}'
+
+    def _read_fragment(self, key):
+        """
+        Return the pair (text, input_keys) stored on disk, or None.
+        """
+        if self.cache_dir is None:
+            return None
+
+        path = self._get_path(key)
+        try:
+            with path.open(encoding=utils.UTF8_ENCODING) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            _log.warning(f'error reading fragment cache file {path}: {exc}')
+            return None
+
+        return (data['text'], data['inputs'])
+
+    def _write_fragment(self, key, text, input_keys):
+        if self.cache_dir is None:
+            return
+
+        path = self._get_path(key)
+        # Write to a temporary file first so other processes never see a
+        # partially written file.
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        data = dict(text=text, inputs=input_keys)
+        try:
+            with temp_path.open('w', encoding=utils.UTF8_ENCODING) as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError as exc:
+            # Not being able to write to the cache shouldn't stop a run.
+            _log.warning(f'error writing fragment cache file {path}: {exc}')
+
+    def render(self, key, render_block):
+        """
+        Return the text of a fragment, rendering it if necessary.
+
+        Args:
+          key: the key of the fragment (see make_key()).
+          render_block: a function that renders the fragment, and returns
+            its text.
+        """
+        fragment = self._fragments.get(key)
+        if fragment is not None:
+            self.hits += 1
+        else:
+            fragment = self._read_fragment(key)
+            if fragment is not None:
+                self.disk_hits += 1
+                self._fragments[key] = fragment
+
+        if fragment is not None:
+            text, input_keys = fragment
+            buildtracking.record_input_keys(input_keys)
+            return text
+
+        self.misses += 1
+        with buildtracking.capturing_inputs() as input_keys:
+            text = str(render_block())
+        input_keys = sorted(input_keys or ())
+
+        self._fragments[key] = (text, input_keys)
+        self._write_fragment(key, text, input_keys)
+
+        return text
+
+
+class FragmentCacheExtension(Extension):
+
+    """
+    A Jinja2 extension providing the "cache" tag (see the module
+    docstring).
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        # The repr of the nodes depends only on the block's contents.
+        body_hash = _hash_strings(repr(node) for node in body)
+
+        call_args = [nodes.Const(body_hash), nodes.List(args), nodes.ContextReference()]
+        call = self.call_method('_render_fragment', call_args)
+
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_fragment(self, body_hash, args, context, caller):
+        cache = get_fragment_cache(self.environment)
+        if cache is None:
+            return caller()
+
+        autoescape = context.eval_ctx.autoescape
+        lang = self.environment.globals['options'].lang
+        key = cache.make_key(body_hash, args, lang=lang, autoescape=autoescape)
+        text = cache.render(key, caller)
+
+        # The text is already escaped if the output is autoescaped, and
+        # otherwise it isn't escaped anyway.
+        return Markup(text)
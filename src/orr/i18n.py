@@ -0,0 +1,136 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Support for sharing identical i18n text across the data model.
+
+An election's input data repeats the same i18n text many times, e.g.
+the "Yes" and "No" titles of measure choices, and candidate party
+preferences.  When loading, each i18n value is interned, so equal
+values share a single, immutable I18nText object (and equal strings a
+single string object).
+
+Each language is assigned a "slot" (an index) the first time it is
+seen, and an I18nText object also stores its texts by slot.  Slots are
+only ever added, so a language's slot never changes within a process.
+"""
+
+import sys
+import threading
+import weakref
+
+
+# A dict mapping language code to slot index.
+_lang_slots = {}
+_lang_slots_lock = threading.Lock()
+
+# A mapping from the (sorted) items of an i18n dict to its I18nText
+# object.  The values are weak references so that unused objects are
+# freed, e.g. after a model is discarded.
+_interned = weakref.WeakValueDictionary()
+
+
+def get_lang_slot(lang):
+    """
+    Return the slot index for a language, assigning one if necessary.
+    """
+    try:
+        return _lang_slots[lang]
+    except KeyError:
+        pass
+
+    with _lang_slots_lock:
+        return _lang_slots.setdefault(lang, len(_lang_slots))
+
+
+class I18nText(dict):
+
+    """
+    An immutable dict mapping language code to text.
+
+    Instances should be created using intern_i18n().
+    """
+
+    __slots__ = ('_texts', '__weakref__')
+
+    def __init__(self, texts_by_lang):
+        super().__init__(texts_by_lang)
+
+        slots = [get_lang_slot(lang) for lang in self]
+        texts = [None] * (max(slots) + 1 if slots else 0)
+        for slot, text in zip(slots, self.values()):
+            texts[slot] = text
+        # A tuple of the texts, indexed by language slot, with None for
+        # any missing languages.
+        self._texts = tuple(texts)
+
+    def __reduce__(self):
+        # Intern again when unpickling, since the slots can differ in
+        # another process.
+        return (intern_i18n, (dict(self), ))
+
+    def _raise_immutable(self, *args, **kwargs):
+        raise TypeError(f'I18nText object is immutable: {self!r}')
+
+    __setitem__ = _raise_immutable
+    __delitem__ = _raise_immutable
+    clear = _raise_immutable
+    pop = _raise_immutable
+    popitem = _raise_immutable
+    setdefault = _raise_immutable
+    update = _raise_immutable
+
+    def get_text(self, lang):
+        """
+        Return the text for the given language, or None if there is
+        no translation for the language.
+        """
+        try:
+            return self._texts[_lang_slots[lang]]
+        except (KeyError, IndexError):
+            return None
+
+
+def intern_i18n(value):
+    """
+    Return the interned version of an i18n value.
+
+    Args:
+      value: an i18n value from the input data: either a dict mapping
+        language code to text, or a string.  Other values are returned
+        unchanged.
+    """
+    if type(value) == str:
+        return sys.intern(value)
+
+    if type(value) != dict:
+        return value
+
+    if not all(type(text) == str for text in value.values()):
+        return value
+
+    key = tuple(sorted(value.items()))
+    i18n_text = _interned.get(key)
+    if i18n_text is None:
+        i18n_text = I18nText((sys.intern(lang), sys.intern(text))
+                             for lang, text in value.items())
+        i18n_text = _interned.setdefault(key, i18n_text)
+
+    return i18n_text
@@ -35,15 +35,28 @@ from pathlib import Path
 from pprint import pprint
 import re
 import sys
+import time
 
 from jinja2 import TemplateSyntaxError
 import yaml
 
+import orr.buildtracking as buildtracking
+from orr.buildtracking import BuildTracker
 import orr.configlib as configlib
 import orr.dataloading as dataloading
+import orr.fragmentcache as fragmentcache
+from orr.fragmentcache import FragmentCache
+from orr.datamodel import RESULTS_STORE_LIST, RESULTS_STORES
+from orr.modelsnapshot import ModelSnapshotCache
+from orr.renderscheduler import RenderScheduler
+from orr.resultscache import (CACHE_MODE_BYPASS, CACHE_MODE_REBUILD, CACHE_MODE_USE,
+    CACHE_MODES, ResultsCache)
+from orr.resultsmanager import ResultsManager
+from orr.tailing import ResultsTailer
+from orr.templatecache import TemplateCache, precompile_templates
 import orr.templating as templating
 import orr.utils as utils
-from orr.utils import DEFAULT_JSON_DUMPS_ARGS, SHA256SUMS_FILENAME, US_LOCALE
+from orr.utils import DEFAULT_JSON_DUMPS_ARGS, SHA256SUMS_FILENAME
 
 
 _log = logging.getLogger(__name__)
@@ -53,6 +66,24 @@ VERSION='0.0.1'     # Program version
 DEFAULT_OUTPUT_PARENT_DIR = '_build'
 DEFAULT_TEMPLATE_DIR = 'templates'
 
+# The name of the default cache directory, inside the output parent.
+DEFAULT_CACHE_DIR_NAME = '.orr-cache'
+# The name of the results cache directory, inside the cache directory.
+RESULTS_CACHE_DIR_NAME = 'results'
+# The name of the model snapshot directory, inside the cache directory.
+SNAPSHOT_DIR_NAME = 'model'
+# The name of the compiled template cache directory, inside the cache
+# directory.
+TEMPLATE_CACHE_DIR_NAME = 'templates'
+# The name of the rendered fragment cache directory, inside the cache
+# directory.
+FRAGMENT_CACHE_DIR_NAME = 'fragments'
+
+# The commands that can be passed as the first command-line argument.
+COMMAND_RENDER = 'render'
+COMMAND_PRECOMPILE = 'precompile'
+COMMANDS = (COMMAND_RENDER, COMMAND_PRECOMPILE)
+
 ENCODING='utf-8'
 
 
@@ -65,15 +96,26 @@ Generate HTML/PDF/XLS files from election results data.
 
 The path to the output directory is written to stdout at the end
 of the script.
+
+The "precompile" command instead compiles the templates in the template
+directories into the compiled template cache, so later runs passing
+"--compiled-template-cache use" don't need to compile them.
 """
 
-def parse_args():
+def parse_args(args=None):
     """
-    Parse sys.argv and return a Namespace object.
+    Parse the command-line arguments and return a Namespace object.
+
+    Args:
+      args: the arguments to parse, as a list of strings.  Defaults to
+        sys.argv[1:].
     """
     parser = argparse.ArgumentParser(description=DESCRIPTION,
                     formatter_class=argparse.RawDescriptionHelpFormatter)
 
+    parser.add_argument('command', nargs='?', choices=COMMANDS, default=COMMAND_RENDER,
+                        help=('the command to run, which must come before any '
+                              f'options. Defaults to: {COMMAND_RENDER}.'))
     parser.add_argument('--version', action='version', version='%(prog)s '+VERSION)
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='enable verbose info printout')
@@ -83,14 +125,74 @@ def parse_args():
     parser.add_argument('--config-path', '-c', dest='config_path', metavar='PATH',
                         help='path to the configuration file to use')
     parser.add_argument('--input-paths', metavar='PATH', nargs='+',
-                        help=('paths to files containing election data '
-                              '(e.g. in json format).'))
+                        help=('paths to the directories containing the election '
+                              'data. Several directories (e.g. one per county) '
+                              'are loaded in parallel and merged.'))
     parser.add_argument('--build-time', metavar='DATETIME',
                         help=('the datetime to use as the build time, '
                               'in the format "2018-06-01 20:48:12". '
                               'Defaults to the current datetime.'))
     parser.add_argument('--deterministic', action='store_true',
                         help='make PDF generation deterministic.')
+    parser.add_argument('--results-store', choices=RESULTS_STORES,
+                        default=RESULTS_STORE_LIST,
+                        help=('how to store each contest\'s detailed results '
+                              'in memory: as lists of ints ("list"), or as a '
+                              'single 2-D integer array per contest ("array"). '
+                              f'Defaults to: {RESULTS_STORE_LIST}.'))
+    parser.add_argument('--results-cache', choices=CACHE_MODES, default=CACHE_MODE_BYPASS,
+                        help=('how to use the binary cache of parsed results files: '
+                              'read and update it ("use"), ignore it entirely '
+                              '("bypass"), or discard and rewrite it ("rebuild"). '
+                              f'Defaults to: {CACHE_MODE_BYPASS}.'))
+    parser.add_argument('--model-snapshot', choices=CACHE_MODES, default=CACHE_MODE_BYPASS,
+                        help=('how to use the snapshot of the data model loaded '
+                              'from election.json: read and update it ("use"), '
+                              'ignore it entirely ("bypass"), or discard and '
+                              f'rewrite it ("rebuild"). Defaults to: {CACHE_MODE_BYPASS}.'))
+    parser.add_argument('--compiled-template-cache', choices=CACHE_MODES,
+                        help=('how to use the cache of compiled templates: '
+                              'read and update it ("use"), ignore it ("bypass"), or '
+                              'clear it first ("rebuild"). Defaults to: '
+                              f'{CACHE_MODE_BYPASS}, or {CACHE_MODE_USE} for the '
+                              f'{COMMAND_PRECOMPILE} command.'))
+    parser.add_argument('--fragment-cache', choices=CACHE_MODES, default=CACHE_MODE_BYPASS,
+                        help=('how to use the cache of the template blocks rendered '
+                              'by the "cache" tag: read and update it ("use"), '
+                              'render every block ("bypass"), or clear it first '
+                              f'("rebuild"). Defaults to: {CACHE_MODE_BYPASS}.'))
+    parser.add_argument('--incremental', action='store_true',
+                        help=('render only the output files whose inputs changed '
+                              'since the previous run with the same cache directory, '
+                              'and copy the others from that run\'s output directory.'))
+    parser.add_argument('--load-workers', metavar='N', type=int,
+                        help=('parse all of the results files up front, in '
+                              'parallel, using N worker processes. With '
+                              '--tail-interval, this parallelizes the results files '
+                              'read from the start. Defaults to loading each '
+                              'contest\'s results when first needed.'))
+    parser.add_argument('--render-workers', metavar='N', type=int,
+                        help=('render the subtemplates called from the top-level '
+                              'templates (e.g. one per language) in parallel, '
+                              'using N worker processes. Defaults to rendering '
+                              'serially.'))
+    parser.add_argument('--tail-interval', metavar='SECONDS', type=float,
+                        help=('after rendering, keep running and check the input '
+                              'files every SECONDS seconds, reading only the rows '
+                              'appended to the results files and re-rendering '
+                              'when any contest changed. A contest keeps its '
+                              'previous results while its results file is '
+                              'incomplete, and the first render waits until '
+                              'every results file is complete. Stop with Ctrl-C.'))
+    parser.add_argument('--results-memory-budget', metavar='MB', type=float,
+                        help=('bound the memory used by loaded contest results '
+                              'to about MB megabytes, evicting the least recently '
+                              'used contests\' results and reloading them as needed. '
+                              'Defaults to keeping all loaded results in memory.'))
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help=('the directory in which to store cached data. '
+                              'Defaults to a directory named '
+                              f'{DEFAULT_CACHE_DIR_NAME} inside the output parent.'))
     parser.add_argument('--template-dir', metavar='DIR', default=DEFAULT_TEMPLATE_DIR,
                         help=('directory containing the template files to render. '
                               f'Defaults to: {DEFAULT_TEMPLATE_DIR}.'))
@@ -108,7 +210,7 @@ def parse_args():
                         help=('require that the output parent not already exist. '
                               'This is for running inside a Docker container.'))
 
-    ns = parser.parse_args()
+    ns = parser.parse_args(args)
 
     return ns
 
@@ -274,6 +376,12 @@ def render_template_dir(template_dir, output_dir, env, context=None, test_mode=F
             continue
 
         file_name = template_path.name
+        tracker = buildtracking.get_tracker()
+        if tracker is not None and not test_mode:
+            params = tracker.make_params(template=file_name)
+            if tracker.reuse_output(file_name, params=params):
+                continue
+
         utils.process_template(env, template_name=file_name, rel_output_path=file_name,
             context=context, test_mode=test_mode)
 
@@ -289,13 +397,135 @@ def make_sha256sums_file(dir_path):
     sha256sums_path.write_text(contents)
 
 
+def wait_for_input(tailer, interval):
+    """
+    Read the input files for the first time, waiting until every contest's
+    results file is complete and valid.
+
+    An error reading the input files is logged, and the files are checked
+    again after the next interval, since an input file may have been
+    caught while being written.
+
+    Args:
+      tailer: a tailing.ResultsTailer object whose update() method
+        hasn't been called yet.
+      interval: the number of seconds to wait between checks.
+    """
+    while True:
+        try:
+            tailer.update()
+        except Exception:
+            _log.exception('error reading the input files (trying again)')
+        else:
+            contests = tailer.get_incomplete_contests()
+            if not contests:
+                return
+            contest_ids = ', '.join(contest.id for contest in contests)
+            _log.info(f'waiting for the results files of contests: {contest_ids}')
+
+        time.sleep(interval)
+
+
+def tail_input(tailer, interval, render):
+    """
+    Render the output again each time a contest's input data changes,
+    until interrupted.  An error reading the input files is logged, and
+    the files are checked again after the next interval.
+
+    Args:
+      tailer: a tailing.ResultsTailer object whose update() method has
+        already been called once.
+      interval: the number of seconds to wait between checks.
+      render: a function with no arguments that renders the output.
+    """
+    _log.info(f'checking the input files every {interval} seconds')
+    try:
+        while True:
+            time.sleep(interval)
+            try:
+                changed = tailer.update()
+            except Exception:
+                # Keep the previous output, and try again next time, since
+                # an input file may have been caught while being written.
+                _log.exception('error checking the input files (keeping the previous output)')
+                continue
+            if not changed:
+                continue
+
+            contest_ids = ', '.join(contest.id for contest in changed)
+            _log.info(f'rendering again for changed contests: {contest_ids}')
+            render()
+    except KeyboardInterrupt:
+        _log.info(f'stopped checking the input files ({tailer.full_reads} full reads, '
+                  f'{tailer.partial_reads} partial reads)')
+
+
+def make_template_cache(cache_dir, mode):
+    """
+    Return the templatecache.TemplateCache object to use, or None.
+
+    Args:
+      cache_dir: the directory in which to store cached data.
+      mode: one of the values in resultscache.CACHE_MODES.
+    """
+    if mode == CACHE_MODE_BYPASS:
+        return None
+
+    rebuild = (mode == CACHE_MODE_REBUILD)
+
+    return TemplateCache(Path(cache_dir) / TEMPLATE_CACHE_DIR_NAME, rebuild=rebuild)
+
+
+def precompile(template_dirs, cache_dir, template_cache_mode=None):
+    """
+    Compile the templates in the given directories into the compiled
+    template cache, so later runs don't need to compile them.
+
+    Args:
+      template_dirs: the directories to search for templates, as a list
+        of path-like objects.
+      cache_dir: the directory in which to store cached data.
+      template_cache_mode: CACHE_MODE_USE (the default) to compile only
+        templates not already cached, or CACHE_MODE_REBUILD to compile
+        every template.
+    """
+    if template_cache_mode is None:
+        template_cache_mode = CACHE_MODE_USE
+    if template_cache_mode == CACHE_MODE_BYPASS:
+        raise RuntimeError('the template cache can\'t be bypassed when precompiling')
+
+    template_cache = make_template_cache(cache_dir, mode=template_cache_mode)
+    # The output directory isn't used since nothing is rendered.
+    env = configlib.create_jinja_env(output_dir=cache_dir, template_dirs=template_dirs,
+                                     bytecode_cache=template_cache)
+    names = precompile_templates(env)
+
+    _log.info(f'template cache: hits={template_cache.hits}, misses={template_cache.misses}')
+    _log.info(f'templates: {env.compile_timer.format_stats()}')
+
+    output_data = dict(
+        cache_dir=str(template_cache.cache_dir),
+        compiled=env.compile_timer.count,
+        templates=len(names),
+    )
+    output = json.dumps(output_data, **DEFAULT_JSON_DUMPS_ARGS)
+    print(output)
+
+    return output_data
+
+
 def run(config_path=None, input_paths=None, template_dir=None,
     extra_template_dirs=None, output_parent=None, output_dir_name=None,
-    fresh_output=False, test_mode=False, build_time=None, deterministic=None):
+    fresh_output=False, test_mode=False, build_time=None, deterministic=None,
+    results_store=None, results_cache_mode=None, cache_dir=None, load_workers=None,
+    results_memory_budget=None, snapshot_mode=None, tail_interval=None, render_workers=None,
+    template_cache_mode=None, fragment_cache_mode=None, incremental=False):
     """
     Args:
       config_path: optional path to the config file, as a string.
-      input_paths: paths to the election data files, as a list of strings.
+      input_paths: paths to the input directories, as a list of strings.
+        If more than one is given, the directories are loaded in parallel
+        and merged into a single election.
       template_dir: a directory containing the templates to render.
       extra_template_dirs: optional extra directories to search for
         templates (e.g. for the subtemplate tag).  This should be a list
@@ -306,15 +536,56 @@ def run(config_path=None, input_paths=None, template_dir=None,
         datetime.
       build_time: this is exposed to permit reproducible builds more easily.
       deterministic: for deterministic PDF generation.  Defaults to False.
+      results_store: how to store contest results in memory.  This should
+        be one of the values in datamodel.RESULTS_STORES.
+      results_cache_mode: one of the values in resultscache.CACHE_MODES.
+        Defaults to CACHE_MODE_BYPASS.
+      cache_dir: the directory in which to store cached data.  Defaults
+        to a directory inside the output parent.
+      load_workers: if given, the number of worker processes to use to
+        parse all of the results files before rendering.
+      results_memory_budget: if given, the approximate number of bytes
+        of contest results to keep in memory at once.
+      snapshot_mode: how to use the model snapshot cache.  This should be
+        one of the values in resultscache.CACHE_MODES.  Defaults to
+        CACHE_MODE_BYPASS.
+      tail_interval: if given, the number of seconds to wait between
+        checks of the input files for changes after rendering.  Each time
+        a contest changes, the output is rendered again.  This continues
+        until interrupted (e.g. with Ctrl-C).
+      render_workers: if given, the number of worker processes to use to
+        render subtemplates in parallel.
+      template_cache_mode: how to use the compiled template cache.  This
+        should be one of the values in resultscache.CACHE_MODES.  Defaults
+        to CACHE_MODE_BYPASS.
+      fragment_cache_mode: how to use the cache of the blocks rendered by
+        the "cache" template tag.  This should be one of the values in
+        resultscache.CACHE_MODES.  Defaults to CACHE_MODE_BYPASS.
+      incremental: whether to render only the output files whose inputs
+        changed since the previous run with the same cache directory,
+        carrying the others forward (see orr.buildtracking).
     """
+    start_time = time.perf_counter()
+
     if input_paths is None:
         input_paths = []
     if extra_template_dirs is None:
         extra_template_dirs = []
     if output_parent is None:
         output_parent = DEFAULT_OUTPUT_PARENT_DIR
+    # When tailing, a build time that wasn't given is updated each time
+    # the output is rendered again.
+    is_build_time_fixed = build_time is not None
     if build_time is None:
         build_time = datetime.now()
+    if results_cache_mode is None:
+        results_cache_mode = CACHE_MODE_BYPASS
+    if snapshot_mode is None:
+        snapshot_mode = CACHE_MODE_BYPASS
+    if template_cache_mode is None:
+        template_cache_mode = CACHE_MODE_BYPASS
+    if fragment_cache_mode is None:
+        fragment_cache_mode = CACHE_MODE_BYPASS
 
     if output_dir_name is None:
         output_dir_name = generate_output_name(build_time)
@@ -336,6 +607,30 @@ def run(config_path=None, input_paths=None, template_dir=None,
     output_dir = output_parent / output_dir_name
     _log.debug(f'using output directory: {output_dir}')
 
+    if cache_dir is None:
+        cache_dir = output_parent / DEFAULT_CACHE_DIR_NAME
+    cache_dir = Path(cache_dir)
+
+    if results_cache_mode == CACHE_MODE_BYPASS:
+        results_cache = None
+    else:
+        rebuild = (results_cache_mode == CACHE_MODE_REBUILD)
+        results_cache = ResultsCache(cache_dir / RESULTS_CACHE_DIR_NAME, rebuild=rebuild)
+
+    if snapshot_mode == CACHE_MODE_BYPASS:
+        snapshot_cache = None
+    else:
+        rebuild = (snapshot_mode == CACHE_MODE_REBUILD)
+        snapshot_cache = ModelSnapshotCache(cache_dir / SNAPSHOT_DIR_NAME, version=VERSION,
+                                            rebuild=rebuild)
+
+    template_cache = make_template_cache(cache_dir, mode=template_cache_mode)
+
+    if results_memory_budget is None:
+        results_manager = None
+    else:
+        results_manager = ResultsManager(max_bytes=results_memory_budget)
+
     # Create the jinja environment
     # Convert the path to an absolute paths to simplify troubleshooting.
     template_dir = Path(template_dir)
@@ -343,29 +638,121 @@ def run(config_path=None, input_paths=None, template_dir=None,
 
     template_dirs = [template_dir] + extra_template_dirs
     env = configlib.create_jinja_env(output_dir=output_dir, template_dirs=template_dirs,
-                                     deterministic=deterministic)
-
-    if len(input_paths) != 1:
-        raise RuntimeError(f'only one input path can be provided: {input_paths}')
-    input_dir = Path(input_paths[0])
-    if not input_dir.is_dir():
-        raise RuntimeError(f'input path is not a directory: {input_path}')
-    context = dataloading.load_context(input_dir, build_time=build_time)
+                                     deterministic=deterministic, bytecode_cache=template_cache)
+
+    if not input_paths:
+        raise RuntimeError('no input paths provided')
+    input_dirs = [Path(input_path) for input_path in input_paths]
+    for input_dir in input_dirs:
+        if not input_dir.is_dir():
+            raise RuntimeError(f'input path is not a directory: {input_dir}')
+
+    load_kwargs = dict(build_time=build_time, results_store=results_store,
+                       results_cache=results_cache, results_manager=results_manager,
+                       snapshot_cache=snapshot_cache)
+    if len(input_dirs) == 1:
+        context = dataloading.load_context(input_dirs[0], **load_kwargs)
+    else:
+        context = dataloading.load_sharded_context(input_dirs, **load_kwargs)
+
+    election = context['election']
+    if tail_interval is not None:
+        # The tailer reads the results files itself, using the workers
+        # for the files it reads from the start.
+        tailer = ResultsTailer(election, workers=load_workers)
+        wait_for_input(tailer, interval=tail_interval)
+    elif load_workers:
+        # The contest statuses are needed to parse the results files.
+        election.load_contest_statuses()
+        dataloading.preload_all_results(election, workers=load_workers)
 
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # TODO: allow different locales to be used (e.g. the system's default
-    #  locale and/or a locale passed in via the command-line)?
-    with utils.changing_locale(US_LOCALE):
-        render_template_dir(template_dir, output_dir=output_dir, env=env,
-            context=context, test_mode=test_mode)
+    manifest_path = cache_dir / buildtracking.MANIFEST_FILE_NAME
+    election_paths = [utils.find_input_path(input_dir / 'election.json')
+                      for input_dir in input_dirs]
 
-    make_sha256sums_file(output_dir)
+    if fragment_cache_mode == CACHE_MODE_BYPASS:
+        fragment_cache = None
+    else:
+        rebuild = (fragment_cache_mode == CACHE_MODE_REBUILD)
+        namespace = fragmentcache.make_namespace(env, election_paths=election_paths,
+                                                 version=VERSION)
+        fragment_cache = FragmentCache(cache_dir / FRAGMENT_CACHE_DIR_NAME,
+                                       namespace=namespace, rebuild=rebuild)
+        env.globals['options']['fragment_cache'] = fragment_cache
+
+    # The BuildTracker object of the most recent render, if incremental.
+    tracker = None
+
+    def render():
+        nonlocal tracker
+        if incremental:
+            tracker = BuildTracker(manifest_path, output_dir=output_dir, env=env,
+                                   context=context, election_paths=election_paths,
+                                   version=VERSION)
+            with buildtracking.tracking(tracker):
+                render_output()
+            tracker.write_manifest()
+            _log.info(f'incremental build: rebuilt {len(tracker.rebuilt)} outputs, '
+                      f'carried forward {len(tracker.carried)}')
+        else:
+            render_output()
+
+        make_sha256sums_file(output_dir)
+
+    def render_output():
+        # Numbers are formatted using numberformat.DEFAULT_LOCALE, without
+        # changing the process's locale.
+        # TODO: allow different locales to be used (e.g. passed in via the
+        #  command-line)?
+        if render_workers:
+            # Create a new scheduler each time so the worker processes are
+            # forked from the current model (e.g. when tailing).
+            scheduler = RenderScheduler(env, context=context, workers=render_workers)
+            env.globals['options']['render_scheduler'] = scheduler
+            try:
+                render_template_dir(template_dir, output_dir=output_dir, env=env,
+                    context=context, test_mode=test_mode)
+            finally:
+                env.globals['options']['render_scheduler'] = None
+                scheduler.shutdown()
+        else:
+            render_template_dir(template_dir, output_dir=output_dir, env=env,
+                context=context, test_mode=test_mode)
+
+    render()
+
+    if tail_interval is not None:
+        def render_again():
+            if not is_build_time_fixed:
+                context['build_time'] = datetime.now()
+            render()
+
+        tail_input(tailer, interval=tail_interval, render=render_again)
+        build_time = context['build_time']
+
+    if snapshot_cache is not None:
+        _log.info(f'model snapshot: hits={snapshot_cache.hits}, misses={snapshot_cache.misses}')
+    if results_cache is not None:
+        _log.info(f'results cache: hits={results_cache.hits}, misses={results_cache.misses}')
+    if results_manager is not None:
+        _log.info(f'results memory: {results_manager.format_stats()}')
+    if template_cache is not None:
+        _log.info(f'template cache: hits={template_cache.hits}, misses={template_cache.misses}')
+    # These don't include the fragments and templates of render worker
+    # processes.
+    if fragment_cache is not None:
+        _log.info(f'fragment cache: {fragment_cache.format_stats()}')
+    total_seconds = time.perf_counter() - start_time
+    _log.info(f'templates: {env.compile_timer.format_stats(total_seconds=total_seconds)}')
 
     output_data = dict(
         build_time=build_time.isoformat(),
         output_dir=str(output_dir),
     )
+    if tracker is not None:
+        output_data['rebuilt'] = sorted(tracker.rebuilt)
 
     # TODO: allow changing the stdout output format (e.g. YAML or text)?
     output = json.dumps(output_data, **DEFAULT_JSON_DUMPS_ARGS)
@@ -394,6 +781,20 @@ def main():
     extra_template_dirs = ns.extra_template_dirs
     input_paths = ns.input_paths
     build_time = ns.build_time
+    results_store = ns.results_store
+    results_cache_mode = ns.results_cache
+    snapshot_mode = ns.model_snapshot
+    template_cache_mode = ns.compiled_template_cache
+    fragment_cache_mode = ns.fragment_cache
+    incremental = ns.incremental
+    cache_dir = ns.cache_dir
+    load_workers = ns.load_workers
+    render_workers = ns.render_workers
+    tail_interval = ns.tail_interval
+    results_memory_budget = ns.results_memory_budget
+    if results_memory_budget is not None:
+        # Convert from megabytes to bytes.
+        results_memory_budget = int(results_memory_budget * 2 ** 20)
 
     output_parent = ns.output_parent
     output_dir_name = ns.output_dir_name
@@ -401,6 +802,15 @@ def main():
 
     test_mode = ns.test
 
+    if ns.command == COMMAND_PRECOMPILE:
+        if output_parent is None:
+            output_parent = DEFAULT_OUTPUT_PARENT_DIR
+        if cache_dir is None:
+            cache_dir = Path(output_parent) / DEFAULT_CACHE_DIR_NAME
+        template_dirs = [template_dir] + (extra_template_dirs or [])
+        precompile(template_dirs, cache_dir=cache_dir, template_cache_mode=template_cache_mode)
+        return
+
     if build_time is not None:
         build_time = utils.parse_datetime(build_time)
 
@@ -408,4 +818,9 @@ def main():
         template_dir=template_dir, extra_template_dirs=extra_template_dirs,
         output_parent=output_parent, output_dir_name=output_dir_name,
         fresh_output=fresh_output, test_mode=test_mode, build_time=build_time,
-        deterministic=deterministic)
+        deterministic=deterministic, results_store=results_store,
+        results_cache_mode=results_cache_mode, cache_dir=cache_dir,
+        load_workers=load_workers, results_memory_budget=results_memory_budget,
+        snapshot_mode=snapshot_mode, tail_interval=tail_interval,
+        render_workers=render_workers, template_cache_mode=template_cache_mode,
+        fragment_cache_mode=fragment_cache_mode, incremental=incremental)
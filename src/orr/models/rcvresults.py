@@ -21,30 +21,70 @@
 
 """
 Model classes to support RCV contest results.
+
+An RCVResults object converts a contest's RCV round totals once into
+arrays indexed by (round, candidate).  The transfers, percentages, and
+each candidate's elimination and max rounds are computed from those
+arrays in vectorized form, and the CandidateRound objects and final
+candidate order are computed only once.
 """
 
+import numpy as np
+
+
 class CandidateRound:
 
     # TODO: also include status like: elected, eliminated, etc.
-    def __init__(self, round_num, total, transfer, continuing, after_eliminated=False):
+    def __init__(self, round_num, total, transfer, continuing, after_eliminated=False,
+        percent=None):
         """
         Args:
           after_eliminated: whether this is a placeholder round for a
             candidate after they have been eliminated.  This is useful
             for showing the negative transfer when a candidate has been
             eliminated.
+          percent: the precomputed percent of continuing ballots, or
+            None to compute it from total and continuing when accessed.
         """
         self.continuing = continuing
         self.after_eliminated = after_eliminated
         self.round_num = round_num
         self.transfer = transfer
         self.votes = total
+        self._percent = percent
 
     @property
     def percent(self):
+        if self._percent is not None:
+            return self._percent
+
         return 100 * (self.votes / self.continuing)
 
 
+def make_round_arrays(rcv_totals, column_indexes):
+    """
+    Convert RCV round totals into arrays.
+
+    Args:
+      rcv_totals: the raw RCV round totals, as a list of tuples, one for
+        each round, starting with the first round.  A value of None
+        means the candidate was eliminated.
+      column_indexes: the indexes of the columns to include, as a list.
+
+    Returns: (votes, missing)
+      votes: a 2-D int64 array of vote totals indexed by (round index,
+        position in column_indexes), with 0 in place of None.
+      missing: a 2-D boolean array with the same shape as votes, which
+        is True where the total was None.
+    """
+    table = np.array([[totals[i] for i in column_indexes] for totals in rcv_totals],
+                     dtype=object).reshape(len(rcv_totals), len(column_indexes))
+    missing = np.equal(table, None)
+    votes = np.where(missing, 0, table).astype(np.int64)
+
+    return (votes, missing)
+
+
 class RCVResults:
 
     def __init__(self, rcv_totals, results_mapping, candidates, continuing_stat):
@@ -64,6 +104,41 @@ class RCVResults:
         self.results_mapping = results_mapping
         self.rcv_totals = rcv_totals
 
+        # A dict mapping candidate id to the candidate's position in
+        # self.candidates (and column in the arrays below).
+        self._positions_by_id = {candidate.id: position for position, candidate
+                                 in enumerate(candidates)}
+
+        column_indexes = [results_mapping.get_candidate_index(candidate)
+                          for candidate in candidates]
+        column_indexes.append(self.get_continuing_index())
+        votes, missing = make_round_arrays(rcv_totals, column_indexes)
+
+        # The arrays below are indexed by (round index, candidate position).
+        self._votes = votes[:, :-1]
+        self._continuing = votes[:, -1]
+        previous = np.zeros_like(self._votes)
+        previous[1:] = self._votes[:-1]
+        self._transfers = self._votes - previous
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._percents = 100 * (self._votes / self._continuing[:, np.newaxis])
+
+        missing = missing[:, :-1]
+        is_eliminated = missing.any(axis=0)
+        # The (1-based) number of the round in which each candidate was
+        # eliminated, or 0 if the candidate wasn't eliminated.
+        self._elimination_rounds = np.where(is_eliminated, missing.argmax(axis=0) + 1, 0)
+        # The number of the highest round each candidate reached.
+        self._max_round_nums = np.where(is_eliminated, self._elimination_rounds - 1,
+                                        len(rcv_totals))
+
+        # The values below are computed on first use.
+        self._rounds_by_position = {}
+        self._order_info = None
+
+    def _get_position(self, candidate):
+        return self._positions_by_id[candidate.id]
+
     def get_continuing_index(self):
         return self.results_mapping.get_stat_index(self.continuing_stat)
 
@@ -106,55 +181,62 @@ class RCVResults:
 
         return cand_round
 
-    def get_candidate_rounds(self, candidate):
-        """
-        Return a list of CandidateRound objects.
-        """
-        index = self.results_mapping.get_candidate_index(candidate)
-        continuing_index = self.get_continuing_index()
+    def _make_candidate_rounds(self, position):
+        elimination_round = int(self._elimination_rounds[position])
+        if elimination_round == 1:
+            candidate = self.candidates[position]
+            raise RuntimeError(f'candidate has no first round total: {candidate!r}')
+
+        # Include the elimination round, if any.
+        round_count = elimination_round or len(self.rcv_totals)
+        # Convert to Python values for the templates.
+        votes = self._votes[:round_count, position].tolist()
+        transfers = self._transfers[:round_count, position].tolist()
+        continuing = self._continuing[:round_count].tolist()
+        percents = self._percents[:round_count, position].tolist()
 
         rounds = []
-        after_eliminated = False
-        prev_total = 0
-        for round_num, round_totals in enumerate(self.rcv_totals, start=1):
-            total = round_totals[index]
-            if total is None:
-                total = 0
-                after_eliminated = True
-
-            transfer = total - prev_total
-            continuing = round_totals[continuing_index]
+        for round_num, values in enumerate(zip(votes, transfers, continuing, percents), start=1):
+            total, transfer, continuing_total, percent = values
+            after_eliminated = (round_num == elimination_round)
+            # Otherwise, CandidateRound computes the percent if accessed.
+            if after_eliminated or not continuing_total:
+                percent = None
             cand_round = CandidateRound(round_num, total=total, transfer=transfer,
-                                        continuing=continuing, after_eliminated=after_eliminated)
+                                        continuing=continuing_total,
+                                        after_eliminated=after_eliminated, percent=percent)
             rounds.append(cand_round)
-            if after_eliminated:
-                break
 
-            prev_total = total
+        return rounds
+
+    def get_candidate_rounds(self, candidate):
+        """
+        Return a list of CandidateRound objects.
+        """
+        position = self._get_position(candidate)
+        try:
+            rounds = self._rounds_by_position[position]
+        except KeyError:
+            rounds = self._make_candidate_rounds(position)
+            self._rounds_by_position[position] = rounds
 
         return rounds
 
     def find_max_round(self, candidate):
         """
-        Return the max round for a choice, as a (1-based) integer round number.
+        Return the max round for a choice, as a CandidateRound object.
 
         Args:
           candidate: a Candidate object.
         """
         rounds = self.get_candidate_rounds(candidate)
-        max_round = rounds[-1]
-        if rounds[-1].after_eliminated:
-            # Then don't count the last round.
-            max_round = rounds[-2]
+        max_round_num = self._max_round_nums[self._get_position(candidate)]
 
-        return max_round
+        return rounds[max_round_num - 1]
 
     def compute_max_rounds(self):
         """
         Return a dict mapping choice_id to max round.
-
-        Args:
-          rcv_results: an RCVResults object.
         """
         max_rounds = {}
         for candidate in self.candidates:
@@ -170,20 +252,29 @@ class RCVResults:
         max_rounds is a dict mapping candidate id to the number of the
         highest round the candidate reached.
         """
+        if self._order_info is not None:
+            return self._order_info
+
         max_rounds = self.compute_max_rounds()
+        max_round_nums = self._max_round_nums
+        positions = np.arange(len(self.candidates))
+        # Each candidate's vote total in their max round.
+        final_totals = self._votes[max_round_nums - 1, positions]
 
-        def key(candidate):
+        def key(item):
             """
             A comparison key function to sort choices first by round
             (starting with the highest), followed by vote total (starting
             with the highest), followed by id (starting with the lowest).
             """
-            round_num = max_rounds[candidate.id].round_num
-            return (-1 * round_num, -1 * self.get_candidate_total(candidate, round_num), candidate.id)
+            position, candidate = item
+            return (-1 * max_round_nums[position], -1 * final_totals[position], candidate.id)
 
-        candidates = sorted(self.candidates, key=key)
+        items = sorted(enumerate(self.candidates), key=key)
+        candidates = [candidate for position, candidate in items]
+        self._order_info = (candidates, max_rounds)
 
-        return (candidates, max_rounds)
+        return self._order_info
 
     def compute_candidate_order(self):
         candidates, max_rounds = self.compute_order_info()
@@ -195,10 +286,6 @@ class RCVResults:
         Yield the candidates in order of highest vote total, starting with
         the candidate having the highest vote total.
 
-        Args:
-          continuing_stat_id: the id of the ResultStatType object
-            corresponding to continuing ballots.
-
         Yields pairs (choice, max_round), where choice is a Choice object
         and max_round is a CandidateRound object corresponding to the
         highest round reached by the candidate.
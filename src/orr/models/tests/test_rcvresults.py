@@ -155,3 +155,16 @@ class RCVResultsTest(TestCase):
                 candidate = candidates[index]
                 max_round = rcv_results.find_max_round(candidate)
                 self.assertEqual(max_round.round_num, expected)
+
+    def test_rcv_summary(self):
+        rcv_results = self.make_test_results()
+        candidates = rcv_results.candidates
+
+        actual = [(candidate.id, max_round.round_num, max_round.votes)
+                  for candidate, max_round in rcv_results.rcv_summary()]
+        self.assertEqual(actual, [(101, 3, 1120), (102, 3, 730), (100, 2, 650), (103, 1, 200)])
+        # Check that the percent is of the continuing ballots.
+        max_round = rcv_results.find_max_round(candidates[1])
+        self.assertAlmostEqual(max_round.percent, 60.5405405)
+        # Check that the rounds are computed only once.
+        self.assertIs(rcv_results.get_candidate_rounds(candidates[1])[-1], max_round)
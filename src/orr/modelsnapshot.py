@@ -0,0 +1,171 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Support for caching a snapshot of the loaded election model.
+
+Loading election.json builds the whole data model (areas, result styles,
+contests, choices, etc.), which can take several seconds for a large
+election.  Since election.json rarely changes during an election night,
+the loaded model is pickled to a snapshot file, and later runs unpickle
+the snapshot instead of loading election.json again.
+
+A snapshot is used only if the SHA-256 hash of election.json, the ORR
+version, and the hash of ORR's source files all match (see
+utils.get_package_source_hash()), so any change to the data model or
+loaders invalidates older snapshots.  Snapshots are pickle files, so
+the cache directory must be trusted.
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+import pickle
+
+import orr.utils as utils
+
+
+_log = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = '.pickle'
+
+# The context keys that depend on the current run rather than on the
+# input data, and so are not stored in a snapshot.
+RUN_CONTEXT_KEYS = ('build_time',)
+
+
+class ModelSnapshotCache:
+
+    """
+    A directory of model snapshots, one for each election.json path.
+
+    Instance attributes:
+
+      cache_dir: the directory containing the snapshots, as a Path object.
+      version: the ORR version, as a string.
+      source_hash: the hash of ORR's source files, as a string.
+      rebuild: whether to ignore existing snapshots (but still write
+        new ones).
+      hits: the number of loads served from a snapshot.
+      misses: the number of loads that required loading election.json.
+    """
+
+    def __init__(self, cache_dir, version, rebuild=False, source_hash=None):
+        """
+        Args:
+          source_hash: the hash of ORR's source files.  Defaults to the
+            value of utils.get_package_source_hash().
+        """
+        if source_hash is None:
+            source_hash = utils.get_package_source_hash()
+
+        self.cache_dir = Path(cache_dir)
+        self.rebuild = rebuild
+        self.version = version
+        self.source_hash = source_hash
+
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f'<ModelSnapshotCache {self.cache_dir}: hits={self.hits}, misses={self.misses}>'
+
+    def get_snapshot_path(self, source_path):
+        """
+        Return the path to the snapshot file for an election.json path.
+        """
+        abs_path = str(Path(source_path).resolve()).encode(utils.UTF8_ENCODING)
+        digest = hashlib.sha1(abs_path).hexdigest()[:12]
+
+        return self.cache_dir / f'election.{digest}{SNAPSHOT_SUFFIX}'
+
+    def make_key(self, source_path):
+        """
+        Return the key identifying a snapshot of the given election.json.
+        """
+        return dict(
+            orr_version=self.version,
+            source_hash=self.source_hash,
+            sha256=utils.hash_file(source_path),
+        )
+
+    def load(self, source_path, key):
+        """
+        Return the context stored in the snapshot for an election.json
+        path, or None if there is no fresh snapshot.
+
+        The returned context doesn't contain the keys in RUN_CONTEXT_KEYS.
+
+        Args:
+          key: the return value of make_key() for the election.json path.
+        """
+        if self.rebuild:
+            self.misses += 1
+            return None
+
+        snapshot_path = self.get_snapshot_path(source_path)
+        try:
+            with open(snapshot_path, 'rb') as f:
+                # The key is pickled first so we can check it without
+                # unpickling the whole model.
+                if pickle.load(f) != key:
+                    context = None
+                else:
+                    context = pickle.load(f)
+        except FileNotFoundError:
+            context = None
+        except Exception:
+            _log.warning(f'ignoring unreadable model snapshot: {snapshot_path}')
+            context = None
+
+        if context is None:
+            self.misses += 1
+            return None
+
+        _log.debug(f'loaded model snapshot: {snapshot_path}')
+        self.hits += 1
+
+        return context
+
+    def store(self, source_path, key, context):
+        """
+        Write a snapshot of the given context for an election.json path.
+
+        Args:
+          key: the return value of make_key() for the election.json path,
+            taken before the file was read.  Taking the key after reading
+            would pair the context with the key of any contents written in
+            the meantime.
+        """
+        context = {name: value for name, value in context.items()
+                   if name not in RUN_CONTEXT_KEYS}
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        snapshot_path = self.get_snapshot_path(source_path)
+        # Write to a temporary file first so a partially written snapshot
+        # is never mistaken for a complete one.
+        temp_path = snapshot_path.with_name(f'{snapshot_path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'wb') as f:
+            pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(context, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, snapshot_path)
+
+        _log.debug(f'wrote model snapshot: {snapshot_path}')
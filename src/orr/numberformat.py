@@ -0,0 +1,189 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Support for formatting numbers for display.
+
+The formatting rules for a locale (the grouping and decimal symbols,
+and the percent sign placement) are read once from Babel's locale data
+into a NumberFormatter object.  Formatting doesn't depend on the
+process-global locale (see the locale module), so it is safe to use
+from several threads and doesn't require the locale to be installed on
+the system.
+"""
+
+import logging
+import threading
+
+import babel
+import babel.numbers
+
+
+_log = logging.getLogger(__name__)
+
+DEFAULT_LOCALE = 'en_US'
+
+# The symbols used by Python's format() mini-language.
+PYTHON_GROUP_SYMBOL = ','
+PYTHON_DECIMAL_SYMBOL = '.'
+
+# A dict mapping locale name to NumberFormatter object.
+_formatters = {}
+_formatters_lock = threading.Lock()
+
+
+class NumberFormatter:
+
+    """
+    Formats numbers using the rules of one locale.
+
+    Instance attributes:
+
+      locale_name: the name of the locale, e.g. "en_US".
+      group_symbol: the thousands separator.
+      decimal_symbol: the decimal separator.
+      percent_prefix: the text to add before a percentage.
+      percent_suffix: the text to add after a percentage.
+    """
+
+    def __init__(self, locale_name):
+        babel_locale = babel.Locale.parse(locale_name)
+        percent_pattern = babel_locale.percent_formats[None]
+        # The grouping sizes, as a pair (primary, secondary).
+        grouping = babel_locale.decimal_formats[None].grouping
+
+        self.locale_name = locale_name
+        self.group_symbol = babel.numbers.get_group_symbol(babel_locale)
+        self.decimal_symbol = babel.numbers.get_decimal_symbol(babel_locale)
+        # The pattern's prefix and suffix include the percent sign.
+        self.percent_prefix = percent_pattern.prefix[0]
+        self.percent_suffix = percent_pattern.suffix[0]
+
+        self._babel_locale = babel_locale
+        # Python's format() can group digits only in threes.
+        self._is_grouping_supported = (grouping == (3, 3))
+        symbols = (self.group_symbol, self.decimal_symbol)
+        if symbols == (PYTHON_GROUP_SYMBOL, PYTHON_DECIMAL_SYMBOL):
+            self._translation = None
+        else:
+            self._translation = str.maketrans({
+                PYTHON_GROUP_SYMBOL: self.group_symbol,
+                PYTHON_DECIMAL_SYMBOL: self.decimal_symbol,
+            })
+
+    def __repr__(self):
+        return f'<NumberFormatter locale_name={self.locale_name!r}>'
+
+    def _localize(self, text):
+        if self._translation is None:
+            return text
+
+        return text.translate(self._translation)
+
+    def format_number(self, num):
+        """
+        Format a number with thousands separators, e.g. 9999 as "9,999".
+
+        Floats are formatted to 6 significant digits, as with the "n"
+        option of format().  None is formatted as the empty string.
+        """
+        if num is None:
+            return ''
+
+        if not self._is_grouping_supported:
+            return babel.numbers.format_decimal(num, locale=self._babel_locale)
+
+        if isinstance(num, int):
+            return self._localize(f'{num:,}')
+
+        return self._localize(f'{num:,g}')
+
+    def format_row(self, values):
+        """
+        Format a sequence of numbers, and return a list of strings.
+
+        Args:
+          values: a list of numbers, or a 1-D numpy array.
+        """
+        if hasattr(values, 'tolist'):
+            values = values.tolist()
+
+        if not self._is_grouping_supported:
+            format_number = self.format_number
+            return [format_number(value) for value in values]
+
+        # Inline format_number() since this is called for every cell of
+        # the detailed results.
+        texts = [f'{value:,}' if type(value) == int else
+                 '' if value is None else f'{value:,g}' for value in values]
+        if self._translation is not None:
+            translation = self._translation
+            texts = [text.translate(translation) for text in texts]
+
+        return texts
+
+    def format_rows(self, rows):
+        """
+        Format a sequence of rows of numbers, and return a list of lists
+        of strings.
+
+        Args:
+          rows: a list of lists of numbers, or a 2-D numpy array.
+        """
+        if hasattr(rows, 'tolist'):
+            rows = rows.tolist()
+
+        format_row = self.format_row
+
+        return [format_row(row) for row in rows]
+
+    def format_percent(self, percent):
+        """
+        Format a percentage (from 0 to 100) with two decimal places, e.g.
+        12.4 as "12.40%".  None is formatted as the empty string.
+        """
+        if percent is None:
+            return ''
+
+        text = self._localize(f'{percent:.2f}')
+
+        return f'{self.percent_prefix}{text}{self.percent_suffix}'
+
+
+def get_formatter(locale_name=None):
+    """
+    Return the NumberFormatter object for a locale, creating it if
+    necessary.
+
+    Args:
+      locale_name: a locale name, e.g. "en_US".  Defaults to
+        DEFAULT_LOCALE.
+    """
+    if locale_name is None:
+        locale_name = DEFAULT_LOCALE
+
+    try:
+        return _formatters[locale_name]
+    except KeyError:
+        pass
+
+    formatter = NumberFormatter(locale_name)
+    with _formatters_lock:
+        return _formatters.setdefault(locale_name, formatter)
@@ -0,0 +1,314 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Support for tabulating single-winner RCV contests from ballot-level
+cast vote records.
+
+A contest's ballots file is a TSV file with a header line, followed by
+one line per ballot.  The first column is a ballot id (which is
+ignored), and each remaining column is a rank, starting with the first
+choice.  A rank's value is one of:
+
+  * the empty string, if the rank wasn't marked,
+  * a choice id, or
+  * several space-separated choice ids, if the rank was overvoted.
+
+For example:
+
+    ballot_id	rank1	rank2	rank3
+    1	3790	3789
+    2	4970 3786	3786
+
+The elimination rounds are run as follows:
+
+  * A ballot counts for its highest ranked continuing candidate.
+    Unmarked ranks, and candidates already eliminated, are skipped.
+  * A ballot with no marked ranks is an undervote.
+  * A ballot whose next counted rank is overvoted is exhausted by the
+    overvote.  A ballot with no further counted ranks is exhausted.
+  * The rounds end when a candidate has a majority of the continuing
+    ballots.  Otherwise, the candidate with the fewest votes is
+    eliminated.  Ties for fewest votes are broken by eliminating the
+    candidate appearing last in the contest's list of choices.  However,
+    if any candidates have no votes, they are all eliminated together.
+
+To keep the tabulation fast for contests with many ballots, the ballots
+are held as a 2-D integer array of rank codes, and identical ballots
+are grouped into batches that are counted and transferred together.
+"""
+
+import logging
+
+import numpy as np
+
+from orr.tsvio import split_line
+import orr.utils as utils
+
+
+_log = logging.getLogger(__name__)
+
+# The rank codes other than choice positions (which are non-negative).
+RANK_UNMARKED = -1
+RANK_OVERVOTE = -2
+# The code for the position after a ballot's last rank.
+RANK_END = -3
+
+RANK_DTYPE = np.int16
+
+
+def parse_rank(value, positions_by_id):
+    """
+    Return the rank code for a rank value in a ballots file.
+
+    Args:
+      positions_by_id: a dict mapping choice id to (0-based) position
+        in the contest.
+    """
+    choice_ids = value.split()
+    if not choice_ids:
+        return RANK_UNMARKED
+
+    for choice_id in choice_ids:
+        if choice_id not in positions_by_id:
+            raise ValueError(f'unknown choice id: {choice_id!r}')
+
+    if len(choice_ids) > 1:
+        return RANK_OVERVOTE
+
+    return positions_by_id[choice_ids[0]]
+
+
+class BallotSet:
+
+    """
+    A contest's ballots, grouped into batches of identically ranked
+    ballots.
+
+    Instance attributes:
+
+      ranks: a 2-D array of rank codes, indexed by (batch, rank).  A
+        code is either a choice position, RANK_UNMARKED, or
+        RANK_OVERVOTE.
+      counts: a 1-D int64 array of the number of ballots in each batch.
+    """
+
+    def __init__(self, ranks, counts):
+        self.ranks = ranks
+        self.counts = counts
+
+    def __repr__(self):
+        return f'<BallotSet: {self.ballot_count} ballots in {len(self.counts)} batches>'
+
+    @property
+    def ballot_count(self):
+        return int(self.counts.sum())
+
+
+def make_ballot_set(ranks):
+    """
+    Create a BallotSet object from ungrouped ballots.
+
+    Args:
+      ranks: a 2-D array of rank codes, one row per ballot.
+    """
+    if not len(ranks):
+        return BallotSet(ranks, counts=np.zeros(0, dtype=np.int64))
+
+    ranks, counts = np.unique(ranks, axis=0, return_counts=True)
+
+    return BallotSet(ranks, counts=counts.astype(np.int64))
+
+
+def read_ballots(path, choice_ids):
+    """
+    Read a ballots file, and return a BallotSet object.
+
+    Args:
+      path: the path to the ballots file, as a Path object.  If the file
+        is compressed (e.g. with a ".gz" suffix), it is decompressed as
+        it is read.
+      choice_ids: the contest's choice ids, in order.
+    """
+    positions_by_id = {choice_id: position for position, choice_id in enumerate(choice_ids)}
+    # A dict mapping the ranks part of a line to its rank codes.  This
+    # saves parsing each line, since most ballots repeat the rankings
+    # of other ballots.
+    codes_by_text = {}
+    codes = []
+
+    with utils.open_input(path) as stream:
+        header = split_line(stream.readline())
+        rank_count = len(header) - 1
+        for line_num, line in enumerate(stream, start=2):
+            # Remove the ballot id.
+            text = line.rstrip('\r\n').partition('\t')[2]
+            try:
+                line_codes = codes_by_text[text]
+            except KeyError:
+                values = split_line(text) if text else []
+                if len(values) > rank_count:
+                    msg = (f'ballot has more ranks than the header in {path} '
+                           f'(line={line_num}): {line!r}')
+                    raise RuntimeError(msg)
+                values.extend([''] * (rank_count - len(values)))
+                try:
+                    line_codes = [parse_rank(value, positions_by_id) for value in values]
+                except ValueError as exc:
+                    raise RuntimeError(f'{exc} in {path} (line={line_num})')
+                codes_by_text[text] = line_codes
+
+            codes.extend(line_codes)
+
+    ranks = np.array(codes, dtype=RANK_DTYPE).reshape(-1, rank_count)
+
+    return make_ballot_set(ranks)
+
+
+class RCVRound:
+
+    """
+    The results of one round of an RCV tabulation.
+
+    Instance attributes:
+
+      votes: the vote total of each choice, as a list in choice order,
+        with None for choices eliminated in an earlier round.
+      stats_by_id: a dict mapping ResultStatType id to value, for the
+        result stats that can be computed from the ballots.
+    """
+
+    def __init__(self, votes, stats_by_id):
+        self.votes = votes
+        self.stats_by_id = stats_by_id
+
+    def __repr__(self):
+        return f'<RCVRound votes={self.votes!r}>'
+
+
+def _advance_to_continuing(ranks, pointers, counting, eliminated):
+    """
+    Advance the rank pointer of each counting batch past any unmarked
+    ranks and eliminated choices.
+
+    Returns the rank code at each batch's pointer.
+    """
+    rows = np.arange(len(ranks))
+    while True:
+        codes = ranks[rows, pointers]
+        # Use np.maximum() so codes less than 0 index validly.
+        skip = counting & ((codes == RANK_UNMARKED) |
+                           ((codes >= 0) & eliminated[np.maximum(codes, 0)]))
+        if not skip.any():
+            return codes
+        pointers[skip] += 1
+
+
+def tabulate(ballot_set, choice_count):
+    """
+    Run the elimination rounds of a single-winner RCV contest.
+
+    Returns a list of RCVRound objects, starting with the first round.
+
+    Args:
+      ballot_set: a BallotSet object.
+      choice_count: the number of choices in the contest.
+    """
+    counts = ballot_set.counts
+    # Add a column so every batch's pointer stops at RANK_END at the latest.
+    end_column = np.full((len(counts), 1), RANK_END, dtype=RANK_DTYPE)
+    # Pass the rank count explicitly since reshape() can't infer it when
+    # there are no ballots.
+    ranks = ballot_set.ranks.reshape(len(counts), ballot_set.ranks.shape[-1])
+    ranks = np.hstack([ranks, end_column])
+
+    is_undervote = (ranks[:, :-1] == RANK_UNMARKED).all(axis=1)
+    undervotes = int(counts[is_undervote].sum())
+
+    # Whether each batch still counts for a choice.
+    counting = ~is_undervote
+    is_overvoted = np.zeros(len(counts), dtype=bool)
+    is_exhausted = np.zeros(len(counts), dtype=bool)
+    pointers = np.zeros(len(counts), dtype=np.intp)
+    eliminated = np.zeros(choice_count, dtype=bool)
+
+    rounds = []
+    while True:
+        codes = _advance_to_continuing(ranks, pointers, counting=counting,
+                                       eliminated=eliminated)
+        newly_overvoted = counting & (codes == RANK_OVERVOTE)
+        newly_exhausted = counting & (codes == RANK_END)
+        is_overvoted |= newly_overvoted
+        is_exhausted |= newly_exhausted
+        counting &= ~(newly_overvoted | newly_exhausted)
+
+        votes = np.bincount(codes[counting], weights=counts[counting],
+                            minlength=choice_count).astype(np.int64)
+        continuing = int(votes.sum())
+
+        stats_by_id = dict(
+            RSCst=ballot_set.ballot_count,
+            RSTot=continuing,
+            RSUnd=undervotes,
+            RSOvr=int(counts[is_overvoted].sum()),
+            RSExh=int(counts[is_exhausted].sum()),
+        )
+        round_votes = [None if is_eliminated else total
+                       for is_eliminated, total in zip(eliminated.tolist(), votes.tolist())]
+        rounds.append(RCVRound(round_votes, stats_by_id=stats_by_id))
+
+        remaining = np.flatnonzero(~eliminated)
+        if (2 * votes.max() > continuing) or len(remaining) <= 1 or not continuing:
+            break
+
+        remaining_votes = votes[remaining]
+        lowest = remaining[remaining_votes == remaining_votes.min()]
+        if remaining_votes.min() == 0:
+            # No ballots transfer, so the order doesn't matter.
+            eliminated[lowest] = True
+        else:
+            # Break any tie by eliminating the choice appearing last.
+            eliminated[lowest[-1]] = True
+
+    return rounds
+
+
+def make_rcv_totals(rounds, results_mapping):
+    """
+    Convert RCVRound objects into the rcv_totals structure read from
+    results files: a list of tuples, one for each round, starting with
+    the first round.
+
+    Result stats that can't be computed from the ballots are None.
+
+    Args:
+      rounds: an iterable of RCVRound objects.
+      results_mapping: the contest's ResultsMapping object.
+    """
+    stat_ids = [stat.id for stat in results_mapping.result_stat_types]
+
+    rcv_totals = []
+    for rcv_round in rounds:
+        stats_by_id = rcv_round.stats_by_id
+        round_totals = [stats_by_id.get(stat_id) for stat_id in stat_ids]
+        round_totals.extend(rcv_round.votes)
+        rcv_totals.append(tuple(round_totals))
+
+    return rcv_totals
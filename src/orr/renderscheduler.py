@@ -0,0 +1,266 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Support for rendering subtemplates in parallel.
+
+When a RenderScheduler is in use, each call to the subtemplate()
+function from a template rendered in the main process becomes a job
+run by a pool of worker processes.  The workers are forked from the
+main process, so they inherit the already loaded model and Jinja2
+environment, and each job sends only the option values the templates
+can change (e.g. options.lang and options.contest) and the template variables that differ
+from the top-level context.  Subtemplates rendered inside a worker are
+rendered serially in that worker.
+
+Since index pages typically show the hash of each file right after
+creating it, the secure_hash filter doesn't wait for a pending job.
+Instead it returns a placeholder, which is replaced by the hash once
+the page finishes rendering and the job completes (see
+resolve_placeholders()).  This keeps the output (and hence SHA256SUMS)
+the same regardless of the number of workers.
+"""
+
+import concurrent.futures
+import logging
+import multiprocessing
+import pickle
+import re
+
+import orr.buildtracking as buildtracking
+import orr.utils as utils
+
+
+_log = logging.getLogger(__name__)
+
+PLACEHOLDER_FORMAT = 'orr-pending-sha256-{:08d}'
+PLACEHOLDER_PATTERN = re.compile(r'orr-pending-sha256-\d{8}')
+
+# The environment and top-level context to use in a worker process.
+# These are set in the main process before the workers are forked.
+_worker_env = None
+_worker_context = None
+
+
+def get_render_scheduler(env):
+    """
+    Return the RenderScheduler object for a Jinja2 Environment, or None
+    if subtemplates should be rendered serially.
+    """
+    return env.globals['options'].render_scheduler
+
+
+def _render_job(template_name, rel_output_path, option_values, job_vars, params):
+    """
+    Render a subtemplate in a worker process.
+
+    Returns the records of the active build tracker for the outputs
+    created by the job (see buildtracking.BuildTracker.get_job_records()),
+    or None if there is no active build tracker.
+    """
+    tracker = buildtracking.get_tracker()
+    if tracker is not None:
+        tracker.start_job()
+
+    env = _worker_env
+    options = env.globals['options']
+    options['render_scheduler'] = None
+    for name, value in option_values.items():
+        options[name] = value
+
+    context = dict(_worker_context)
+    context.update(job_vars)
+    utils.process_template(env, template_name=template_name, rel_output_path=rel_output_path,
+        context=context, params=params)
+
+    if tracker is None:
+        return None
+
+    return tracker.get_job_records()
+
+
+class RenderScheduler:
+
+    """
+    Renders subtemplate() jobs on a pool of worker processes.
+
+    Instance attributes:
+
+      env: the Jinja2 Environment object.
+      context: the top-level context dict the templates are rendered with.
+      workers: the maximum number of worker processes.
+    """
+
+    def __init__(self, env, context, workers):
+        self.env = env
+        self.context = context
+        self.workers = workers
+
+        self._executor = None
+        # A dict mapping rel_output_path (as a string) to the pair
+        # (template_name, future) of each submitted job.
+        self._jobs = {}
+        # A dict mapping placeholder to rel_output_path.
+        self._placeholders = {}
+        # The rel_output_path of each job whose build tracker records
+        # were added to the active build tracker.
+        self._recorded_paths = set()
+
+    def __repr__(self):
+        return f'<RenderScheduler workers={self.workers}: {len(self._jobs)} jobs>'
+
+    def _get_executor(self):
+        if self._executor is None:
+            global _worker_env, _worker_context
+            _worker_env = self.env
+            _worker_context = self.context
+            # The workers need to inherit the globals above, so they
+            # must be forked.  ProcessPoolExecutor only accepts a start
+            # method (mp_context) as of Python 3.7, so use the default,
+            # which is "fork" on POSIX.
+            start_method = multiprocessing.get_start_method()
+            if start_method != 'fork':
+                raise RuntimeError(
+                    f'rendering in parallel requires the "fork" start method: {start_method}')
+            self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+
+        return self._executor
+
+    def _get_job_vars(self, jinja_context):
+        """
+        Return the variables of a Jinja2 Context object that differ from
+        the top-level context.
+        """
+        globals_ = self.env.globals
+        job_vars = {}
+        for name, value in jinja_context.get_all().items():
+            if name in globals_ and globals_[name] is value:
+                continue
+            if name in self.context and self.context[name] is value:
+                continue
+            job_vars[name] = value
+
+        return job_vars
+
+    def submit(self, template_name, rel_output_path, jinja_context, params=None):
+        """
+        Submit a job to render a subtemplate.
+
+        Returns whether the job was submitted.  A job isn't submitted if
+        its variables can't be sent to a worker, in which case the caller
+        should render the template itself.
+
+        Args:
+          params: the parameters of the output for the active build
+            tracker, if any (see utils.process_template()).
+        """
+        job_vars = self._get_job_vars(jinja_context)
+        # Send the option values the templates can change while rendering.
+        option_values = utils.get_template_options(self.env)
+        try:
+            pickle.dumps((job_vars, option_values))
+        except Exception:
+            _log.debug(f'rendering {template_name} serially since its variables '
+                       f'can\'t be pickled: {sorted(job_vars)} {sorted(option_values)}')
+            return False
+
+        executor = self._get_executor()
+        future = executor.submit(_render_job, template_name, rel_output_path,
+                                 option_values=option_values, job_vars=job_vars,
+                                 params=params)
+        self._jobs[str(rel_output_path)] = (template_name, future)
+        _log.debug(f'submitted render job: {template_name} -> {rel_output_path}')
+
+        return True
+
+    def _wait_for_job(self, rel_output_path, template_name, future):
+        try:
+            job_records = future.result()
+        except Exception as exc:
+            msg = f'error rendering template {template_name} to: {rel_output_path}'
+            raise RuntimeError(msg) from exc
+
+        rel_output_path = str(rel_output_path)
+        if job_records is not None and rel_output_path not in self._recorded_paths:
+            # Add the records only the first time the job is waited for.
+            self._recorded_paths.add(rel_output_path)
+            buildtracking.get_tracker().add_job_records(job_records)
+
+    def wait_for(self, rel_path):
+        """
+        Wait for the job creating the given output path, if any.
+        """
+        job = self._jobs.get(str(rel_path))
+        if job is not None:
+            self._wait_for_job(rel_path, *job)
+
+    def wait_all(self):
+        """
+        Wait for all submitted jobs, in submission order.
+        """
+        for rel_path, job in self._jobs.items():
+            self._wait_for_job(rel_path, *job)
+
+    def is_pending(self, rel_path):
+        """
+        Return whether a submitted job creating the given path hasn't
+        finished.
+        """
+        job = self._jobs.get(str(rel_path))
+
+        return job is not None and not job[1].done()
+
+    def make_hash_placeholder(self, rel_path):
+        """
+        Return a placeholder for the hash of a file being created by a
+        job.
+        """
+        placeholder = PLACEHOLDER_FORMAT.format(len(self._placeholders))
+        self._placeholders[placeholder] = rel_path
+
+        return placeholder
+
+    def resolve_placeholders(self, text):
+        """
+        Replace any hash placeholders in rendered text with the hashes,
+        waiting for the corresponding jobs if needed.
+        """
+        if not self._placeholders:
+            return text
+
+        def replace(match):
+            rel_path = self._placeholders[match.group()]
+            self.wait_for(rel_path)
+            path = utils.get_output_path(self.env, rel_path)
+
+            return utils.hash_file(path)
+
+        return PLACEHOLDER_PATTERN.sub(replace, text)
+
+    def shutdown(self):
+        """
+        Wait for all submitted jobs, and stop the worker processes.
+        """
+        try:
+            self.wait_all()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
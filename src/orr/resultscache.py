@@ -0,0 +1,309 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Support for caching parsed contest results in a compact binary form.
+
+Parsing a results-<id>.tsv file is comparatively slow.  The first time
+a file is parsed, the parsed results (the results matrix, the RCV
+round totals and the reporting group key of each row) are written to a binary "sidecar" file in the cache
+directory.  Later runs memory-map the sidecar instead of re-parsing the
+TSV file, provided the source file hasn't changed.
+
+Each sidecar file has the following layout:
+
+  * the bytes CACHE_MAGIC,
+  * the length of the JSON header, as a 4-byte little-endian integer,
+  * the JSON header (padded with spaces so the data that follows is
+    aligned to DATA_ALIGNMENT bytes), and
+  * the results matrix followed by the RCV totals matrix, as raw
+    little-endian int64 values in C order.
+
+The JSON header records the source file's size, modification time and
+SHA-256 hash, the shapes of the two arrays, and the area_id and
+subtotal_type of each results row.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import struct
+
+import numpy as np
+
+import orr.utils as utils
+
+
+_log = logging.getLogger(__name__)
+
+CACHE_MAGIC = b'ORRRESC\n'
+# Increment this whenever the sidecar layout changes.
+CACHE_FORMAT_VERSION = 2
+
+CACHE_SUFFIX = '.orrcache'
+
+# The alignment (in bytes) of the array data inside a sidecar file.
+DATA_ALIGNMENT = 64
+
+# The on-disk dtype of the cached arrays.
+CACHE_DTYPE = np.dtype('<i8')
+# The value used to encode a blank (None) cell in the RCV totals.
+RCV_NONE = np.iinfo(CACHE_DTYPE).min
+
+_HEADER_LENGTH_FORMAT = '<I'
+# The length of the bytes preceding the JSON header.
+_PREFIX_LENGTH = len(CACHE_MAGIC) + struct.calcsize(_HEADER_LENGTH_FORMAT)
+
+# The values of the --results-cache command-line option.
+CACHE_MODE_USE = 'use'
+CACHE_MODE_BYPASS = 'bypass'
+CACHE_MODE_REBUILD = 'rebuild'
+CACHE_MODES = (CACHE_MODE_USE, CACHE_MODE_BYPASS, CACHE_MODE_REBUILD)
+
+
+def get_source_key(path, with_hash=True):
+    """
+    Return a dict identifying the current contents of a source file.
+
+    Args:
+      path: a path-like object.
+      with_hash: whether to include the SHA-256 hash of the contents.
+    """
+    stat = os.stat(path)
+    key = dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    if with_hash:
+        key['sha256'] = utils.hash_file(path)
+
+    return key
+
+
+def encode_rcv_totals(rcv_totals, column_count):
+    """
+    Convert rcv_totals (a list of tuples whose values can be None) to a
+    2-D array, using RCV_NONE for the None values.
+    """
+    rows = [[RCV_NONE if value is None else value for value in round_totals]
+            for round_totals in rcv_totals]
+
+    return np.array(rows, dtype=CACHE_DTYPE).reshape(len(rows), column_count)
+
+
+def decode_rcv_totals(array):
+    """
+    The inverse of encode_rcv_totals().
+    """
+    return [tuple(None if value == RCV_NONE else value for value in row)
+            for row in array.tolist()]
+
+
+def _align(offset):
+    """
+    Round an offset up to the next multiple of DATA_ALIGNMENT.
+    """
+    return -(-offset // DATA_ALIGNMENT) * DATA_ALIGNMENT
+
+
+def _read_header(f):
+    """
+    Read the JSON header from the start of a sidecar file.
+
+    Returns (header, data_offset), or None if the file isn't a valid
+    sidecar file.
+    """
+    magic = f.read(len(CACHE_MAGIC))
+    if magic != CACHE_MAGIC:
+        return None
+
+    size = struct.calcsize(_HEADER_LENGTH_FORMAT)
+    header_length, = struct.unpack(_HEADER_LENGTH_FORMAT, f.read(size))
+    header = json.loads(f.read(header_length).decode(utils.UTF8_ENCODING))
+
+    if header.get('version') != CACHE_FORMAT_VERSION:
+        return None
+
+    return (header, _PREFIX_LENGTH + header_length)
+
+
+def _map_array(path, offset, shape):
+    """
+    Memory-map a read-only int64 array from a sidecar file.
+    """
+    shape = tuple(shape)
+    if not all(shape):
+        # Then the array is empty, and numpy can't memory-map zero bytes.
+        return np.empty(shape, dtype=CACHE_DTYPE)
+
+    return np.memmap(path, dtype=CACHE_DTYPE, mode='r', offset=offset, shape=shape)
+
+
+class ResultsCache:
+
+    """
+    A directory of sidecar files, one for each contest results file.
+
+    Instance attributes:
+
+      cache_dir: the directory containing the sidecar files, as a Path object.
+      rebuild: whether to ignore existing sidecar files (but still write
+        new ones).
+      hits: the number of loads served from the cache.
+      misses: the number of loads that required parsing the source file.
+    """
+
+    def __init__(self, cache_dir, rebuild=False):
+        self.cache_dir = Path(cache_dir)
+        self.rebuild = rebuild
+
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f'<ResultsCache {self.cache_dir}: hits={self.hits}, misses={self.misses}>'
+
+    def get_sidecar_path(self, source_path):
+        """
+        Return the path to the sidecar file for a source file.
+
+        The name includes a digest of the source's absolute path so that
+        files with the same name in different input directories don't
+        collide.
+        """
+        source_path = Path(source_path)
+        abs_path = str(source_path.resolve()).encode(utils.UTF8_ENCODING)
+        digest = hashlib.sha1(abs_path).hexdigest()[:12]
+
+        return self.cache_dir / f'{source_path.name}.{digest}{CACHE_SUFFIX}'
+
+    def _is_fresh(self, header, source_path, rcv_rounds):
+        """
+        Return whether the header of a sidecar file matches the current
+        source file.
+        """
+        if header['rcv_rounds'] != rcv_rounds:
+            return False
+
+        # The size and modification time are cheap to check, so check
+        # them first.  Hashing the file is still much cheaper than parsing
+        # it, and it guards against a file being rewritten in place with
+        # the same size within the timestamp resolution.
+        cached_key = header['source']
+        key = get_source_key(source_path, with_hash=False)
+        if (key['size'], key['mtime_ns']) != (cached_key['size'], cached_key['mtime_ns']):
+            return False
+
+        return utils.hash_file(source_path) == cached_key['sha256']
+
+    def load(self, source_path, rcv_rounds):
+        """
+        Return the cached (results, rcv_totals, row_keys) for a source
+        file, or None if there is no fresh sidecar file.
+
+        The results are returned as a read-only, memory-mapped int64
+        array, and the RCV totals and row keys as lists of tuples.
+
+        Args:
+          source_path: the path to the results TSV file.
+          rcv_rounds: the number of RCV rounds expected in the file.
+        """
+        if self.rebuild:
+            self.misses += 1
+            return None
+
+        sidecar_path = self.get_sidecar_path(source_path)
+        try:
+            with open(sidecar_path, 'rb') as f:
+                header_info = _read_header(f)
+        except FileNotFoundError:
+            header_info = None
+        except Exception:
+            _log.warning(f'ignoring unreadable results cache file: {sidecar_path}')
+            header_info = None
+
+        if header_info is None:
+            self.misses += 1
+            return None
+
+        header, data_offset = header_info
+        if not self._is_fresh(header, source_path, rcv_rounds=rcv_rounds):
+            self.misses += 1
+            return None
+
+        results_shape = header['results_shape']
+        results = _map_array(sidecar_path, offset=data_offset, shape=results_shape)
+        rcv_offset = data_offset + CACHE_DTYPE.itemsize * int(np.prod(results_shape))
+        rcv_array = _map_array(sidecar_path, offset=rcv_offset, shape=header['rcv_shape'])
+        rcv_totals = decode_rcv_totals(rcv_array)
+        row_keys = [tuple(key) for key in header['row_keys']]
+
+        _log.debug(f'loaded results from cache file: {sidecar_path}')
+        self.hits += 1
+
+        return (results, rcv_totals, row_keys)
+
+    def store(self, source_path, source_key, rcv_rounds, results, rcv_totals, row_keys):
+        """
+        Write the sidecar file for a source file.
+
+        Args:
+          source_path: the path to the results TSV file.
+          source_key: the return value of get_source_key() for the source
+            file, taken before the file was read.  Taking the key after
+            reading would pair the results with the key of any contents
+            written in the meantime.
+          rcv_rounds: the number of RCV rounds in the file.
+          results: the results matrix, as a 2-D integer numpy array.
+          rcv_totals: the RCV totals, as a list of tuples.
+          row_keys: the pair (area_id, voting_group_id) of each results
+            row, as a list of tuples.
+        """
+        results = np.ascontiguousarray(results, dtype=CACHE_DTYPE)
+        column_count = results.shape[1]
+        rcv_array = encode_rcv_totals(rcv_totals, column_count=column_count)
+
+        header = dict(
+            version=CACHE_FORMAT_VERSION,
+            source_path=str(source_path),
+            source=source_key,
+            rcv_rounds=rcv_rounds,
+            results_shape=list(results.shape),
+            rcv_shape=list(rcv_array.shape),
+            row_keys=[list(key) for key in row_keys],
+        )
+        header_bytes = json.dumps(header).encode(utils.UTF8_ENCODING)
+        # Pad the header with spaces so the array data is aligned.
+        data_offset = _align(_PREFIX_LENGTH + len(header_bytes))
+        header_bytes = header_bytes.ljust(data_offset - _PREFIX_LENGTH)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        sidecar_path = self.get_sidecar_path(source_path)
+        # Write to a temporary file first so a partially written sidecar
+        # is never mistaken for a complete one.
+        temp_path = sidecar_path.with_name(f'{sidecar_path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(CACHE_MAGIC)
+            f.write(struct.pack(_HEADER_LENGTH_FORMAT, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(results.tobytes())
+            f.write(rcv_array.tobytes())
+        os.replace(temp_path, sidecar_path)
+
+        _log.debug(f'wrote results cache file: {sidecar_path}')
@@ -0,0 +1,133 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Support for an election-wide array of summary results.
+
+A contest's summary results are the results rows of the voting groups
+in its result style (which are the first rows of its results, for the
+reporting groups "*~TO", "*~ED", etc).  The summary templates read
+these once per choice and result stat, and in every language.  A
+ResultsCube holds every contest's summary results in a single dense
+array, so those reads are simple array lookups and don't need the
+contests' detailed results to stay loaded.
+
+A contest's part of the cube is filled in when its results are loaded
+or set, so creating the cube doesn't load any results.
+"""
+
+import logging
+
+import numpy as np
+
+
+_log = logging.getLogger(__name__)
+
+CUBE_DTYPE = np.int64
+
+
+def get_column_count(contest):
+    return contest.results_mapping.result_stat_count + len(contest.choices_by_id)
+
+
+class ResultsCube:
+
+    """
+    The summary results of all of an election's contests.
+
+    Instance attributes:
+
+      values: a 3-D int64 array indexed by (contest index, column,
+        voting group position).  The columns are in the same order as
+        the contest's results (see datamodel.ResultsMapping), and the
+        voting group positions are those in the contest's result style.
+        Entries past a contest's number of columns or voting groups
+        are 0.
+      filled: a 1-D bool array indexed by contest index, of whether the
+        contest's summary results have been set.
+    """
+
+    def __init__(self, contests):
+        """
+        Create an empty cube.
+
+        Args:
+          contests: the election's contests, as an iterable of Contest
+            objects, whose index attributes are their positions in the
+            iterable.
+        """
+        contests = list(contests)
+        column_count = max((get_column_count(contest) for contest in contests), default=0)
+        group_count = max((len(contest.result_style.voting_groups) for contest in contests),
+                          default=0)
+
+        self.values = np.zeros((len(contests), column_count, group_count), dtype=CUBE_DTYPE)
+        self.filled = np.zeros(len(contests), dtype=bool)
+
+        _log.debug(f'created results cube with shape: {self.values.shape}')
+
+    def __repr__(self):
+        return f'<ResultsCube shape={self.values.shape}: {self.filled.sum()} filled>'
+
+    def has_contest(self, contest):
+        """
+        Return whether a contest's summary results have been set.
+        """
+        return bool(self.filled[contest.index])
+
+    def set_contest_results(self, contest, results):
+        """
+        Copy a contest's summary results into the cube.
+
+        Args:
+          results: the contest's detailed results, as a list of lists or
+            a 2-D numpy array.
+        """
+        group_count = len(contest.result_style.voting_groups)
+        # Use np.asarray() since the results can be a list of lists.
+        summary = np.asarray(results[:group_count], dtype=CUBE_DTYPE)
+        self.values[contest.index, :summary.shape[1], :group_count] = summary.T
+        self.filled[contest.index] = True
+
+    def get_contest_values(self, contest):
+        """
+        Return a contest's summary results, as a 2-D array view indexed
+        by (column, voting group position).
+
+        The contest's summary results must already be set.
+        """
+        column_count = get_column_count(contest)
+        group_count = len(contest.result_style.voting_groups)
+
+        return self.values[contest.index, :column_count, :group_count]
+
+    def get_values(self, contest, column_index, group_indexes):
+        """
+        Return the values of one column of a contest's summary results,
+        as a list of ints.
+
+        The contest's summary results must already be set.
+
+        Args:
+          column_index: the index of the column, as in the contest's
+            results.
+          group_indexes: the voting group positions, as a list.
+        """
+        return self.values[contest.index, column_index, group_indexes].tolist()
@@ -0,0 +1,160 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Support for bounding the memory used by loaded contest results.
+
+By default, once a contest's results are loaded they stay attached to
+the Contest object for the rest of the run.  A ResultsManager instead
+owns the loaded results of all contests, and evicts the least recently
+used contests' results when a byte budget is exceeded.  Evicted results
+are reloaded transparently the next time they are accessed.
+"""
+
+from collections import OrderedDict
+import logging
+import sys
+
+import numpy as np
+
+from orr.sparseresults import SparseResults
+
+
+_log = logging.getLogger(__name__)
+
+
+def estimate_size(results, rcv_totals):
+    """
+    Return an estimate of the number of bytes used by a contest's results
+    and RCV totals.
+
+    Args:
+      results: a list of lists of ints, a 2-D numpy array, or a
+        SparseResults object.
+      rcv_totals: a list of tuples.
+    """
+    if isinstance(results, (np.ndarray, SparseResults)):
+        size = results.nbytes
+    else:
+        size = sys.getsizeof(results)
+        for row in results:
+            size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+
+    size += sys.getsizeof(rcv_totals)
+    for round_totals in rcv_totals:
+        size += sys.getsizeof(round_totals) + sum(sys.getsizeof(value) for value in round_totals)
+
+    return size
+
+
+class ResultsManager:
+
+    """
+    Owns the loaded results of every contest, subject to a byte budget.
+
+    The data for each contest is the pair (results, rcv_totals).  The
+    data for the contest accessed most recently is never evicted, even
+    if it alone exceeds the budget.
+
+    Instance attributes:
+
+      max_bytes: the byte budget.
+      total_bytes: the estimated number of bytes currently held.
+      hits: the number of accesses to data that was already loaded.
+      misses: the number of accesses that required loading data.
+      evictions: the number of times a contest's data was evicted.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+
+        # A dict mapping contest to (data, size), from least recently
+        # used to most recently used.
+        self._entries = OrderedDict()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return (f'<ResultsManager max_bytes={self.max_bytes}: total_bytes={self.total_bytes}, '
+                f'hits={self.hits}, misses={self.misses}, evictions={self.evictions}>')
+
+    def __contains__(self, contest):
+        return contest in self._entries
+
+    def format_stats(self):
+        """
+        Return the hit, miss and eviction counts as a string for logging.
+        """
+        return (f'hits={self.hits}, misses={self.misses}, evictions={self.evictions}, '
+                f'held={self.total_bytes} bytes (budget={self.max_bytes} bytes)')
+
+    def _evict(self):
+        """
+        Evict least recently used data until within budget.
+        """
+        # Stop before evicting the most recently used entry.
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            contest, (data, size) = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            _log.debug(f'evicted results for {contest!r} ({size} bytes)')
+
+    def put(self, contest, data):
+        """
+        Store the data for a contest as the most recently used entry.
+
+        Args:
+          data: a pair (results, rcv_totals).
+        """
+        if contest in self._entries:
+            old_data, old_size = self._entries.pop(contest)
+            self.total_bytes -= old_size
+
+        size = estimate_size(*data)
+        self._entries[contest] = (data, size)
+        self.total_bytes += size
+
+        self._evict()
+
+    def get(self, contest, load):
+        """
+        Return the data for a contest, loading it if necessary.
+
+        Args:
+          load: a function with signature load(contest) that loads and
+            returns the pair (results, rcv_totals).
+        """
+        try:
+            data, size = self._entries[contest]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            self._entries.move_to_end(contest)
+            return data
+
+        self.misses += 1
+        data = load(contest)
+        self.put(contest, data)
+
+        return data
@@ -0,0 +1,308 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Support for computing district and other subtotal rows ("roll-ups")
+from precinct-level results.
+
+A results file normally has a row for every reporting group of the
+contest's voting district.  Alternatively, a results file can contain
+only the "base" rows, which are the reporting groups whose area isn't
+a roll-up area, in the same order as in reporting_group_ids.  The
+roll-up rows are then computed by summing base rows.  A file is only
+treated as containing the base rows if its area_id and subtotal_type
+columns match the base reporting groups exactly and in order.
+
+An area is a roll-up area if it is the "*" area, or if it has members.
+The members of an area are the areas listed in its consolidated_ids,
+along with the areas listing it in their district_ids (which maps
+precincts to the districts containing them).  A member that is itself
+a roll-up area (e.g. a neighborhood within a district) is replaced by
+its own members, recursively.  The "*" area's members are the areas of
+the base rows that are precincts, so that base rows for districts
+without declared members (whose values the results file gives) aren't
+counted twice.
+
+A roll-up row with voting group "TO" sums every base row of its member
+areas (using a member's own "TO" row, if it has one).  Other roll-up
+rows sum the base rows of their members with the same voting group.
+
+The sums are computed as the product of a sparse 0-1 membership matrix
+(with a row for each roll-up row, and a column for each base row) and
+the matrix of base rows.
+"""
+
+import logging
+
+import numpy as np
+
+from orr.datamodel import AREA_ID_ALL, VOTING_GROUP_ID_ALL, parse_ids_text
+
+
+_log = logging.getLogger(__name__)
+
+
+def get_members_by_area_id(areas):
+    """
+    Return a dict mapping the id of each area with members to the set of
+    its member area ids.
+
+    Args:
+      areas: an iterable of Area objects.
+    """
+    members_by_area_id = {}
+    for area in areas:
+        if area.consolidated_ids:
+            members = members_by_area_id.setdefault(area.id, set())
+            members.update(parse_ids_text(area.consolidated_ids))
+        if area.district_ids:
+            for district_id in parse_ids_text(area.district_ids):
+                members_by_area_id.setdefault(district_id, set()).add(area.id)
+
+    return members_by_area_id
+
+
+class MembershipMatrix:
+
+    """
+    A sparse matrix of 0's and 1's, stored in compressed sparse row
+    (CSR) form.
+
+    Instance attributes:
+
+      indptr: a 1-D int array, where the column indices of row i are
+        indices[indptr[i]:indptr[i + 1]].
+      indices: a 1-D int array of the column indices of the 1's.
+      shape: the pair (row_count, column_count).
+    """
+
+    def __init__(self, rows, column_count):
+        """
+        Args:
+          rows: an iterable of lists, where the i-th list contains the
+            column indices of the 1's in row i.
+          column_count: the number of columns.
+        """
+        rows = list(rows)
+        lengths = [len(row) for row in rows]
+
+        self.indptr = np.concatenate([[0], np.cumsum(lengths, dtype=np.intp)]).astype(np.intp)
+        self.indices = np.array([index for row in rows for index in row], dtype=np.intp)
+        self.shape = (len(rows), column_count)
+
+    def __repr__(self):
+        return f'<MembershipMatrix shape={self.shape}: {len(self.indices)} nonzero>'
+
+    def multiply(self, values):
+        """
+        Return the matrix product of this matrix with a 2-D array.
+
+        Args:
+          values: a 2-D numpy array with one row for each column of this
+            matrix.
+        """
+        row_count = self.shape[0]
+        product = np.zeros((row_count, values.shape[1]), dtype=values.dtype)
+        if not len(self.indices):
+            return product
+
+        # Sum the selected rows within each segment of indices.  Since
+        # reduceat() doesn't handle empty segments, sum only over the
+        # non-empty rows.
+        starts = self.indptr[:-1]
+        is_nonempty = self.indptr[1:] > starts
+        sums = np.add.reduceat(values[self.indices], starts[is_nonempty], axis=0)
+        product[is_nonempty] = sums
+
+        return product
+
+
+class RollupPlan:
+
+    """
+    How to compute the full results of a reporting group table from
+    its base rows.
+
+    Instance attributes:
+
+      row_count: the number of rows in the full results.
+      base_keys: the pair (area_id, voting_group_id) of each base row, as
+        a list of tuples in order.
+      base_indexes: a 1-D int array of the full results row index of each
+        base row, in order.
+      rollup_indexes: a 1-D int array of the full results row index of
+        each roll-up row, in order.
+      matrix: a MembershipMatrix object mapping base rows to roll-up rows.
+    """
+
+    def __init__(self, row_count, base_keys, base_indexes, rollup_indexes, matrix):
+        self.row_count = row_count
+        self.base_keys = base_keys
+        self.base_indexes = np.array(base_indexes, dtype=np.intp)
+        self.rollup_indexes = np.array(rollup_indexes, dtype=np.intp)
+        self.matrix = matrix
+
+    def __repr__(self):
+        return (f'<RollupPlan: {len(self.base_indexes)} base rows, '
+                f'{len(self.rollup_indexes)} roll-up rows>')
+
+    @property
+    def base_row_count(self):
+        return len(self.base_indexes)
+
+    def is_base_rows(self, row_keys):
+        """
+        Return whether the rows of a results file are the base rows.
+
+        Args:
+          row_keys: the pair (area_id, voting_group_id) of each row of
+            the file, as a list of tuples.
+        """
+        return row_keys == self.base_keys
+
+    def apply(self, base_results):
+        """
+        Return the full results, as a 2-D numpy array.
+
+        Args:
+          base_results: the base rows, as a 2-D numpy array.
+        """
+        results = np.zeros((self.row_count, base_results.shape[1]), dtype=base_results.dtype)
+        results[self.base_indexes] = base_results
+        results[self.rollup_indexes] = self.matrix.multiply(base_results)
+
+        return results
+
+
+def _expand_members(area_id, members_by_area_id, expanded, visiting=()):
+    """
+    Return the set of the ids of the areas that are members of an area,
+    replacing members that are roll-up areas with their own members.
+
+    Args:
+      area_id: the id of a roll-up area other than "*".
+      members_by_area_id: a dict mapping the id of each area with members
+        to the set of its member area ids.
+      expanded: a dict mapping area id to the return value, for areas
+        already expanded.
+      visiting: the ids of the areas being expanded, as a tuple, to
+        detect areas that contain themselves.
+    """
+    try:
+        return expanded[area_id]
+    except KeyError:
+        pass
+
+    if area_id in visiting:
+        cycle = ' -> '.join(visiting[visiting.index(area_id):] + (area_id, ))
+        raise RuntimeError(f'roll-up area contains itself: {cycle}')
+
+    visiting += (area_id, )
+    members = set()
+    for member_id in members_by_area_id[area_id]:
+        if member_id in members_by_area_id:
+            members.update(_expand_members(member_id, members_by_area_id, expanded=expanded,
+                                           visiting=visiting))
+        else:
+            members.add(member_id)
+
+    expanded[area_id] = members
+
+    return members
+
+
+def _get_member_base_rows(target_key, members, base_indexes_by_area):
+    """
+    Return the (base) row numbers to sum for a roll-up reporting group.
+
+    Args:
+      target_key: the pair (area_id, voting_group_id) of the roll-up row.
+      members: the ids of the member areas.
+      base_indexes_by_area: a dict mapping area id to a dict mapping
+        voting group id to base row number.
+    """
+    voting_group_id = target_key[1]
+    base_rows = []
+    for area_id in members:
+        base_indexes = base_indexes_by_area.get(area_id)
+        if not base_indexes:
+            continue
+        if voting_group_id != VOTING_GROUP_ID_ALL:
+            if voting_group_id in base_indexes:
+                base_rows.append(base_indexes[voting_group_id])
+        elif VOTING_GROUP_ID_ALL in base_indexes:
+            base_rows.append(base_indexes[VOTING_GROUP_ID_ALL])
+        else:
+            base_rows.extend(base_indexes.values())
+
+    return sorted(base_rows)
+
+
+def make_rollup_plan(reporting_group_keys, members_by_area_id, precinct_ids):
+    """
+    Return a RollupPlan object for a reporting group table, or None if
+    the table has no roll-up rows.
+
+    Raises RuntimeError if a roll-up area contains itself, directly or
+    through other roll-up areas.
+
+    Args:
+      reporting_group_keys: the pair (area_id, voting_group_id) of each
+        reporting group, in results row order.
+      members_by_area_id: a dict mapping area id to the set of its member
+        area ids (see get_members_by_area_id()).
+      precinct_ids: the ids of the areas that are precincts, as a set.
+    """
+    base_indexes = []
+    rollup_indexes = []
+    # A dict mapping area id to a dict mapping voting group id to base
+    # row number.
+    base_indexes_by_area = {}
+    for index, (area_id, voting_group_id) in enumerate(reporting_group_keys):
+        if area_id == AREA_ID_ALL or area_id in members_by_area_id:
+            rollup_indexes.append(index)
+            continue
+        groups = base_indexes_by_area.setdefault(area_id, {})
+        groups.setdefault(voting_group_id, len(base_indexes))
+        base_indexes.append(index)
+
+    if not rollup_indexes:
+        return None
+
+    # A dict mapping area id to its expanded members.
+    expanded = {}
+    rows = []
+    for index in rollup_indexes:
+        key = reporting_group_keys[index]
+        area_id = key[0]
+        if area_id == AREA_ID_ALL:
+            members = [member_id for member_id in base_indexes_by_area
+                       if member_id in precinct_ids]
+        else:
+            members = _expand_members(area_id, members_by_area_id, expanded=expanded)
+        rows.append(_get_member_base_rows(key, members, base_indexes_by_area))
+
+    matrix = MembershipMatrix(rows, column_count=len(base_indexes))
+
+    base_keys = [tuple(reporting_group_keys[index]) for index in base_indexes]
+
+    return RollupPlan(len(reporting_group_keys), base_keys=base_keys,
+                      base_indexes=base_indexes, rollup_indexes=rollup_indexes,
+                      matrix=matrix)
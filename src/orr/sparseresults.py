@@ -0,0 +1,171 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Support for storing contest results that are mostly zero rows.
+
+In a consolidated election, most contests appear on the ballots of only
+a few of the precincts in their voting district's reporting groups, so
+most of their results rows are all zeros.  A SparseResults object
+stores only the rows that aren't all zeros.
+
+When contest results are stored as arrays (see
+datamodel.RESULTS_STORE_ARRAY), results whose fraction of zero rows is
+at least SPARSE_ROW_THRESHOLD are converted to a SparseResults object
+when they are loaded.
+"""
+
+import logging
+
+import numpy as np
+
+
+_log = logging.getLogger(__name__)
+
+# The minimum fraction of all-zero rows for storing results sparsely.
+SPARSE_ROW_THRESHOLD = 0.5
+
+
+class SparseResults:
+
+    """
+    A 2-D results matrix that stores only its rows that aren't all
+    zeros.
+
+    Indexing with an int or slice returns the same (dense) values as
+    indexing the full matrix.
+
+    Instance attributes:
+
+      row_indexes: a 1-D int array of the (increasing) indexes of the
+        stored rows.
+      values: a 2-D array of the stored rows.
+      shape: the shape of the full matrix.
+    """
+
+    def __init__(self, row_indexes, values, row_count):
+        """
+        Args:
+          row_count: the number of rows in the full matrix.
+        """
+        self.row_indexes = row_indexes
+        self.values = values
+        self.shape = (row_count, values.shape[1])
+
+    def __repr__(self):
+        return f'<SparseResults shape={self.shape}: {len(self.row_indexes)} nonzero rows>'
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.get_rows(range(*key.indices(len(self))))
+
+        return self.get_rows([key])[0]
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nbytes(self):
+        return self.row_indexes.nbytes + self.values.nbytes
+
+    def get_nonzero_mask(self):
+        """
+        Return a 1-D bool array of whether each row isn't all zeros.
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.row_indexes] = True
+
+        return mask
+
+    def get_rows(self, row_indexes):
+        """
+        Return the given rows of the full matrix, as a 2-D array.
+
+        Args:
+          row_indexes: a sequence of row indexes.
+        """
+        positions = np.full(len(self), -1, dtype=np.intp)
+        positions[self.row_indexes] = np.arange(len(self.row_indexes))
+        # Look up each row's position in values, with -1 for zero rows.
+        row_positions = positions[np.asarray(row_indexes, dtype=np.intp)]
+
+        rows = np.zeros((len(row_positions), self.shape[1]), dtype=self.dtype)
+        is_stored = row_positions >= 0
+        rows[is_stored] = self.values[row_positions[is_stored]]
+
+        return rows
+
+    def toarray(self):
+        """
+        Return the full matrix, as a 2-D array.
+        """
+        array = np.zeros(self.shape, dtype=self.dtype)
+        array[self.row_indexes] = self.values
+
+        return array
+
+    def tolist(self):
+        return self.toarray().tolist()
+
+
+def get_nonzero_mask(results):
+    """
+    Return a 1-D bool array of whether each results row isn't all zeros.
+
+    Args:
+      results: a list of lists, a 2-D numpy array, or a SparseResults
+        object.
+    """
+    if isinstance(results, SparseResults):
+        return results.get_nonzero_mask()
+
+    if isinstance(results, np.ndarray):
+        return results.any(axis=1)
+
+    return np.array([any(row) for row in results], dtype=bool)
+
+
+def maybe_make_sparse(results, threshold=None):
+    """
+    Return the results as a SparseResults object if the fraction of
+    all-zero rows is at least the threshold, and otherwise unchanged.
+
+    Args:
+      results: a 2-D numpy array.
+      threshold: the threshold to use.  Defaults to SPARSE_ROW_THRESHOLD.
+    """
+    if threshold is None:
+        threshold = SPARSE_ROW_THRESHOLD
+
+    row_count = len(results)
+    if not row_count:
+        return results
+
+    row_indexes = np.flatnonzero(results.any(axis=1))
+    if row_count - len(row_indexes) < threshold * row_count:
+        return results
+
+    # Copy the rows so the full array (e.g. a memory-mapped cache file)
+    # isn't kept alive.
+    return SparseResults(row_indexes, values=results[row_indexes], row_count=row_count)
@@ -0,0 +1,476 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Support for incrementally ingesting results files as they grow.
+
+On election night, the tabulation export appends reporting group rows
+to the results files and rewrites the contest status file every few
+minutes.  A ResultsTailer remembers how far it has read each contest's
+results file, so each update parses only the rows appended since the
+previous update.
+
+A results file is read again from the start if any of the following
+is true:
+
+  * the file got shorter,
+  * the header line or RCV rows changed,
+  * the last line previously read changed,
+  * the contest's number of RCV rounds changed, or
+  * the file is compressed.
+
+A trailing line without a newline may still be being written, so it
+isn't read until a later update finds it completed.
+
+Similarly, a results file with fewer rows than the contest's reporting
+groups is still being written.  Its rows are kept, but the contest's
+results aren't set (and the contest keeps any results it had before)
+until a later update finds the rest of the rows.
+"""
+
+import concurrent.futures
+import hashlib
+import io
+import logging
+from pathlib import Path
+
+import numpy as np
+
+import orr.dataloading as dataloading
+import orr.datamodel as datamodel
+from orr.resultscache import get_source_key
+from orr.tsvio import TSVStream
+import orr.utils as utils
+
+
+_log = logging.getLogger(__name__)
+
+
+def _hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _get_prefix_length(data, line_count):
+    """
+    Return the number of bytes in the first line_count lines of data.
+    """
+    offset = 0
+    for _ in range(line_count):
+        index = data.find(b'\n', offset)
+        if index < 0:
+            return len(data)
+        offset = index + 1
+
+    return offset
+
+
+def _get_last_line(data):
+    """
+    Return the last line of data, as bytes (including any newline).
+    """
+    # Skip a final newline when searching for the start of the line.
+    start = data.rfind(b'\n', 0, len(data) - 1) + 1
+
+    return data[start:]
+
+
+def _get_complete_lines(data):
+    """
+    Return the part of data up to and including its last newline.
+    """
+    return data[:data.rfind(b'\n') + 1]
+
+
+def _parse_rows(rows):
+    return [[int(value) for value in row] for row in rows]
+
+
+class ResultsFileState:
+
+    """
+    What a ResultsTailer remembers about a contest's results file.
+
+    Instance attributes:
+
+      path: the path to the file, as a Path object.
+      rcv_rounds: the number of RCV rounds the file was read with.
+      header: the header line, as a list of strings.
+      prefix_length: the length in bytes of the header line and RCV rows.
+      prefix_hash: the SHA-256 hash of the header line and RCV rows.
+      offset: the number of bytes read.  This excludes any trailing line
+        without a newline.
+      last_line: the last line read, as bytes.
+      line_num: the number of lines read.
+      source_key: the file's size and modification time when last read.
+      rcv_totals: the RCV totals, as a list of tuples.
+      rows: the reporting group rows read so far, as lists of ints.
+      row_keys: the pair (area_id, voting_group_id) of each row read so
+        far, as a list of tuples.
+    """
+
+    def __init__(self, path, rcv_rounds):
+        self.path = path
+        self.rcv_rounds = rcv_rounds
+
+        self.header = None
+        self.prefix_length = 0
+        self.prefix_hash = None
+        self.offset = 0
+        self.last_line = b''
+        self.line_num = 0
+        self.source_key = None
+        self.rcv_totals = None
+        self.rows = None
+        self.row_keys = None
+
+    def __repr__(self):
+        return f'<ResultsFileState {self.path}: offset={self.offset}, rows={len(self.rows or ())}>'
+
+    def _set_read_info(self, data, line_num, source_key):
+        """
+        Record how much of the file was read.
+
+        Args:
+          data: the bytes read (or for an incremental read, the bytes
+            newly read).
+        """
+        self.offset += len(data)
+        if data:
+            self.last_line = _get_last_line(data)
+        self.line_num = line_num
+        self.source_key = source_key
+
+    def read_all(self, column_count):
+        """
+        Read the file from the start.
+        """
+        source_key = get_source_key(self.path, with_hash=False)
+        opener = utils.COMPRESSED_OPENERS.get(self.path.suffix, open)
+        with opener(self.path, mode='rb') as f:
+            data = _get_complete_lines(f.read())
+
+        tsv_stream = TSVStream(io.StringIO(data.decode(utils.UTF8_ENCODING)))
+        iter_rows = iter(tsv_stream)
+        rcv_totals = dataloading.read_results_header(tsv_stream, iter_rows, path=self.path,
+                            column_count=column_count, rcv_rounds=self.rcv_rounds)
+        rows, row_keys = dataloading.read_results_rows(tsv_stream, iter_rows, path=self.path)
+
+        self.header = tsv_stream.header
+        self.prefix_length = _get_prefix_length(data, line_count=1 + self.rcv_rounds)
+        self.prefix_hash = _hash_bytes(data[:self.prefix_length])
+        self.rcv_totals = rcv_totals
+        self.rows = _parse_rows(rows)
+        self.row_keys = row_keys
+
+        self.offset = 0
+        self._set_read_info(data, line_num=tsv_stream.line_num, source_key=source_key)
+
+    def read_appended(self):
+        """
+        Read the rows appended since the previous read.
+
+        Returns the number of rows read, or None if the file needs to be
+        read from the start.
+        """
+        if self.path.suffix in utils.COMPRESSED_OPENERS:
+            return None
+        if not self.last_line:
+            # Then nothing was read (e.g. the header line was incomplete).
+            return None
+
+        source_key = get_source_key(self.path, with_hash=False)
+        if source_key['size'] < self.offset:
+            return None
+
+        with open(self.path, mode='rb') as f:
+            prefix = f.read(self.prefix_length)
+            if _hash_bytes(prefix) != self.prefix_hash:
+                return None
+
+            # Check that the last line read is unchanged, as a guard
+            # against the file having been rewritten.
+            f.seek(self.offset - len(self.last_line))
+            if f.read(len(self.last_line)) != self.last_line:
+                return None
+
+            data = _get_complete_lines(f.read())
+
+        if not data:
+            self.source_key = source_key
+            return 0
+
+        tsv_stream = TSVStream(io.StringIO(data.decode(utils.UTF8_ENCODING)),
+                               read_header=False, header=self.header, line_num=self.line_num)
+        iter_rows = iter(tsv_stream)
+        # Skip the header, which TSVStream yields first.
+        next(iter_rows)
+        rows, row_keys = dataloading.read_results_rows(tsv_stream, iter_rows, path=self.path)
+        self.rows.extend(_parse_rows(rows))
+        self.row_keys.extend(row_keys)
+
+        self._set_read_info(data, line_num=tsv_stream.line_num, source_key=source_key)
+
+        return len(rows)
+
+
+def read_all(state, column_count):
+    """
+    Read a results file from the start, and return the ResultsFileState
+    object.
+
+    This can be run in a worker process.
+    """
+    state.read_all(column_count=column_count)
+
+    return state
+
+
+def is_complete(contest, state):
+    """
+    Return whether the rows read from a contest's results file include
+    every row, rather than only the rows written so far.
+
+    The file is complete if it has a row for every reporting group, or
+    if it has exactly the base rows of a roll-up (see orr.rollup).
+    """
+    if len(state.rows) >= contest.reporting_group_count:
+        return True
+
+    rollup_plan = contest.reporting_group_table.rollup_plan
+
+    return rollup_plan is not None and rollup_plan.is_base_rows(state.row_keys)
+
+
+class ResultsTailer:
+
+    """
+    Keeps an election's contest statuses and results up to date with
+    input files that grow over time.
+
+    Instance attributes:
+
+      election: the Election object.
+      workers: the maximum number of worker processes to use when reading
+        several results files from the start, or None to read them in
+        the current process.
+      full_reads: the number of times a results file was read from the start.
+      partial_reads: the number of times only the appended part of a
+        results file was read.
+    """
+
+    def __init__(self, election, workers=None):
+        self.election = election
+        self.workers = workers
+
+        # A dict mapping contest to ResultsFileState object.
+        self._file_states = {}
+        # A dict mapping the path of each contest status file to its
+        # source key when last read.
+        self._status_keys = {}
+
+        # The contests found to have changed by an update() call that
+        # didn't finish.
+        self._pending = set()
+        # The contests whose results files were last found incomplete.
+        self._incomplete = set()
+
+        self.full_reads = 0
+        self.partial_reads = 0
+
+    def __repr__(self):
+        return f'<ResultsTailer: full_reads={self.full_reads}, partial_reads={self.partial_reads}>'
+
+    def _get_status_keys(self):
+        input_dirs = {self.election.input_dir}
+        input_dirs.update(contest.input_dir for contest in self.election.contests)
+        paths = [utils.find_input_path(input_dir / dataloading.CONTEST_STATUS_PATH)
+                 for input_dir in input_dirs]
+        # Also include any ballots files, since the statuses include
+        # the RCV rounds tabulated from them.
+        ballots_paths = (dataloading.get_contest_ballots_path(contest)
+                         for contest in self.election.contests)
+        paths.extend(path for path in ballots_paths if path.exists())
+
+        return {path: get_source_key(path) for path in paths}
+
+    def _update_statuses(self):
+        """
+        Reload the contest statuses if a contest status file (or ballots
+        file) changed.
+
+        Returns the set of contests whose status changed.
+        """
+        election = self.election
+        status_keys = self._get_status_keys()
+        if status_keys == self._status_keys:
+            return set()
+
+        contests = list(election.contests)
+        old_statuses = [contest.get_status() for contest in contests]
+        election.reload_contest_statuses()
+        self._status_keys = status_keys
+
+        return {contest for contest, old_status in zip(contests, old_statuses)
+                if contest.get_status() != old_status}
+
+    def _update_appended(self, contest, parse_info):
+        """
+        Bring a contest's results up to date by reading only the rows
+        appended to its results file, if possible.
+
+        Returns whether the results changed, or None if the file needs to
+        be read from the start.
+        """
+        path = Path(parse_info['path'])
+        state = self._file_states.get(contest)
+        if (state is None or state.path != path or
+            state.rcv_rounds != parse_info['rcv_rounds']):
+            return None
+
+        if get_source_key(path, with_hash=False) == state.source_key:
+            return False
+
+        # Forget the state until the results are set, so that after an
+        # error the file is read again from the start.
+        del self._file_states[contest]
+        row_count = state.read_appended()
+        if row_count is None:
+            return None
+
+        self.partial_reads += 1
+        _log.debug(f'read {row_count} appended rows from: {path}')
+        is_changed = bool(row_count) and self._set_contest_results(contest, state)
+        self._file_states[contest] = state
+
+        return is_changed
+
+    def _read_all(self, pending):
+        """
+        Read results files from the start, and return the new
+        ResultsFileState objects, in the same order.
+
+        Args:
+          pending: a list of pairs (contest, parse_info).
+        """
+        states = [ResultsFileState(Path(parse_info['path']), rcv_rounds=parse_info['rcv_rounds'])
+                  for contest, parse_info in pending]
+        column_counts = [parse_info['column_count'] for contest, parse_info in pending]
+
+        if self.workers and len(pending) > 1:
+            _log.info(f'reading {len(pending)} results files using {self.workers} workers')
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+                states = list(executor.map(read_all, states, column_counts))
+        else:
+            states = [read_all(state, column_count)
+                      for state, column_count in zip(states, column_counts)]
+
+        self.full_reads += len(states)
+        for state in states:
+            _log.debug(f'read results file from the start: {state.path}')
+
+        return states
+
+    def _set_contest_results(self, contest, state):
+        """
+        Set a contest's results from the rows read so far, if the file is
+        complete.
+
+        Returns whether the results were set.
+        """
+        if not is_complete(contest, state):
+            _log.debug(f'waiting for the rest of the rows ({len(state.rows)} read): {state.path}')
+            self._incomplete.add(contest)
+            return False
+
+        self._incomplete.discard(contest)
+        if self.election.results_store == datamodel.RESULTS_STORE_ARRAY:
+            column_count = len(state.header) - 2
+            results = np.array(state.rows, dtype=datamodel.RESULTS_DTYPE)
+            results = results.reshape(len(state.rows), column_count)
+        else:
+            # Copy the list since later reads append to state.rows.
+            results = list(state.rows)
+
+        data = dataloading.check_contest_results(contest, state.path, results, state.rcv_totals,
+                                                 row_keys=state.row_keys)
+        contest.set_results_data(*data)
+
+        return True
+
+    def get_incomplete_contests(self):
+        """
+        Return the contests whose results files were found incomplete by
+        the most recent update, as a list in election order.
+
+        Those contests keep the results they had before, if any.
+        """
+        return [contest for contest in self.election.contests
+                if contest in self._incomplete]
+
+    def update(self):
+        """
+        Bring the contest statuses and results up to date with the input
+        files.
+
+        Returns the contests whose status or results changed, as a list
+        in election order.  The first call returns all contests, except
+        those whose results files are incomplete (see
+        get_incomplete_contests()).  If a call raises an error (e.g. for
+        an invalid input file), the contests it found changed are also
+        returned by the next call that succeeds.
+        """
+        election = self.election
+        changed = self._pending
+        changed.update(self._update_statuses())
+
+        # The contests whose results files need to be read from the start,
+        # as pairs (contest, parse_info), and their previous states.
+        pending = []
+        old_states = []
+        for contest in election.contests:
+            parse_info = dataloading.get_results_parse_info(contest)
+            old_state = self._file_states.get(contest)
+            is_changed = self._update_appended(contest, parse_info)
+            if is_changed is None:
+                # Forget any state until the results are set, as in
+                # _update_appended().
+                self._file_states.pop(contest, None)
+                pending.append((contest, parse_info))
+                old_states.append(old_state)
+            elif is_changed:
+                changed.add(contest)
+            elif contest in changed and contest.rcv_tabulation is not None:
+                # Then the RCV rounds may have been tabulated again.
+                self._set_contest_results(contest, self._file_states[contest])
+
+        states = self._read_all(pending)
+        for (contest, parse_info), old_state, state in zip(pending, old_states, states):
+            if old_state is None or not is_complete(contest, old_state):
+                old_data = None
+            else:
+                old_data = (old_state.rows, old_state.rcv_totals)
+            if self._set_contest_results(contest, state):
+                if (state.rows, state.rcv_totals) != old_data:
+                    changed.add(contest)
+            self._file_states[contest] = state
+
+        self._pending = set()
+
+        return [contest for contest in election.contests if contest in changed]
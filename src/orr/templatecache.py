@@ -0,0 +1,197 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Support for caching compiled templates on disk.
+
+Jinja2 compiles each template to Python code the first time it is
+loaded, which for the larger templates can be a noticeable part of a
+run.  A TemplateCache stores the compiled code in the cache directory,
+so later runs (and the worker processes of later runs) can skip
+compiling templates that haven't changed.
+
+A cached template is used only if the checksum of the template source
+matches, and the cache file names include the Jinja2 version and a hash
+of ORR's source files (since e.g. our extensions generate part of the
+compiled code), so upgrading Jinja2 or ORR also invalidates the cache.  The "orr precompile"
+command fills the cache ahead of time (see precompile_templates()).
+"""
+
+import logging
+from pathlib import Path
+import time
+
+import jinja2
+from jinja2 import FileSystemBytecodeCache
+
+import orr.utils as utils
+
+
+_log = logging.getLogger(__name__)
+
+# The format of the pattern passed to FileSystemBytecodeCache.  In the
+# pattern, "%s" is replaced by the key of the template (a hash of its
+# name and path).
+CACHE_FILE_PATTERN_FORMAT = 'orr-jinja-{jinja2_version}-{source_hash}-%s.cache'
+
+
+def make_cache_file_pattern():
+    """
+    Return the pattern to pass to FileSystemBytecodeCache.
+    """
+    # Include a hash of ORR's source files since the program version
+    # doesn't change with every change to e.g. the extensions.
+    source_hash = utils.get_package_source_hash()[:16]
+
+    return CACHE_FILE_PATTERN_FORMAT.format(jinja2_version=jinja2.__version__,
+                                            source_hash=source_hash)
+
+
+class TemplateCache(FileSystemBytecodeCache):
+
+    """
+    A Jinja2 bytecode cache that keeps statistics.
+
+    Instance attributes:
+
+      cache_dir: the directory containing the cache files, as a Path object.
+      hits: the number of templates loaded from the cache.
+      misses: the number of templates that needed compiling.
+    """
+
+    def __init__(self, cache_dir, rebuild=False):
+        """
+        Args:
+          rebuild: whether to delete the existing cache files (for the
+            current Jinja2 version and ORR source files).
+        """
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        super().__init__(str(cache_dir), pattern=make_cache_file_pattern())
+
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+        if rebuild:
+            self.clear()
+
+    def __repr__(self):
+        return f'<TemplateCache {self.cache_dir}: hits={self.hits}, misses={self.misses}>'
+
+    def load_bytecode(self, bucket):
+        # The bucket's code is left as None if the file doesn't exist or
+        # its checksum doesn't match the template source.
+        super().load_bytecode(bucket)
+        if bucket.code is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError as exc:
+            # Not being able to write to the cache shouldn't stop a run.
+            _log.warning(f'error writing template cache file for {bucket.key!r}: {exc}')
+
+
+class CompileTimer:
+
+    """
+    Records the time a Jinja2 Environment spends compiling templates.
+
+    Instance attributes:
+
+      count: the number of templates compiled.
+      seconds: the total time spent compiling, in seconds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0
+
+    def __repr__(self):
+        return f'<CompileTimer count={self.count}: {self.seconds:.3f}s>'
+
+    def format_stats(self, total_seconds=None):
+        """
+        Return a string describing the compilation time.
+
+        Args:
+          total_seconds: the total time of the run, if the compilation
+            time should also be shown as a percentage of it.
+        """
+        text = f'compiled {self.count} templates in {self.seconds:.3f}s'
+        if total_seconds:
+            text += f' ({100 * self.seconds / total_seconds:.1f}% of {total_seconds:.3f}s)'
+
+        return text
+
+
+class TimedEnvironment(jinja2.Environment):
+
+    """
+    A Jinja2 Environment that records the time spent compiling templates.
+
+    Instance attributes:
+
+      compile_timer: a CompileTimer object.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compile_timer = CompileTimer()
+
+    def compile(self, *args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            return super().compile(*args, **kwargs)
+        finally:
+            timer = self.compile_timer
+            timer.count += 1
+            timer.seconds += time.perf_counter() - start_time
+
+
+def precompile_templates(env):
+    """
+    Load every template the environment's loader can find, so that any
+    compiled templates not already in the environment's bytecode cache
+    are added to it.
+
+    Returns the names of the templates loaded.
+    """
+    names = []
+    for name in env.list_templates():
+        try:
+            env.get_template(name)
+        except UnicodeDecodeError:
+            # Then the file isn't a text file (e.g. an image), so it
+            # can't be a template.
+            _log.debug(f'skipping non-text file in template directory: {name}')
+            continue
+        except jinja2.TemplateSyntaxError as exc:
+            msg = f'error compiling template {name!r} (line {exc.lineno}): {exc.message}'
+            raise RuntimeError(msg) from exc
+
+        names.append(name)
+
+    return names
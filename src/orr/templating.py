@@ -33,6 +33,10 @@ import re
 from jinja2 import (contextfilter, contextfunction, environmentfilter,
     environmentfunction, Undefined)
 
+import orr.buildtracking as buildtracking
+from orr.buildtracking import INPUT_TRANSLATION
+from orr.i18n import I18nText
+from orr.renderscheduler import get_render_scheduler
 import orr.utils as utils
 import orr.writers.pdfwriting.pdfwriter as pdfwriter
 import orr.writers.tsvwriting as tsvwriting
@@ -78,6 +82,21 @@ def secure_hash(env, rel_path):
         Jinja2 Environment object. This can be any path-like object.
     """
     path = utils.get_output_path(env, rel_path)
+
+    tracker = buildtracking.get_tracker()
+    if tracker is not None:
+        tracker.record_hashed_file(rel_path)
+
+    scheduler = get_render_scheduler(env)
+    if scheduler is not None:
+        if scheduler.is_pending(rel_path):
+            # Let the file finish rendering in its worker process.
+            return scheduler.make_hash_placeholder(rel_path)
+        scheduler.wait_for(rel_path)
+        if not path.exists():
+            # Then the file might be created by a subtemplate of a job.
+            scheduler.wait_all()
+
     sha = utils.hash_file(path)
 
     return sha
@@ -117,6 +136,12 @@ def format_date_medium(context, day):
 
 
 def choose_translation(translations, lang):
+    if type(translations) == I18nText:
+        # Then use the text's precomputed language slot, if possible.
+        text = translations.get_text(lang)
+        if text is not None:
+            return text
+
     try:
         text = translations[lang]
     except KeyError:
@@ -135,7 +160,13 @@ def translate(context, value):
     options = context['options']
     lang = options.lang
 
-    if type(value) == dict:
+    if type(value) == I18nText:
+        # This is the common case, for i18n values from the input data.
+        text = value.get_text(lang)
+        if text is not None:
+            return text
+
+    if isinstance(value, dict):
         text = choose_translation(value, lang)
     else:
         # Then assume the value is the key for a translation.
@@ -144,6 +175,7 @@ def translate(context, value):
         except KeyError:
             raise RuntimeError(f'"translations" missing while translating: {value}')
         translations = all_trans[value]
+        buildtracking.record_input(INPUT_TRANSLATION, value)
         text = choose_translation(translations, lang)
 
     return text
@@ -175,14 +207,37 @@ def subtemplate(context, template_name, output_path):
     """
     Render a template.
 
+    If the environment has a render scheduler, the template is rendered
+    in a worker process, and this function returns without waiting.
+    If there is an active build tracker and the output is unchanged
+    since the previous build, the previous output is used instead.
+
     Args:
       output_path: the output path (relative to the output directory
         configured in the Jinja2 Environment object).
     """
     env = context.environment
 
+    tracker = buildtracking.get_tracker()
+    if tracker is None:
+        params = None
+    else:
+        # Include the option values since templates use them to pass
+        # values to subtemplates (e.g. computed from a contest's
+        # results), whose inputs are recorded only for the template
+        # passing them.
+        options_hash = buildtracking.hash_json(utils.get_template_options(env))
+        params = tracker.make_params(template=template_name, options=options_hash)
+        if tracker.reuse_output(output_path, params=params):
+            return
+
+    scheduler = get_render_scheduler(env)
+    if scheduler is not None and scheduler.submit(template_name, output_path,
+                                                  jinja_context=context, params=params):
+        return
+
     utils.process_template(env, template_name=template_name, rel_output_path=output_path,
-        context=context)
+        context=context, params=params)
 
 
 # TODO: turn this into a generator-iterator so not all data needs to be
@@ -220,14 +275,25 @@ def create_tsv_files(env, rel_dir, contests):
     output_dir = utils.get_output_dir(env)
     contests = make_contest_pairs(contests)
 
-    yield from tsvwriting.make_tsv_directory(output_dir, rel_dir, contests)
+    tracker = buildtracking.get_tracker()
+    for rel_path in tsvwriting.make_tsv_directory(output_dir, rel_dir, contests):
+        if tracker is not None:
+            # The files are created again whenever the output creating
+            # them is, so they aren't tracked separately.
+            tracker.record_file(rel_path)
+
+        yield rel_path
 
 
-def create_file(do_create, rel_path, contests, type_name, ext, env, translate=None):
+def create_file(do_create, rel_path, contests, type_name, ext, env, translate=None,
+    params=None):
     """
     Create a file of contest data using the given function, and return
     a Path object.
 
+    If there is an active build tracker and the file is unchanged since
+    the previous build, the previous file is used instead.
+
     Args:
       do_create: a function with signature create(output_path, contests)
         that creates the file.
@@ -238,15 +304,26 @@ def create_file(do_create, rel_path, contests, type_name, ext, env, translate=No
       type_name: the name of the file type, for logging purposes.
       ext: the file extension to use, including the leading dot.
       env: a Jinja2 Environment object.
+      params: an optional dict of any other values the file's contents
+        depend on, for the build tracker.
     """
     rel_path = Path(rel_path)
     # Add the suffix.
     rel_path = rel_path.with_suffix(ext)
     output_path = utils.get_output_path(env, rel_path)
 
-    contests = make_contest_pairs(contests, translate=translate)
+    tracker = buildtracking.get_tracker()
+    if tracker is None:
+        tracking = utils.no_op_context()
+    else:
+        params = tracker.make_params(type=type_name, **(params or {}))
+        if tracker.reuse_output(rel_path, params=params):
+            return rel_path
+        tracking = tracker.tracking_output(rel_path, params=params)
 
-    do_create(output_path, contests=contests)
+    with tracking:
+        contests = make_contest_pairs(contests, translate=translate)
+        do_create(output_path, contests=contests)
 
     return rel_path
 
@@ -311,8 +388,10 @@ def create_pdf(env, rel_path, contests, title=None, translate=None):
 
     do_create = functools.partial(pdfwriter.make_pdf, title=title, deterministic=deterministic)
 
+    params = dict(title=title, deterministic=deterministic)
     rel_path = create_file(do_create, rel_path=rel_path, contests=contests,
-                        type_name='PDF', ext='.pdf', env=env, translate=translate)
+                        type_name='PDF', ext='.pdf', env=env, translate=translate,
+                        params=params)
 
     return rel_path
 
@@ -384,7 +463,7 @@ def get_attrs_by_name_list(obj, attr_list, valuemaps=None, expand_list=False):
 
     """
     for from_name, to_name in split_attr_list(attr_list):
-        if type(obj) is dict:
+        if isinstance(obj, dict):
             if from_name not in obj:
                 continue
             v = obj[from_name]
@@ -0,0 +1,78 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Support for generating large, synthetic input data, e.g. for benchmarks.
+"""
+
+import json
+from pathlib import Path
+
+import orr.utils as utils
+
+
+SOURCE_INPUT_DIR = Path('sampledata') / 'test-minimal'
+
+
+def make_i18n(text):
+    return {lang: f'{text} ({lang})' for lang in ('en', 'es', 'tl', 'zh')}
+
+
+def make_election_data(area_count, contest_count, choice_count):
+    """
+    Return the data for a synthetic election.json file.
+    """
+    data = utils.read_json(SOURCE_INPUT_DIR / 'election.json')
+
+    areas = [
+        dict(_id=f'PCT{i}', classification='Precinct', name=make_i18n(f'Precinct {i}'),
+             short_name=f'PCT {i}', reporting_group_ids=f'*~TO *~ED *~MV PCT{i}~ED PCT{i}~MV')
+        for i in range(area_count)
+    ]
+    data['areas'] = [dict(_id='*', classification='All', name='All Precincts',
+                          short_name='All Precincts')] + areas
+
+    contests = []
+    for i in range(contest_count):
+        choices = [
+            dict(_id=f'{i}-{j}', ballot_title=make_i18n(f'CANDIDATE {j}'),
+                 ballot_designation=make_i18n('Designation'),
+                 candidate_party=make_i18n('Party Preference: None'))
+            for j in range(choice_count)
+        ]
+        contest = dict(
+            _id=str(i), _type='office', ballot_title=make_i18n(f'CONTEST {i}'),
+            ballot_subtitle=make_i18n(f'DISTRICT {i}'), choices=choices,
+            header_id='HDR05', is_partisan='N', number_elected=1, result_style='EMS',
+            vote_for_msg=make_i18n('Vote for One'), voting_district=f'PCT{i % area_count}',
+            writeins_allowed=1,
+        )
+        contests.append(contest)
+    data['election']['contests'] = contests
+
+    return data
+
+
+def write_election_json(input_dir, data):
+    """
+    Write election.json data to an input directory.
+    """
+    path = Path(input_dir) / 'election.json'
+    path.write_text(json.dumps(data), encoding=utils.UTF8_ENCODING)
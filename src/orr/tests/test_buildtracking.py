@@ -0,0 +1,136 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Test the orr.buildtracking module.
+"""
+
+from datetime import datetime
+from pathlib import Path
+import shutil
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import orr.main as main
+import orr.utils as utils
+
+
+TEST_MINIMAL_INPUT_DIR = Path('sampledata') / 'test-minimal'
+TEST_MINIMAL_TEMPLATE_DIR = Path('templates') / 'test-minimal'
+
+
+def render(input_dir, output_parent, output_dir_name, incremental=True, cache_dir=None):
+    """
+    Render the test-minimal templates, and return the output data.
+    """
+    build_time = datetime(2018, 6, 1, 20, 48, 12)
+    return main.run(input_paths=[input_dir], template_dir=TEST_MINIMAL_TEMPLATE_DIR,
+        extra_template_dirs=[TEST_MINIMAL_TEMPLATE_DIR / 'extra'],
+        output_parent=output_parent, output_dir_name=output_dir_name,
+        build_time=build_time, deterministic=True, cache_dir=cache_dir,
+        incremental=incremental)
+
+
+class BuildTrackerTest(TestCase):
+
+    """
+    Test incremental builds using the BuildTracker class.
+    """
+
+    def check_same_output(self, actual_dir, expected_dir):
+        actual, expected = (utils.directory_sha256sum(Path(dir_path))
+                            for dir_path in (actual_dir, expected_dir))
+        self.assertEqual(actual, expected)
+
+    def test_incremental_builds(self):
+        with TemporaryDirectory() as temp_dir:
+            temp_dir = Path(temp_dir)
+            input_dir = temp_dir / 'input'
+            shutil.copytree(TEST_MINIMAL_INPUT_DIR, input_dir)
+            output_parent = temp_dir / 'output'
+
+            first = render(input_dir, output_parent, 'first')
+            self.assertIn('results-detail/contest-403-en.html', first['rebuilt'])
+
+            # Unchanged outputs are carried forward to a new output directory.
+            second = render(input_dir, output_parent, 'second')
+            self.assertEqual(second['rebuilt'], [])
+            self.check_same_output(second['output_dir'], first['output_dir'])
+
+            # Change the results of contest 403.
+            results_path = input_dir / 'resultdata' / 'results-403.tsv'
+            text = results_path.read_text()
+            results_path.write_text(text.replace('PCT1141\tED\t1047\t235', 'PCT1141\tED\t1047\t236'))
+
+            third = render(input_dir, output_parent, 'third')
+            rebuilt = third['rebuilt']
+            self.assertIn('results-detail/contest-403-en.html', rebuilt)
+            self.assertNotIn('results-detail/contest-598-en.html', rebuilt)
+            self.assertNotIn('results-rcv/contest-598-en.html', rebuilt)
+            self.assertNotIn('tables.css', rebuilt)
+
+            # The output is the same as from a full build.
+            full = render(input_dir, output_parent, 'full', incremental=False,
+                          cache_dir=temp_dir / 'cache')
+            self.check_same_output(third['output_dir'], full['output_dir'])
+
+    def test_incremental_builds__passed_value(self):
+        """
+        Test a subtemplate that uses only a value computed and passed by
+        the template rendering it.
+        """
+        with TemporaryDirectory() as temp_dir:
+            temp_dir = Path(temp_dir)
+            input_dir = temp_dir / 'input'
+            shutil.copytree(TEST_MINIMAL_INPUT_DIR, input_dir)
+            template_dir = temp_dir / 'templates'
+            extra_dir = temp_dir / 'extra'
+            template_dir.mkdir()
+            extra_dir.mkdir()
+            (template_dir / 'index.html').write_text(
+                "{% set contest = election.contests_by_id['403'] %}"
+                "{% set options.registered = contest.summary_results("
+                "contest.results_mapping.result_stat_types[0]) %}"
+                "{% do subtemplate('child.html', 'child.html') %}")
+            (extra_dir / 'child.html').write_text('{{ options.registered }}')
+            output_parent = temp_dir / 'output'
+
+            def render_passed(output_dir_name):
+                data = main.run(input_paths=[input_dir], template_dir=template_dir,
+                    extra_template_dirs=[extra_dir], output_parent=output_parent,
+                    output_dir_name=output_dir_name, incremental=True)
+                output_dir = Path(data['output_dir'])
+                return data, (output_dir / 'child.html').read_text()
+
+            first, first_text = render_passed('first')
+            self.assertIn('child.html', first['rebuilt'])
+
+            second, second_text = render_passed('second')
+            self.assertEqual(second['rebuilt'], [])
+
+            # Change the number of registered voters of contest 403.
+            results_path = input_dir / 'resultdata' / 'results-403.tsv'
+            text = results_path.read_text()
+            results_path.write_text(text.replace('*\tTO\t298938', '*\tTO\t298939'))
+
+            third, third_text = render_passed('third')
+            self.assertIn('child.html', third['rebuilt'])
+            self.assertNotEqual(third_text, first_text)
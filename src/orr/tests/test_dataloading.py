@@ -24,11 +24,24 @@ Test the orr.dataloading module.
 
 import datetime
 import io
+import itertools
+import json
+from pathlib import Path
+import shutil
+from tempfile import TemporaryDirectory
 from textwrap import dedent
 from unittest import TestCase
 
+import numpy as np
+
 import orr.dataloading as dataloading
+from orr.datamodel import RESULTS_STORE_ARRAY, RESULTS_STORE_LIST
 from orr.tsvio import TSVStream
+import orr.utils as utils
+
+
+# The input directory of the sample data used by the end-to-end test.
+TEST_MINIMAL_INPUT_DIR = Path('sampledata') / 'test-minimal'
 
 
 class DataLoadingModuleTest(TestCase):
@@ -64,3 +77,307 @@ class DataLoadingModuleTest(TestCase):
 
         actual = list(dataloading.read_rcv_totals(tsv_stream, iter_rows, rounds=3))
         self.assertEqual(actual, expected)
+
+    def test_make_results_array(self):
+        rows = [['1', '2', '3'], ['40', '50', '60']]
+        actual = dataloading.make_results_array(rows, column_count=3)
+        self.assertEqual(actual.dtype, np.int64)
+        self.assertEqual(actual.tolist(), [[1, 2, 3], [40, 50, 60]])
+
+
+def load_test_election(input_dir=None, results_store=None):
+    """
+    Load and return the Election object for the given input directory,
+    with the contest statuses loaded.
+    """
+    if input_dir is None:
+        input_dir = TEST_MINIMAL_INPUT_DIR
+
+    build_time = datetime.datetime(2018, 6, 1, 20, 48, 12)
+    context = dataloading.load_context(input_dir, build_time=build_time,
+                                       results_store=results_store)
+    election = context['election']
+    election.load_contest_statuses()
+
+    return election
+
+
+class LoaderPlanTest(TestCase):
+
+    """
+    Test the LoaderPlan class.
+    """
+
+    def test_get_loader_plan(self):
+        plan = dataloading.get_loader_plan(dataloading.AreaLoader)
+        self.assertIs(dataloading.get_loader_plan(dataloading.AreaLoader), plan)
+        self.assertTrue(all(type(attr) == dataloading.AutoAttr for attr in plan.auto_attrs))
+        self.assertEqual(plan.auto_attrs[0].data_key, '_id')
+
+    def test_load_object(self):
+        data = {'_id': 'PCT1', 'name': {'en': 'Precinct 1'}, 'is_vbm': 'Y'}
+        area = dataloading.load_object(dataloading.AreaLoader(), data)
+        self.assertEqual((area.id, area.name, area.is_vbm), ('PCT1', {'en': 'Precinct 1'}, True))
+        self.assertIsNone(area.short_name)
+
+    def test_load_object__unrecognized_key(self):
+        data = {'_id': 'PCT1', 'foo': 'bar'}
+        with self.assertRaisesRegex(RuntimeError, r"unrecognized keys for model object .*\['foo'\]"):
+            dataloading.load_object(dataloading.AreaLoader(), data)
+
+    def test_load_object__missing_context_key(self):
+        data = {'_id': 'EMS', 'voting_group_ids': 'TO'}
+        with self.assertRaisesRegex(RuntimeError, 'while processing auto_attr') as cm:
+            dataloading.load_object(dataloading.ResultStyleLoader(), data, context={})
+        self.assertIn("context does not have keys ['voting_groups_by_id']",
+                      str(cm.exception.__context__))
+
+
+class ReportingGroupTableLoadingTest(TestCase):
+
+    def test_tables_are_shared(self):
+        election = load_test_election()
+        contests = list(election.contests)
+        tables = [contest.reporting_group_table for contest in contests]
+        # The last two contests in the sample data have the same voting
+        # district, so they share the same table.
+        self.assertIs(tables[1], tables[2])
+        self.assertIsNot(tables[0], tables[1])
+
+        self.assertIs(contests[0].reporting_groups, tables[0].reporting_groups)
+        self.assertEqual(contests[0].reporting_group_count, 7)
+        self.assertEqual(tables[0].get_index('PCT1141', 'MV'), 4)
+
+
+class CompressedInputTest(TestCase):
+
+    def test_load_compressed_input(self):
+        expected = [(contest.results, contest.rcv_totals)
+                    for contest in load_test_election().contests]
+
+        with TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / 'input'
+            shutil.copytree(TEST_MINIMAL_INPUT_DIR, input_dir)
+            # Compress each input file, using a different format for each.
+            paths = sorted(input_dir.glob('**/*.json')) + sorted(input_dir.glob('**/*.tsv'))
+            suffixes = itertools.cycle(utils.COMPRESSED_OPENERS)
+            for path, suffix in zip(paths, suffixes):
+                compressed_path = path.with_name(path.name + suffix)
+                with utils.COMPRESSED_OPENERS[suffix](compressed_path, mode='wb') as f:
+                    f.write(path.read_bytes())
+                path.unlink()
+
+            election = load_test_election(input_dir)
+            actual = [(contest.results, contest.rcv_totals) for contest in election.contests]
+
+        self.assertEqual(actual, expected)
+
+
+class ResultsStoreTest(TestCase):
+
+    """
+    Test that the list and array results stores give the same results.
+    """
+
+    def load_contests(self, results_store):
+        election = load_test_election(results_store=results_store)
+        dataloading.load_all_results_details(election)
+
+        return list(election.contests)
+
+    def test_results(self):
+        list_contests = self.load_contests(RESULTS_STORE_LIST)
+        array_contests = self.load_contests(RESULTS_STORE_ARRAY)
+
+        for list_contest, array_contest in zip(list_contests, array_contests):
+            with self.subTest(contest=list_contest):
+                self.assertEqual(type(list_contest.results), list)
+                self.assertEqual(array_contest.results.dtype, np.int64)
+                self.assertEqual(array_contest.results.tolist(), list_contest.results)
+                self.assertEqual(array_contest.rcv_totals, list_contest.rcv_totals)
+
+                for idlist in ('CHOICES *', 'RSTot CHOICES'):
+                    self.assertEqual(list(array_contest.detail_rows(idlist)),
+                                     list(list_contest.detail_rows(idlist)))
+
+                for list_choice, array_choice in zip(list_contest.choices, array_contest.choices):
+                    self.assertEqual(array_contest.summary_results(array_choice),
+                                     list_contest.summary_results(list_choice))
+                for stat in list_contest.result_stats:
+                    self.assertEqual(array_contest.summary_results(stat, 'TO MV'),
+                                     list_contest.summary_results(stat, 'TO MV'))
+
+
+def make_shard(input_dir, shard_dir, contest_ids, header_ids, area_prefix=''):
+    """
+    Create an input directory containing a subset of the contests and
+    headers in another input directory.
+
+    Args:
+      area_prefix: a prefix to add to the area ids (other than "*"), to
+        keep the shard's area ids distinct from other shards'.
+    """
+    def rename(area_id):
+        return area_id if area_id == '*' else area_prefix + area_id
+
+    data = utils.read_json(input_dir / 'election.json')
+    election_data = data['election']
+    election_data['contests'] = [contest for contest in election_data['contests']
+                                 if contest['_id'] in contest_ids]
+    election_data['headers'] = [header for header in election_data['headers']
+                                if header['_id'] in header_ids]
+    for contest in election_data['contests']:
+        contest['voting_district'] = rename(contest['voting_district'])
+    for area in data['areas']:
+        area['_id'] = rename(area['_id'])
+        if 'reporting_group_ids' in area:
+            pairs = (pair.split('~') for pair in area['reporting_group_ids'].split())
+            area['reporting_group_ids'] = ' '.join(f'{rename(area_id)}~{group_id}'
+                                                   for area_id, group_id in pairs)
+
+    results_dir = shard_dir / 'resultdata'
+    results_dir.mkdir(parents=True)
+    (shard_dir / 'election.json').write_text(json.dumps(data))
+
+    statuses = utils.read_json(input_dir / dataloading.CONTEST_STATUS_PATH)
+    statuses = [status for status in statuses if status['_id'] in contest_ids]
+    (shard_dir / dataloading.CONTEST_STATUS_PATH).write_text(json.dumps(statuses))
+    for contest_id in contest_ids:
+        file_name = f'results-{contest_id}.tsv'
+        shutil.copy(input_dir / 'resultdata' / file_name, results_dir / file_name)
+
+
+class LoadShardedContextTest(TestCase):
+
+    """
+    Test load_sharded_context().
+    """
+
+    def load_election(self, input_dirs, use_threads=False):
+        build_time = datetime.datetime(2018, 6, 1, 20, 48, 12)
+        context = dataloading.load_sharded_context(input_dirs, build_time=build_time,
+                                                   use_threads=use_threads)
+        election = context['election']
+        election.load_contest_statuses()
+
+        return election
+
+    def test_merge(self):
+        expected_election = load_test_election()
+        expected = [(c.id, c.index, c.rcv_rounds, c.results, c.rcv_totals)
+                    for c in expected_election.contests]
+
+        with TemporaryDirectory() as temp_dir:
+            shard_dirs = [Path(temp_dir) / 'shard1', Path(temp_dir) / 'shard2']
+            make_shard(TEST_MINIMAL_INPUT_DIR, shard_dirs[0], contest_ids=['403'],
+                       header_ids=['HDR02', 'HDR05'])
+            make_shard(TEST_MINIMAL_INPUT_DIR, shard_dirs[1], contest_ids=['598', '617'],
+                       header_ids=['HDR06', 'HDR10', 'HDR11', 'HDR13'], area_prefix='B')
+
+            election = self.load_election(shard_dirs)
+            actual = [(c.id, c.index, c.rcv_rounds, c.results, c.rcv_totals)
+                      for c in election.contests]
+            input_dirs = [contest.input_dir for contest in election.contests]
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(input_dirs, [shard_dirs[0], shard_dirs[1], shard_dirs[1]])
+        self.assertEqual(list(election.headers_by_id),
+                         ['HDR02', 'HDR05', 'HDR06', 'HDR10', 'HDR11', 'HDR13'])
+        self.assertTrue(all(contest.election is election for contest in election.contests))
+
+    def test_id_collision(self):
+        with self.assertRaisesRegex(RuntimeError, "area id 'PCT1141' in input directory"):
+            self.load_election([TEST_MINIMAL_INPUT_DIR, TEST_MINIMAL_INPUT_DIR],
+                               use_threads=True)
+
+    def check_shard_error(self, shard_args, expected_regex, edit_data=None):
+        """
+        Check the error loading two shards of the test-minimal input.
+
+        Args:
+          shard_args: a pair of dicts of keyword arguments to pass to
+            make_shard().
+          edit_data: an optional function to call on the second shard's
+            election.json data to change it.
+        """
+        with TemporaryDirectory() as temp_dir:
+            shard_dirs = [Path(temp_dir) / 'shard1', Path(temp_dir) / 'shard2']
+            for shard_dir, kwargs in zip(shard_dirs, shard_args):
+                make_shard(TEST_MINIMAL_INPUT_DIR, shard_dir, **kwargs)
+            if edit_data is not None:
+                path = shard_dirs[1] / 'election.json'
+                data = utils.read_json(path)
+                edit_data(data)
+                path.write_text(json.dumps(data))
+
+            with self.assertRaisesRegex(RuntimeError, expected_regex):
+                self.load_election(shard_dirs)
+
+    def test_id_collision__header(self):
+        shard_args = [
+            dict(contest_ids=['403'], header_ids=['HDR02', 'HDR05']),
+            dict(contest_ids=['598'], header_ids=['HDR02', 'HDR06', 'HDR10'], area_prefix='B'),
+        ]
+        self.check_shard_error(shard_args, "header id 'HDR02' in input directory .*shard2")
+
+    def test_id_collision__contest(self):
+        def edit_data(data):
+            # Remove the contest's header so only the contest collides.
+            data['election']['contests'][0]['header_id'] = ''
+
+        shard_args = [
+            dict(contest_ids=['403'], header_ids=['HDR02', 'HDR05']),
+            dict(contest_ids=['403'], header_ids=[], area_prefix='B'),
+        ]
+        self.check_shard_error(shard_args, edit_data=edit_data,
+                               expected_regex="contest id '403' in input directory .*shard2")
+
+    def test_conflicting_definition(self):
+        """
+        Test shards defining a shared definition differently.
+        """
+        def edit_data(data):
+            voting_group_data = data['voting_groups'][0]
+            self.assertEqual(voting_group_data['_id'], 'TO')
+            voting_group_data['heading'] = 'Grand Total'
+
+        shard_args = [
+            dict(contest_ids=['403'], header_ids=['HDR02', 'HDR05']),
+            dict(contest_ids=['598'], header_ids=['HDR06', 'HDR10'], area_prefix='B'),
+        ]
+        self.check_shard_error(shard_args, edit_data=edit_data, expected_regex=(
+            "voting group id 'TO' in input directory .*shard2 is defined differently"))
+
+
+class PreloadAllResultsTest(TestCase):
+
+    """
+    Test preload_all_results().
+    """
+
+    def test_matches_serial_load(self):
+        expected_election = load_test_election()
+        dataloading.load_all_results_details(expected_election)
+        expected = [(c.results, c.rcv_totals) for c in expected_election.contests]
+
+        for use_threads in (False, True):
+            with self.subTest(use_threads=use_threads):
+                election = load_test_election()
+                dataloading.preload_all_results(election, workers=2, use_threads=use_threads)
+                actual = [(c.results, c.rcv_totals) for c in election.contests]
+                self.assertEqual(actual, expected)
+
+    def test_error_includes_path(self):
+        with TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / 'input'
+            shutil.copytree(TEST_MINIMAL_INPUT_DIR, input_dir)
+            path = input_dir / 'resultdata' / 'results-598.tsv'
+            # Remove the last reporting group.
+            lines = path.read_text().splitlines(keepends=True)
+            path.write_text(''.join(lines[:-1]))
+
+            election = load_test_election(input_dir)
+            with self.assertRaises(RuntimeError) as cm:
+                dataloading.preload_all_results(election, workers=2)
+
+        self.assertEqual(str(cm.exception), f'Mismatched reporting groups in {path}')
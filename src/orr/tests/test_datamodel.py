@@ -23,10 +23,13 @@ Test the orr.datamodel module.
 """
 
 import datetime
+import pickle
 from unittest import TestCase
 
 import orr.datamodel as datamodel
-from orr.datamodel import Area, Choice, Contest, ReportingGroup, VotingGroup
+from orr.datamodel import (Area, Candidate, Choice, Contest, ReportingGroup, ReportingGroupTable,
+    ResultsMapping, ResultStatType, VotingGroup)
+from orr.tests.test_dataloading import load_test_election
 
 
 class DataModelModuleTest(TestCase):
@@ -108,6 +111,25 @@ class ReportingGroupTest(TestCase):
                 self.assertEqual(actual, expected)
 
 
+class ReportingGroupTableTest(TestCase):
+
+    def test_get_index(self):
+        area1, area2 = Area(id_='*'), Area(id_='PCT1')
+        total, mail = VotingGroup(id_='TO'), VotingGroup(id_='MV')
+        groups = [
+            ReportingGroup(area1, total, index=0),
+            ReportingGroup(area1, mail, index=1),
+            ReportingGroup(area2, mail, index=2),
+        ]
+        table = ReportingGroupTable(groups)
+        self.assertEqual(len(table), 3)
+        self.assertEqual(list(table), groups)
+        self.assertEqual(table.get_index('*', 'MV'), 1)
+        self.assertEqual(table.get_index('PCT1', 'MV'), 2)
+        with self.assertRaises(KeyError):
+            table.get_index('PCT1', 'TO')
+
+
 class ChoiceTest(TestCase):
 
     def test_repr(self):
@@ -123,6 +145,54 @@ class ChoiceTest(TestCase):
         actual = repr(choice)
         self.assertEqual(actual, expected)
 
+    def test_candidate_slots(self):
+        """
+        Test that a Candidate has no instance dict and pickles.
+        """
+        candidate = Candidate(contest=None)
+        candidate.id = 'CAND1'
+        candidate.ballot_title = {'en': 'Jane Doe'}
+        candidate.candidate_party = {'en': 'Party Preference: None'}
+        self.assertFalse(hasattr(candidate, '__dict__'))
+        with self.assertRaises(AttributeError):
+            candidate.unknown = 1
+
+        restored = pickle.loads(pickle.dumps(candidate))
+        self.assertEqual(restored.id, 'CAND1')
+        self.assertEqual(restored.candidate_party, {'en': 'Party Preference: None'})
+        self.assertFalse(hasattr(restored, 'ballot_designation'))
+
+
+class ResultsMappingTest(TestCase):
+
+    def make_results_mapping(self, choice_count, selector_cache=None):
+        stats = []
+        for stat_id in ('RSTot', 'RSUnd'):
+            stat = ResultStatType()
+            stat.id = stat_id
+            stats.append(stat)
+
+        return ResultsMapping(stats, choice_count=choice_count, selector_cache=selector_cache)
+
+    def test_get_index_array_by_id_list(self):
+        selector_cache = {}
+        mapping1 = self.make_results_mapping(3, selector_cache=selector_cache)
+        mapping2 = self.make_results_mapping(3, selector_cache=selector_cache)
+        mapping3 = self.make_results_mapping(2, selector_cache=selector_cache)
+
+        indexes = mapping1.get_index_array_by_id_list('CHOICES RSUnd')
+        self.assertEqual(indexes.tolist(), [2, 3, 4, 1])
+        self.assertFalse(indexes.flags.writeable)
+        # Check that mappings with the same number of choices share arrays.
+        self.assertIs(mapping2.get_index_array_by_id_list('CHOICES RSUnd'), indexes)
+        self.assertEqual(mapping3.get_indexes_by_id_list('CHOICES RSUnd'), [2, 3, 1])
+        self.assertEqual(mapping3.get_indexes_by_id_list(), [0, 1])
+
+    def test_get_index_array_by_id_list__unknown_id(self):
+        mapping = self.make_results_mapping(2)
+        with self.assertRaisesRegex(RuntimeError, r"unknown result stat ids \['RSXyz'\]"):
+            mapping.get_index_array_by_id_list('* RSXyz')
+
 
 class ContestTest(TestCase):
 
@@ -152,3 +222,18 @@ class ContestTest(TestCase):
         ]
         actual = item5.get_new_headers(header_path)
         self.assertEqual(actual, expected)
+
+    def test_get_formatted_rows(self):
+        election = load_test_election()
+        contest = next(election.contests)
+        rows = contest.get_formatted_rows('CHOICES *')
+        self.assertIs(contest.get_formatted_rows('CHOICES *'), rows)
+        self.assertEqual(len(rows), len(contest.results))
+        detail_rows = list(contest.detail_rows('CHOICES *'))
+        self.assertEqual([row[1:] for row in detail_rows], rows)
+
+        # Check that changing the results resets the cache.
+        results = [[1000] * len(row) for row in contest.results]
+        contest.set_results_data(results, contest.rcv_totals)
+        expected = ['1,000'] * contest.results_mapping.result_stat_count
+        self.assertEqual(contest.get_formatted_rows('*')[0], expected)
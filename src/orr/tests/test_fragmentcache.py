@@ -0,0 +1,88 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Test the orr.fragmentcache module.
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import orr.configlib as configlib
+from orr.fragmentcache import FragmentCache
+
+
+TEMPLATE_TEXT = """\
+{% for item in items %}
+{% cache "item", item %}<b>{{ item }}:{{ options.lang }}:{{ counter.append(1) or counter|length }}</b>{% endcache %}
+{% endfor %}
+"""
+
+
+def render(template, lang='en', items=None):
+    """
+    Render the template, and return the text and the number of times
+    the cached block was rendered.
+    """
+    if items is None:
+        items = ['a<', 'b', 'a<']
+    counter = []
+    template.environment.globals['options']['lang'] = lang
+    text = template.render(items=items, counter=counter)
+
+    return (text, len(counter))
+
+
+class FragmentCacheTest(TestCase):
+
+    """
+    Test the FragmentCache class, and the "cache" tag.
+    """
+
+    def test_cache_tag(self):
+        with TemporaryDirectory() as temp_dir:
+            cache_dir = Path(temp_dir) / 'fragments'
+            cache = FragmentCache(cache_dir, namespace='ns1')
+            env = configlib.create_jinja_env(output_dir=temp_dir, fragment_cache=cache)
+            template = env.from_string(TEMPLATE_TEXT)
+
+            # The repeated item is rendered once, and isn't escaped again.
+            expected = '<b>a&lt;:en:1</b><b>b:en:2</b><b>a&lt;:en:1</b>'
+            self.assertEqual(render(template), (expected, 2))
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+            # The language is part of the key.
+            self.assertEqual(render(template, lang='es', items=['b'])[1], 1)
+
+            # A new cache reads the fragments from disk.
+            cache = FragmentCache(cache_dir, namespace='ns1')
+            env.globals['options']['fragment_cache'] = cache
+            self.assertEqual(render(template), (expected, 0))
+            self.assertEqual((cache.hits, cache.disk_hits, cache.misses), (1, 2, 0))
+
+            # A different namespace deletes the other namespace's fragments.
+            cache = FragmentCache(cache_dir, namespace='ns2')
+            self.assertEqual([path.name for path in cache_dir.iterdir()], ['ns2'])
+
+            # Without a cache, the block is rendered each time.
+            env.globals['options']['fragment_cache'] = None
+            self.assertEqual(render(template)[1], 3)
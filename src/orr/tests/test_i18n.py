@@ -0,0 +1,68 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Test the orr.i18n module.
+"""
+
+import pickle
+from unittest import TestCase
+
+from orr.i18n import I18nText, intern_i18n
+
+
+class I18nModuleTest(TestCase):
+
+    """
+    Test the functions in orr.i18n.
+    """
+
+    def test_intern_i18n(self):
+        value1 = intern_i18n({'en': 'Yes', 'es': 'Sí'})
+        # Check that the order of the languages doesn't matter.
+        value2 = intern_i18n({'es': 'Sí', 'en': 'Yes'})
+        self.assertIs(type(value1), I18nText)
+        self.assertIs(value1, value2)
+        self.assertEqual(value1, {'en': 'Yes', 'es': 'Sí'})
+        self.assertIsNot(intern_i18n({'en': 'Yes'}), value1)
+
+        with self.assertRaises(TypeError):
+            value1['en'] = 'No'
+
+    def test_intern_i18n__other_values(self):
+        cases = [
+            'All Precincts',
+            None,
+            {'en': ['not', 'a', 'string']},
+        ]
+        for value in cases:
+            with self.subTest(value=value):
+                self.assertEqual(intern_i18n(value), value)
+
+    def test_get_text(self):
+        value = intern_i18n({'en': 'Yes', 'es': 'Sí'})
+        self.assertEqual(value.get_text('es'), 'Sí')
+        self.assertIsNone(value.get_text('zh'))
+        self.assertIsNone(value.get_text('xx-unknown'))
+
+    def test_pickle(self):
+        value = intern_i18n({'en': 'Yes', 'tl': 'Oo'})
+        restored = pickle.loads(pickle.dumps(value))
+        self.assertIs(restored, value)
@@ -39,3 +39,17 @@ class MainModuleTest(TestCase):
         expected = 'build_20180102_163015'
         actual = main.generate_output_name(dt=dt)
         self.assertEqual(actual, expected)
+
+    def test_parse_args__abbreviations(self):
+        """
+        Test the option abbreviations used in the README and scripts.
+        """
+        ns = main.parse_args(['--input', 'sampledata/test-minimal',
+                              '--extra', 'templates/test-minimal/extra',
+                              '--template', 'templates/test-minimal',
+                              '--output-dir', 'minimal'])
+        self.assertEqual(ns.input_paths, ['sampledata/test-minimal'])
+        self.assertEqual(ns.extra_template_dirs, ['templates/test-minimal/extra'])
+        self.assertEqual(ns.template_dir, 'templates/test-minimal')
+        self.assertEqual(ns.output_dir_name, 'minimal')
+        self.assertIsNone(ns.compiled_template_cache)
@@ -0,0 +1,136 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Test the orr.modelsnapshot module.
+"""
+
+import datetime
+from pathlib import Path
+import shutil
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import orr.dataloading as dataloading
+from orr.datamodel import RESULTS_STORE_ARRAY
+from orr.modelsnapshot import ModelSnapshotCache
+from orr.resultsmanager import ResultsManager
+
+
+TEST_MINIMAL_INPUT_DIR = Path('sampledata') / 'test-minimal'
+
+
+def load_context(input_dir, snapshot_cache, build_time=None, **kwargs):
+    if build_time is None:
+        build_time = datetime.datetime(2018, 6, 1, 20, 48, 12)
+
+    return dataloading.load_context(input_dir, build_time=build_time,
+                                    snapshot_cache=snapshot_cache, **kwargs)
+
+
+def summarize_election(election):
+    """
+    Return a summary of an election, for comparing loaded elections.
+    """
+    election.load_contest_statuses()
+
+    return [(contest.id, [choice.id for choice in contest.choices], contest.results)
+            for contest in election.contests]
+
+
+class ModelSnapshotCacheTest(TestCase):
+
+    """
+    Test the ModelSnapshotCache class.
+    """
+
+    def test_restored_context_matches(self):
+        expected = load_context(TEST_MINIMAL_INPUT_DIR, snapshot_cache=None)
+
+        with TemporaryDirectory() as temp_dir:
+            cache = ModelSnapshotCache(temp_dir, version='1.0')
+            load_context(TEST_MINIMAL_INPUT_DIR, snapshot_cache=cache)
+            build_time = datetime.datetime(2018, 6, 2, 9, 0, 0)
+            manager = ResultsManager(max_bytes=1000)
+            actual = load_context(TEST_MINIMAL_INPUT_DIR, snapshot_cache=cache,
+                                  build_time=build_time, results_store=RESULTS_STORE_ARRAY,
+                                  results_manager=manager)
+
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(sorted(actual), sorted(expected))
+        self.assertEqual(list(actual['areas_by_id']), list(expected['areas_by_id']))
+        self.assertEqual(actual['build_time'], build_time)
+
+        # Check that the run options were applied to the restored election.
+        election = actual['election']
+        self.assertEqual(election.results_store, RESULTS_STORE_ARRAY)
+        self.assertIs(election.results_manager, manager)
+        self.assertIsNone(election.results_cache)
+
+        actual_summary = [(contest_id, choice_ids, results.tolist())
+                          for contest_id, choice_ids, results in summarize_election(election)]
+        self.assertEqual(actual_summary, summarize_election(expected['election']))
+
+    def test_invalidation(self):
+        with TemporaryDirectory() as temp_dir:
+            temp_dir = Path(temp_dir)
+            input_dir = temp_dir / 'input'
+            shutil.copytree(TEST_MINIMAL_INPUT_DIR, input_dir)
+            cache_dir = temp_dir / 'cache'
+
+            cache = ModelSnapshotCache(cache_dir, version='1.0')
+            load_context(input_dir, snapshot_cache=cache)
+
+            # A different ORR version doesn't use the snapshot.
+            cache = ModelSnapshotCache(cache_dir, version='1.1')
+            load_context(input_dir, snapshot_cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+            # Nor do changed ORR source files.
+            cache = ModelSnapshotCache(cache_dir, version='1.1', source_hash='changed')
+            load_context(input_dir, snapshot_cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+            # Nor does a changed election.json.
+            path = input_dir / 'election.json'
+            path.write_text(path.read_text() + '\n')
+            load_context(input_dir, snapshot_cache=cache)
+            load_context(input_dir, snapshot_cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_source_changed_while_loading(self):
+        """
+        Test that a context loaded from an election.json that then changed
+        isn't served for the newer contents.
+        """
+        with TemporaryDirectory() as temp_dir:
+            temp_dir = Path(temp_dir)
+            path = temp_dir / 'election.json'
+            path.write_text('{}')
+            key = ModelSnapshotCache(temp_dir / 'cache', version='1.0').make_key(path)
+            # Simulate the file being rewritten while the model is loaded.
+            path.write_text('{"languages": []}')
+
+            cache = ModelSnapshotCache(temp_dir / 'cache', version='1.0')
+            cache.store(path, key=key, context=dict(languages=None))
+            self.assertIsNone(cache.load(path, key=cache.make_key(path)))
+
+            cache.store(path, key=cache.make_key(path), context=dict(languages=[]))
+            self.assertEqual(cache.load(path, key=cache.make_key(path)), dict(languages=[]))
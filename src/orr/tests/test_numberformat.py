@@ -0,0 +1,65 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Test the orr.numberformat module.
+"""
+
+from unittest import TestCase
+
+import numpy as np
+
+from orr.numberformat import NumberFormatter
+
+
+class NumberFormatterTest(TestCase):
+
+    def test_format_number(self):
+        cases = [
+            ('en_US', 1000, '1,000'),
+            ('en_US', 1234.5678, '1,234.57'),
+            # Test a locale where the thousands separator is a period.
+            ('de_DE', 1000, '1.000'),
+            ('de_DE', 1234.5678, '1.234,57'),
+            # Test a locale whose digit groups aren't all threes.
+            ('hi_IN', 1234567, '12,34,567'),
+        ]
+        for locale_name, num, expected in cases:
+            with self.subTest(locale_name=locale_name, num=num):
+                formatter = NumberFormatter(locale_name)
+                self.assertEqual(formatter.format_number(num), expected)
+
+    def test_format_rows(self):
+        formatter = NumberFormatter('de_DE')
+        rows = np.array([[0, 1000], [25, 1234567]])
+        expected = [['0', '1.000'], ['25', '1.234.567']]
+        self.assertEqual(formatter.format_rows(rows), expected)
+        self.assertEqual(formatter.format_row([None, 1000]), ['', '1.000'])
+
+    def test_format_percent(self):
+        cases = [
+            ('en_US', 5.7777, '5.78%'),
+            ('de_DE', 5.7777, '5,78\xa0%'),
+        ]
+        for locale_name, percent, expected in cases:
+            with self.subTest(locale_name=locale_name):
+                formatter = NumberFormatter(locale_name)
+                self.assertEqual(formatter.format_percent(percent), expected)
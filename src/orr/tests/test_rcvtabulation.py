@@ -0,0 +1,143 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Test the orr.rcvtabulation module.
+"""
+
+import datetime
+from pathlib import Path
+import shutil
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import orr.dataloading as dataloading
+import orr.rcvtabulation as rcvtabulation
+
+
+TEST_MINIMAL_INPUT_DIR = Path('sampledata') / 'test-minimal'
+
+# Ballots for a contest with choices A, B, and C, as pairs
+# (ranks_text, count).
+SAMPLE_BALLOTS = [
+    ('A\tB', 4),
+    ('B', 3),
+    ('C\tB', 2),
+    ('\tC\tA', 1),
+    ('', 1),
+    ('A C\tB', 1),
+]
+
+
+def write_ballots(path, ballots, rank_count=3):
+    ranks_header = '\t'.join(f'rank{n}' for n in range(1, rank_count + 1))
+    lines = [f'ballot_id\t{ranks_header}\n']
+    for ranks_text, count in ballots:
+        lines.extend(f'{len(lines)}\t{ranks_text}\n' for _ in range(count))
+    path.write_text(''.join(lines))
+
+
+class RCVTabulationModuleTest(TestCase):
+
+    """
+    Test the functions in orr.rcvtabulation.
+    """
+
+    def test_tabulate(self):
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / 'ballots.tsv'
+            write_ballots(path, SAMPLE_BALLOTS)
+            ballot_set = rcvtabulation.read_ballots(path, choice_ids=['A', 'B', 'C'])
+
+        self.assertEqual(ballot_set.ballot_count, 12)
+        self.assertEqual(len(ballot_set.counts), len(SAMPLE_BALLOTS))
+
+        rounds = rcvtabulation.tabulate(ballot_set, choice_count=3)
+        # C is eliminated in the tie with B for fewest votes, since C
+        # appears last.  Then B is eliminated in the tie with A.
+        self.assertEqual([rcv_round.votes for rcv_round in rounds], [
+            [4, 3, 3],
+            [5, 5, None],
+            [5, None, None],
+        ])
+        actual = [rcv_round.stats_by_id for rcv_round in rounds]
+        expected = [
+            dict(RSCst=12, RSTot=10, RSUnd=1, RSOvr=1, RSExh=0),
+            dict(RSCst=12, RSTot=10, RSUnd=1, RSOvr=1, RSExh=0),
+            dict(RSCst=12, RSTot=5, RSUnd=1, RSOvr=1, RSExh=5),
+        ]
+        self.assertEqual(actual, expected)
+
+    def test_tabulate__no_ballots(self):
+        """
+        Test tabulating a ballots file with only a header line.
+        """
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / 'ballots.tsv'
+            write_ballots(path, [])
+            ballot_set = rcvtabulation.read_ballots(path, choice_ids=['A', 'B', 'C'])
+
+        self.assertEqual(ballot_set.ballot_count, 0)
+
+        rounds = rcvtabulation.tabulate(ballot_set, choice_count=3)
+        self.assertEqual([rcv_round.votes for rcv_round in rounds], [[0, 0, 0]])
+        self.assertEqual(rounds[0].stats_by_id,
+                         dict(RSCst=0, RSTot=0, RSUnd=0, RSOvr=0, RSExh=0))
+
+    def test_read_ballots__unknown_choice(self):
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / 'ballots.tsv'
+            write_ballots(path, [('A', 1), ('D\tA', 1)])
+            with self.assertRaisesRegex(RuntimeError, r"unknown choice id: 'D' .*line=3"):
+                rcvtabulation.read_ballots(path, choice_ids=['A', 'B'])
+
+    def test_load_contest_status(self):
+        """
+        Test tabulating a contest's RCV rounds when loading the statuses.
+        """
+        with TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / 'input'
+            shutil.copytree(TEST_MINIMAL_INPUT_DIR, input_dir)
+            results_dir = input_dir / 'resultdata'
+            # Remove the precomputed RCV rows from the results file.
+            results_path = results_dir / 'results-598.tsv'
+            lines = results_path.read_text().splitlines(keepends=True)
+            results_path.write_text(''.join(line for line in lines
+                                            if not line.startswith('RCV')))
+            ballots = [('3790\t3789', 3), ('4970', 5), ('3786\t4970', 4)]
+            write_ballots(results_dir / 'ballots-598.tsv', ballots)
+
+            build_time = datetime.datetime(2018, 6, 1, 20, 48, 12)
+            context = dataloading.load_context(input_dir, build_time=build_time)
+            election = context['election']
+            election.load_contest_statuses()
+            contest = election.contests_by_id['598']
+
+            # The choices without votes are eliminated together, after the
+            # first round.
+            self.assertEqual(contest.rcv_rounds, 3)
+            rcv_totals = contest.rcv_totals
+
+        # The result stats are RSReg RSCst RSTot RSRej RSUnc RSWri RSUnd
+        # RSOvr RSExh, and the choices are 3790 3789 4969 4970 3786 3788
+        # 3785 3787.
+        self.assertEqual(rcv_totals[-1], (None, 12, 9, None, None, None, 0, 0, 3,
+                                          None, None, None, 5, 4, None, None, None))
+        self.assertEqual(len(contest.results), contest.reporting_group_count)
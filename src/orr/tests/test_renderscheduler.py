@@ -0,0 +1,95 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Test the orr.renderscheduler module.
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from textwrap import dedent
+from unittest import TestCase
+
+import orr.configlib as configlib
+from orr.renderscheduler import RenderScheduler
+import orr.utils as utils
+
+
+INDEX_TEMPLATE = dedent("""\
+{% for lang in ['en', 'es', 'tl', 'zh'] %}
+  {% with %}
+    {% set options.lang = lang %}
+    {% set output_path = "page-{}.html".format(lang) %}
+    {% do subtemplate('page.html', output_path) %}
+    {{ output_path }} {{ output_path|secure_hash }}
+  {% endwith %}
+{% endfor %}
+""")
+
+PAGE_TEMPLATE = '{{ title }}: {{ options.lang }}\n'
+
+
+class RenderSchedulerTest(TestCase):
+
+    def render(self, temp_dir, name, workers, page_template=PAGE_TEMPLATE):
+        """
+        Render the test templates, and return the output directory.
+        """
+        template_dir = Path(temp_dir) / 'templates'
+        template_dir.mkdir(exist_ok=True)
+        (template_dir / 'index.html').write_text(INDEX_TEMPLATE)
+        (template_dir / 'page.html').write_text(page_template)
+
+        output_dir = Path(temp_dir) / name
+        output_dir.mkdir()
+        env = configlib.create_jinja_env(output_dir, template_dirs=[template_dir])
+        context = dict(title='Test')
+        if workers:
+            scheduler = RenderScheduler(env, context=context, workers=workers)
+            env.globals['options']['render_scheduler'] = scheduler
+        try:
+            utils.process_template(env, template_name='index.html',
+                rel_output_path='index.html', context=context)
+        finally:
+            if workers:
+                scheduler.shutdown()
+
+        return output_dir
+
+    def test_render(self):
+        """
+        Test that rendering in parallel gives the same output.
+        """
+        with TemporaryDirectory() as temp_dir:
+            serial_dir = self.render(temp_dir, 'serial', workers=None)
+            parallel_dir = self.render(temp_dir, 'parallel', workers=2)
+            expected = {path.name: path.read_text() for path in serial_dir.iterdir()}
+            actual = {path.name: path.read_text() for path in parallel_dir.iterdir()}
+
+        self.assertEqual(len(actual), 5)
+        self.assertEqual(actual['page-es.html'], 'Test: es\n')
+        self.assertEqual(actual, expected)
+
+    def test_render__error(self):
+        with TemporaryDirectory() as temp_dir:
+            with self.assertRaisesRegex(RuntimeError, 'error rendering template page.html'):
+                self.render(temp_dir, 'parallel', workers=2,
+                            page_template='{{ missing.attr }}')
@@ -0,0 +1,156 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Test the orr.resultscache module.
+"""
+
+import datetime
+from pathlib import Path
+import shutil
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+import orr.dataloading as dataloading
+from orr.datamodel import RESULTS_STORE_ARRAY, RESULTS_STORE_LIST
+import orr.resultscache as resultscache
+from orr.resultscache import ResultsCache
+
+
+TEST_MINIMAL_INPUT_DIR = Path('sampledata') / 'test-minimal'
+
+
+def load_contests(input_dir, results_store=None, results_cache=None):
+    """
+    Load all of the contest results, and return the contests as a list.
+    """
+    build_time = datetime.datetime(2018, 6, 1, 20, 48, 12)
+    context = dataloading.load_context(input_dir, build_time=build_time,
+                        results_store=results_store, results_cache=results_cache)
+    election = context['election']
+    election.load_contest_statuses()
+    dataloading.load_all_results_details(election)
+
+    return list(election.contests)
+
+
+class ResultsCacheModuleTest(TestCase):
+
+    """
+    Test the functions in orr.resultscache.
+    """
+
+    def test_encode_rcv_totals(self):
+        rcv_totals = [(10, 5, 3), (10, None, 8)]
+        array = resultscache.encode_rcv_totals(rcv_totals, column_count=3)
+        self.assertEqual(array.shape, (2, 3))
+        actual = resultscache.decode_rcv_totals(array)
+        self.assertEqual(actual, rcv_totals)
+
+
+class ResultsCacheTest(TestCase):
+
+    """
+    Test the ResultsCache class.
+    """
+
+    def check_contests_equal(self, actual_contests, expected_contests):
+        self.assertEqual(len(actual_contests), len(expected_contests))
+        for actual, expected in zip(actual_contests, expected_contests):
+            with self.subTest(contest=expected):
+                actual_results = actual.results
+                if isinstance(actual_results, np.ndarray):
+                    actual_results = actual_results.tolist()
+                self.assertEqual(actual_results, expected.results)
+                self.assertEqual(actual.rcv_totals, expected.rcv_totals)
+
+    def test_cached_and_uncached_loads_match(self):
+        expected = load_contests(TEST_MINIMAL_INPUT_DIR)
+
+        with TemporaryDirectory() as temp_dir:
+            cache = ResultsCache(temp_dir)
+            for results_store in (RESULTS_STORE_LIST, RESULTS_STORE_ARRAY):
+                with self.subTest(results_store=results_store):
+                    # The first load populates the cache, and the second
+                    # load reads from it.
+                    first = load_contests(TEST_MINIMAL_INPUT_DIR, results_store=results_store,
+                                          results_cache=cache)
+                    second = load_contests(TEST_MINIMAL_INPUT_DIR, results_store=results_store,
+                                           results_cache=cache)
+                    self.check_contests_equal(first, expected)
+                    self.check_contests_equal(second, expected)
+
+            self.assertEqual(cache.misses, 3)
+            self.assertEqual(cache.hits, 9)
+            # Check that the array store uses the memory-mapped data.
+            self.assertEqual(type(second[0].results), np.memmap)
+
+    def test_changed_source_invalidates(self):
+        with TemporaryDirectory() as temp_dir:
+            temp_dir = Path(temp_dir)
+            input_dir = temp_dir / 'input'
+            shutil.copytree(TEST_MINIMAL_INPUT_DIR, input_dir)
+            cache = ResultsCache(temp_dir / 'cache')
+
+            load_contests(input_dir, results_cache=cache)
+            # Change a value in the last row, keeping the file size the same.
+            path = input_dir / 'resultdata' / 'results-617.tsv'
+            text = path.read_text()
+            path.write_text(text.replace('\t2211\n', '\t2212\n'))
+
+            contests = load_contests(input_dir, results_cache=cache)
+            self.assertEqual(cache.hits, 2)
+            self.assertEqual(cache.misses, 4)
+            self.assertEqual(contests[2].results[-1][-1], 2212)
+
+    def test_source_changed_while_parsing(self):
+        """
+        Test that results parsed from a file that then changed aren't
+        served for the newer contents.
+        """
+        with TemporaryDirectory() as temp_dir:
+            temp_dir = Path(temp_dir)
+            path = temp_dir / 'results.tsv'
+            path.write_text('old')
+            source_key = resultscache.get_source_key(path)
+            # Simulate the file being appended to while it is parsed.
+            path.write_text('old and new')
+
+            cache = ResultsCache(temp_dir / 'cache')
+            results = np.array([[1, 2]])
+            cache.store(path, source_key=source_key, rcv_rounds=0, results=results,
+                        rcv_totals=[], row_keys=[('*', 'TO')])
+            self.assertIsNone(cache.load(path, rcv_rounds=0))
+
+            cache.store(path, source_key=resultscache.get_source_key(path), rcv_rounds=0,
+                        results=results, rcv_totals=[], row_keys=[('*', 'TO')])
+            cached_results, rcv_totals, row_keys = cache.load(path, rcv_rounds=0)
+            self.assertEqual(cached_results.tolist(), [[1, 2]])
+            self.assertEqual(row_keys, [('*', 'TO')])
+
+    def test_rebuild(self):
+        with TemporaryDirectory() as temp_dir:
+            cache = ResultsCache(temp_dir, rebuild=True)
+            load_contests(TEST_MINIMAL_INPUT_DIR, results_cache=cache)
+            load_contests(TEST_MINIMAL_INPUT_DIR, results_cache=cache)
+            self.assertEqual(cache.hits, 0)
+            self.assertEqual(cache.misses, 6)
@@ -0,0 +1,86 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Test the orr.resultscube module.
+"""
+
+from pathlib import Path
+import shutil
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import orr.dataloading as dataloading
+from orr.datamodel import RESULTS_STORE_ARRAY
+from orr.tests.test_dataloading import TEST_MINIMAL_INPUT_DIR, load_test_election
+
+
+class ResultsCubeTest(TestCase):
+
+    def test_contest_values(self):
+        election = load_test_election(results_store=RESULTS_STORE_ARRAY)
+        cube = election.get_results_cube()
+        self.assertEqual(cube.values.shape[0], len(election.contests_by_id))
+        self.assertEqual(cube.filled.tolist(), [False, False, False])
+
+        # Setting the results fills in the cube.
+        dataloading.preload_all_results(election, workers=2, use_threads=True)
+        self.assertEqual(cube.filled.tolist(), [True, True, True])
+
+        for contest in election.contests:
+            with self.subTest(contest=contest):
+                group_count = len(contest.result_style.voting_groups)
+                expected = contest.results[:group_count].T.tolist()
+                self.assertEqual(cube.get_contest_values(contest).tolist(), expected)
+
+    def test_set_results_data(self):
+        """
+        Test that the cube is updated when a contest's results change.
+        """
+        election = load_test_election(results_store=RESULTS_STORE_ARRAY)
+        contest = next(election.contests)
+        stat = contest.result_stats[0]
+        self.assertNotEqual(contest.summary_results(stat), [])
+
+        results = contest.results + 1
+        contest.set_results_data(results, contest.rcv_totals)
+        expected = results[:len(contest.result_style.voting_groups), 0].tolist()
+        self.assertEqual(contest.summary_results(stat), expected)
+
+    def test_summary_results__lazy(self):
+        """
+        Test that a summary lookup loads only its own contest's results.
+        """
+        with TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / 'input'
+            shutil.copytree(TEST_MINIMAL_INPUT_DIR, input_dir)
+            # A missing results file for another contest shouldn't matter.
+            (input_dir / 'resultdata' / 'results-617.tsv').unlink()
+
+            election = load_test_election(input_dir)
+            contests = list(election.contests)
+            contest = contests[0]
+            actual = contest.summary_results(contest.result_stats[0])
+
+        expected_contest = next(load_test_election().contests)
+        self.assertEqual(actual, expected_contest.summary_results(contest.result_stats[0]))
+        self.assertEqual([other.is_results_loaded for other in contests],
+                         [True, False, False])
@@ -0,0 +1,113 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Test the orr.resultsmanager module.
+"""
+
+import datetime
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+import orr.dataloading as dataloading
+import orr.resultsmanager as resultsmanager
+from orr.resultsmanager import ResultsManager
+
+
+TEST_MINIMAL_INPUT_DIR = Path('sampledata') / 'test-minimal'
+
+
+def make_data(value):
+    """
+    Return a (results, rcv_totals) pair using 80 bytes of array data.
+    """
+    return (np.full((2, 5), value, dtype=np.int64), [])
+
+
+class ResultsManagerModuleTest(TestCase):
+
+    def test_estimate_size(self):
+        results = np.zeros((10, 4), dtype=np.int64)
+        size = resultsmanager.estimate_size(results, rcv_totals=[])
+        # The estimate includes the array data plus the empty list.
+        self.assertGreaterEqual(size, 320)
+        self.assertLess(size, 400)
+
+
+class ResultsManagerTest(TestCase):
+
+    """
+    Test the ResultsManager class.
+    """
+
+    def test_lru_eviction(self):
+        # Allow about two entries at a time.
+        size = resultsmanager.estimate_size(*make_data(0))
+        manager = ResultsManager(max_bytes=2 * size)
+        loads = []
+
+        def load(contest):
+            loads.append(contest)
+            return make_data(contest)
+
+        for contest in (1, 2, 1, 3, 1, 2):
+            data = manager.get(contest, load=load)
+            self.assertEqual(data[0][0][0], contest)
+
+        # Loading 3 evicted 2 (the least recently used), and loading 2
+        # again then evicted 3.
+        self.assertEqual(loads, [1, 2, 3, 2])
+        self.assertEqual((manager.hits, manager.misses, manager.evictions), (2, 4, 2))
+        self.assertEqual(manager.total_bytes, 2 * size)
+        self.assertIn(1, manager)
+        self.assertNotIn(3, manager)
+
+    def test_keeps_most_recent(self):
+        """
+        Test that the most recently used data is kept even if over budget.
+        """
+        manager = ResultsManager(max_bytes=0)
+        manager.put('a', make_data(1))
+        manager.put('b', make_data(2))
+        self.assertNotIn('a', manager)
+        self.assertIn('b', manager)
+        self.assertEqual(manager.evictions, 1)
+
+    def test_election_reloads_evicted(self):
+        build_time = datetime.datetime(2018, 6, 1, 20, 48, 12)
+        context = dataloading.load_context(TEST_MINIMAL_INPUT_DIR, build_time=build_time)
+        election = context['election']
+        election.load_contest_statuses()
+        expected = [(c.results, c.rcv_totals) for c in election.contests]
+
+        manager = ResultsManager(max_bytes=1)
+        context = dataloading.load_context(TEST_MINIMAL_INPUT_DIR, build_time=build_time,
+                                           results_manager=manager)
+        election = context['election']
+        election.load_contest_statuses()
+        for _ in range(2):
+            actual = [(c.results, c.rcv_totals) for c in election.contests]
+            self.assertEqual(actual, expected)
+
+        # Each contest is accessed twice in a row (results then rcv_totals),
+        # and only the most recent contest is kept.
+        self.assertEqual((manager.hits, manager.misses, manager.evictions), (6, 6, 5))
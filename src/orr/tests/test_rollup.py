@@ -0,0 +1,155 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Test the orr.rollup module.
+"""
+
+import json
+from pathlib import Path
+import shutil
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+import orr.rollup as rollup
+from orr.tests.test_dataloading import load_test_election
+
+
+TEST_MINIMAL_INPUT_DIR = Path('sampledata') / 'test-minimal'
+
+
+class RollupModuleTest(TestCase):
+
+    """
+    Test the functions in orr.rollup.
+    """
+
+    def test_make_rollup_plan(self):
+        keys = [('*', 'TO'), ('*', 'ED'), ('P1', 'ED'), ('P1', 'MV'), ('D1', 'TO'),
+                ('P2', 'MV'), ('D2', 'MV')]
+        members_by_area_id = {'D1': {'P2'}, 'D2': {'P3'}}
+        plan = rollup.make_rollup_plan(keys, members_by_area_id=members_by_area_id,
+                                       precinct_ids={'P1', 'P2', 'P3'})
+        self.assertEqual(plan.base_row_count, 3)
+
+        base_results = np.array([[1, 2], [3, 4], [5, 6]])
+        actual = plan.apply(base_results).tolist()
+        expected = [
+            [9, 12],
+            [1, 2],
+            [1, 2],
+            [3, 4],
+            [5, 6],
+            [5, 6],
+            # D2 has no members with base rows.
+            [0, 0],
+        ]
+        self.assertEqual(actual, expected)
+
+    def test_make_rollup_plan__nested(self):
+        """
+        Test a roll-up area with a member that is a roll-up area.
+        """
+        keys = [('D1', 'TO'), ('N1', 'TO'), ('P1', 'TO'), ('P2', 'TO'), ('P3', 'TO')]
+        members_by_area_id = {'D1': {'N1', 'P3'}, 'N1': {'P1', 'P2'}}
+        plan = rollup.make_rollup_plan(keys, members_by_area_id=members_by_area_id,
+                                       precinct_ids={'P1', 'P2', 'P3'})
+        actual = plan.apply(np.array([[1], [2], [4]])).tolist()
+        self.assertEqual(actual, [[7], [3], [1], [2], [4]])
+
+        members_by_area_id['N1'].add('D1')
+        with self.assertRaisesRegex(RuntimeError, 'contains itself: D1 -> N1 -> D1'):
+            rollup.make_rollup_plan(keys, members_by_area_id=members_by_area_id,
+                                    precinct_ids={'P1', 'P2', 'P3'})
+
+    def test_make_rollup_plan__all_precincts(self):
+        """
+        Test that the "*" rows sum only the base rows of precincts.
+        """
+        # As in the test-minimal "0" table, where ASSM17 and NEIG1 have no
+        # declared members.
+        keys = [('*', 'TO'), ('P1', 'ED'), ('P1', 'MV'), ('P2', 'MV'), ('D1', 'TO'),
+                ('N1', 'TO')]
+        plan = rollup.make_rollup_plan(keys, members_by_area_id={},
+                                       precinct_ids={'P1', 'P2'})
+        actual = plan.apply(np.array([[1], [2], [4], [3], [5]])).tolist()
+        self.assertEqual(actual, [[7], [1], [2], [4], [3], [5]])
+
+    def test_make_rollup_plan__no_rollup_areas(self):
+        keys = [('P1', 'ED'), ('P1', 'MV')]
+        self.assertIsNone(rollup.make_rollup_plan(keys, members_by_area_id={},
+                                                  precinct_ids={'P1'}))
+
+    def test_load_base_rows(self):
+        """
+        Test loading a results file containing only the base rows.
+        """
+        with TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / 'input'
+            shutil.copytree(TEST_MINIMAL_INPUT_DIR, input_dir)
+            election_path = input_dir / 'election.json'
+            data = json.loads(election_path.read_text())
+            areas_by_id = {area['_id']: area for area in data['areas']}
+            areas_by_id['PCT7101']['district_ids'] = 'ASSM17'
+            areas_by_id['NEIG1']['consolidated_ids'] = 'PCT1141 PCT7101'
+            election_path.write_text(json.dumps(data))
+
+            results_path = input_dir / 'resultdata' / 'results-617.tsv'
+            lines = results_path.read_text().splitlines(keepends=True)
+            results_path.write_text(''.join(line for line in lines
+                                            if line.startswith(('area_id', 'PCT'))))
+
+            election = load_test_election(input_dir)
+            results = election.contests_by_id['617'].results
+
+        pct1141_ed, pct1141_mv, pct7101_mv = results[3:6]
+        expected = [
+            # *~TO, *~ED and *~MV.
+            [sum(values) for values in zip(pct1141_ed, pct1141_mv, pct7101_mv)],
+            pct1141_ed,
+            [sum(values) for values in zip(pct1141_mv, pct7101_mv)],
+            # ASSM17~TO and NEIG1~TO.
+            pct7101_mv,
+            [sum(values) for values in zip(pct1141_ed, pct1141_mv, pct7101_mv)],
+        ]
+        self.assertEqual(results[:3] + results[6:], expected)
+
+    def test_load_base_row_count__mismatched_keys(self):
+        """
+        Test a results file with as many rows as the base rows, but whose
+        rows aren't the base rows.
+        """
+        with TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / 'input'
+            shutil.copytree(TEST_MINIMAL_INPUT_DIR, input_dir)
+            results_path = input_dir / 'resultdata' / 'results-617.tsv'
+            lines = results_path.read_text().splitlines(keepends=True)
+            # Keep the header line and the first 5 rows, which include
+            # the "*" rows.
+            results_path.write_text(''.join(lines[:6]))
+
+            election = load_test_election(input_dir)
+            contest = election.contests_by_id['617']
+            self.assertEqual(contest.reporting_group_table.rollup_plan.base_row_count, 5)
+            with self.assertRaisesRegex(RuntimeError, 'Mismatched reporting groups'):
+                contest.results
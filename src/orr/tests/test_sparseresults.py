@@ -0,0 +1,109 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Test the orr.sparseresults module.
+"""
+
+from pathlib import Path
+import shutil
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+from orr.datamodel import RESULTS_STORE_ARRAY, RESULTS_STORE_LIST
+import orr.sparseresults as sparseresults
+from orr.sparseresults import SparseResults
+from orr.tests.test_dataloading import load_test_election
+
+
+TEST_MINIMAL_INPUT_DIR = Path('sampledata') / 'test-minimal'
+
+
+class SparseResultsModuleTest(TestCase):
+
+    """
+    Test the functions in orr.sparseresults.
+    """
+
+    def test_maybe_make_sparse(self):
+        array = np.array([[0, 0], [1, 2], [0, 0], [0, 3]])
+        results = sparseresults.maybe_make_sparse(array)
+        self.assertIs(type(results), SparseResults)
+        self.assertEqual(results.row_indexes.tolist(), [1, 3])
+        self.assertEqual(results.tolist(), array.tolist())
+        self.assertEqual(results[3].tolist(), [0, 3])
+        self.assertEqual(results[:3].tolist(), array[:3].tolist())
+        self.assertEqual(results.get_nonzero_mask().tolist(), [False, True, False, True])
+
+        # Check that the results are returned unchanged below the threshold.
+        self.assertIs(sparseresults.maybe_make_sparse(array, threshold=0.75), array)
+
+
+class SparseContestResultsTest(TestCase):
+
+    def load_contest(self, input_dir, results_store):
+        election = load_test_election(input_dir, results_store=results_store)
+
+        return election.contests_by_id['403']
+
+    def check_same_results(self, sparse_contest, list_contest):
+        list_results = list_contest.results
+        sparse_results = sparse_contest.results
+
+        self.assertIs(type(sparse_results), SparseResults)
+        self.assertEqual(sparse_results.tolist(), list_results)
+        self.assertEqual(list(sparse_contest.detail_rows('CHOICES *')),
+                         list(list_contest.detail_rows('CHOICES *')))
+        for stat in list_contest.result_stats:
+            self.assertEqual(sparse_contest.summary_results(stat),
+                             list_contest.summary_results(stat))
+
+        rows = list(sparse_contest.detail_rows('*', skip_zero_rows=True))
+        self.assertEqual([row[0] for row in rows],
+                         ['All Precincts - Total', 'All Precincts - Election Day',
+                          'All Precincts - Vote By Mail'])
+        self.assertEqual(list(list_contest.detail_rows('*', skip_zero_rows=True)), rows)
+
+    def test_sparse_contest(self):
+        """
+        Test that a contest with mostly zero rows gives the same results
+        when stored sparsely.
+        """
+        with TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / 'input'
+            shutil.copytree(TEST_MINIMAL_INPUT_DIR, input_dir)
+            results_path = input_dir / 'resultdata' / 'results-403.tsv'
+            lines = results_path.read_text().splitlines(keepends=True)
+            new_lines = []
+            for line in lines:
+                area_id, subtotal_type, *values = line.rstrip('\n').split('\t')
+                if area_id not in ('area_id', '*'):
+                    values = ['0'] * len(values)
+                new_lines.append('\t'.join([area_id, subtotal_type, *values]) + '\n')
+            results_path.write_text(''.join(new_lines))
+
+            list_contest = self.load_contest(input_dir, results_store=RESULTS_STORE_LIST)
+            sparse_contest = self.load_contest(input_dir, results_store=RESULTS_STORE_ARRAY)
+            # Compare inside the with block since the summary results load
+            # the other contests' results.
+            self.check_same_results(sparse_contest, list_contest)
@@ -0,0 +1,183 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Test the orr.tailing module.
+"""
+
+import json
+from pathlib import Path
+import shutil
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import orr.dataloading as dataloading
+from orr.tailing import ResultsTailer
+from orr.tests.test_dataloading import TEST_MINIMAL_INPUT_DIR, load_test_election
+
+
+class ResultsTailerTest(TestCase):
+
+    """
+    Test the ResultsTailer class.
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.input_dir = Path(temp_dir.name) / 'input'
+        shutil.copytree(TEST_MINIMAL_INPUT_DIR, self.input_dir)
+        self.results_path = self.input_dir / 'resultdata' / 'results-617.tsv'
+
+        # Start with the last two rows of the file missing.
+        self.lines = self.results_path.read_text().splitlines(keepends=True)
+        self.results_path.write_text(''.join(self.lines[:-2]))
+
+        self.election = load_test_election(self.input_dir)
+        self.tailer = ResultsTailer(self.election)
+
+    def get_contest_ids(self, contests):
+        return [contest.id for contest in contests]
+
+    def test_append(self):
+        election, tailer = self.election, self.tailer
+        contest = election.contests_by_id['617']
+        # The first update reads everything, and waits for the rest of
+        # the incomplete file.
+        changed = tailer.update()
+        self.assertEqual(self.get_contest_ids(changed), ['403', '598'])
+        self.assertEqual(tailer.get_incomplete_contests(), [contest])
+        self.assertFalse(contest.is_results_loaded)
+        self.assertEqual((tailer.full_reads, tailer.partial_reads), (3, 0))
+
+        # Append one of the two missing rows.
+        with open(self.results_path, 'a') as f:
+            f.write(self.lines[-2])
+        self.assertEqual(tailer.update(), [])
+        self.assertEqual(tailer.get_incomplete_contests(), [contest])
+        self.assertEqual((tailer.full_reads, tailer.partial_reads), (3, 1))
+
+        with open(self.results_path, 'a') as f:
+            f.write(self.lines[-1])
+        changed = tailer.update()
+        self.assertEqual(self.get_contest_ids(changed), ['617'])
+        self.assertEqual(tailer.get_incomplete_contests(), [])
+        # Only the appended rows were read.
+        self.assertEqual((tailer.full_reads, tailer.partial_reads), (3, 2))
+
+        expected = load_test_election().contests_by_id['617']
+        self.assertEqual(contest.results, expected.results)
+
+        # Nothing changed.
+        self.assertEqual(tailer.update(), [])
+        self.assertEqual((tailer.full_reads, tailer.partial_reads), (3, 2))
+
+    def test_incomplete_rewrite(self):
+        """
+        Test that a contest keeps its results while its rewritten results
+        file is incomplete.
+        """
+        election, tailer = self.election, self.tailer
+        contest = election.contests_by_id['617']
+        self.results_path.write_text(''.join(self.lines))
+        tailer.update()
+        expected = contest.results
+
+        text = ''.join(self.lines).replace('\t2211\n', '\t2212\n')
+        self.results_path.write_text(text[:-20])
+        self.assertEqual(tailer.update(), [])
+        self.assertEqual(contest.results, expected)
+
+        self.results_path.write_text(text)
+        self.assertEqual(self.get_contest_ids(tailer.update()), ['617'])
+        self.assertEqual(contest.results[-1][-1], 2212)
+        self.assertEqual((tailer.full_reads, tailer.partial_reads), (4, 1))
+
+    def test_workers(self):
+        self.results_path.write_text(''.join(self.lines))
+        tailer = ResultsTailer(self.election, workers=2)
+        changed = tailer.update()
+        self.assertEqual(self.get_contest_ids(changed), ['403', '598', '617'])
+        self.assertEqual(tailer.full_reads, 3)
+
+        expected = load_test_election()
+        for contest in self.election.contests:
+            with self.subTest(contest=contest):
+                self.assertEqual(contest.results, expected.contests_by_id[contest.id].results)
+
+    def test_rewrite_and_status_change(self):
+        tailer = self.tailer
+        self.results_path.write_text(''.join(self.lines))
+        changed = tailer.update()
+        self.assertEqual(self.get_contest_ids(changed), ['403', '598', '617'])
+
+        # Rewrite the file with a changed last row.
+        text = ''.join(self.lines).replace('\t2211\n', '\t2212\n')
+        self.results_path.write_text(text)
+        status_path = self.input_dir / dataloading.CONTEST_STATUS_PATH
+        statuses = json.loads(status_path.read_text())
+        statuses[0]['precincts_reporting'] = 1
+        status_path.write_text(json.dumps(statuses))
+
+        changed = tailer.update()
+        self.assertEqual(self.get_contest_ids(changed), ['403', '617'])
+        # The last row read changed, so the file was read from the start.
+        self.assertEqual((tailer.full_reads, tailer.partial_reads), (4, 0))
+        contest = self.election.contests_by_id['617']
+        self.assertEqual(contest.results[-1][-1], 2212)
+
+    def test_partial_line(self):
+        """
+        Test a results file with a line that isn't completely written.
+        """
+        election, tailer = self.election, self.tailer
+        contest = election.contests_by_id['617']
+        # Write all but the end of the last line.
+        text = ''.join(self.lines)
+        self.results_path.write_text(text[:-3])
+        tailer.update()
+        self.assertEqual(tailer.get_incomplete_contests(), [contest])
+
+        self.results_path.write_text(text)
+        changed = tailer.update()
+        self.assertEqual(self.get_contest_ids(changed), ['617'])
+        self.assertEqual((tailer.full_reads, tailer.partial_reads), (3, 1))
+        expected = load_test_election().contests_by_id['617']
+        self.assertEqual(contest.results, expected.results)
+
+        # A partially appended line isn't read.
+        with open(self.results_path, 'a') as f:
+            f.write('PCT9999\tED\t5')
+        self.assertEqual(tailer.update(), [])
+        self.assertEqual(tailer.partial_reads, 2)
+        self.assertEqual(contest.results, expected.results)
+
+    def test_extra_rows(self):
+        """
+        Test appending rows to a complete results file.
+        """
+        tailer = self.tailer
+        self.results_path.write_text(''.join(self.lines))
+        tailer.update()
+
+        with open(self.results_path, 'a') as f:
+            f.write(self.lines[-1])
+        with self.assertRaisesRegex(RuntimeError, 'Mismatched reporting groups'):
+            tailer.update()
@@ -0,0 +1,103 @@
+#
+# Open Source Voting Results Reporter (ORR) - election results report generator
+# Copyright (C) 2018  Chris Jerdonek
+#
+# This file is part of Open Source Voting Results Reporter (ORR).
+#
+# ORR is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+Test the orr.templatecache module.
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import orr.configlib as configlib
+from orr.templatecache import TemplateCache, precompile_templates
+import orr.utils as utils
+
+
+def make_env(template_dir, cache_dir, rebuild=False):
+    """
+    Return a Jinja2 Environment object using a new TemplateCache.
+    """
+    cache = TemplateCache(cache_dir, rebuild=rebuild)
+    return configlib.create_jinja_env(output_dir=cache_dir, template_dirs=[template_dir],
+                                      bytecode_cache=cache)
+
+
+class TemplateCacheTest(TestCase):
+
+    """
+    Test the TemplateCache class.
+    """
+
+    def test_cache(self):
+        with TemporaryDirectory() as temp_dir:
+            temp_dir = Path(temp_dir)
+            template_dir = temp_dir / 'templates'
+            template_dir.mkdir()
+            template_path = template_dir / 'page.html'
+            template_path.write_text('Hello {{ name }}')
+            cache_dir = temp_dir / 'cache'
+
+            env = make_env(template_dir, cache_dir=cache_dir)
+            self.assertEqual(precompile_templates(env), ['page.html'])
+            self.assertEqual((env.bytecode_cache.misses, env.compile_timer.count), (1, 1))
+
+            # A new environment loads the template from the cache.
+            env = make_env(template_dir, cache_dir=cache_dir)
+            template = env.get_template('page.html')
+            self.assertEqual(template.render(name='world'), 'Hello world')
+            self.assertEqual((env.bytecode_cache.hits, env.compile_timer.count), (1, 0))
+
+            # Changing the template invalidates the cached template.
+            template_path.write_text('Goodbye {{ name }}')
+            env = make_env(template_dir, cache_dir=cache_dir)
+            template = env.get_template('page.html')
+            self.assertEqual(template.render(name='world'), 'Goodbye world')
+            self.assertEqual((env.bytecode_cache.misses, env.compile_timer.count), (1, 1))
+
+            # Rebuilding deletes the cache files.
+            env = make_env(template_dir, cache_dir=cache_dir, rebuild=True)
+            self.assertEqual(list(cache_dir.iterdir()), [])
+
+    def test_cache__source_changed(self):
+        """
+        Test that changing ORR's source files invalidates the cache.
+        """
+        with TemporaryDirectory() as temp_dir:
+            temp_dir = Path(temp_dir)
+            template_dir = temp_dir / 'templates'
+            template_dir.mkdir()
+            (template_dir / 'page.html').write_text('Hello {{ name }}')
+            cache_dir = temp_dir / 'cache'
+
+            env = make_env(template_dir, cache_dir=cache_dir)
+            precompile_templates(env)
+
+            source_hash = utils.get_package_source_hash()
+            # Simulate a change to the source files.
+            utils._package_source_hash = 64 * '0'
+            try:
+                env = make_env(template_dir, cache_dir=cache_dir)
+                env.get_template('page.html')
+            finally:
+                utils._package_source_hash = source_hash
+
+            self.assertEqual((env.bytecode_cache.misses, env.compile_timer.count), (1, 1))
@@ -28,6 +28,7 @@ from unittest import TestCase
 
 from jinja2.utils import Namespace
 
+from orr.i18n import intern_i18n
 import orr.templating as templating
 import orr.tests.testhelpers as testhelpers
 
@@ -85,3 +86,15 @@ class TemplatingModuleTest(TestCase):
 
                 actual = templating.format_date_medium(context, day)
                 self.assertEqual(actual, expected)
+
+    def test_to_json__i18n_text(self):
+        """
+        Test an interned i18n value, both as the object and as an
+        attribute value.
+        """
+        i18n_text = intern_i18n({'en': 'Yes', 'es': 'Sí'})
+        actual = templating.to_json(i18n_text, 'en,es=spanish')
+        self.assertEqual(actual, '"en":"Yes","spanish":"Sí"')
+
+        actual = templating.to_json(dict(id='1', name=i18n_text), 'id,name')
+        self.assertEqual(actual, '"id":"1","name":{"en": "Yes", "es": "Sí"}')
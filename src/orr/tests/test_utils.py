@@ -27,12 +27,10 @@ from pathlib import Path
 import sys
 from tempfile import TemporaryDirectory
 from textwrap import dedent
-import unittest
 from unittest import TestCase
 
 import orr.tests.testhelpers as testhelpers
 import orr.utils as utils
-from orr.utils import IN_DOCKER, US_LOCALE
 
 
 class UtilsModuleTest(TestCase):
@@ -67,33 +65,16 @@ class UtilsModuleTest(TestCase):
 
     def test_format_number(self):
         cases = [
-            ((1000, 'C'), '1000'),
-            ((1000, US_LOCALE), '1,000'),
+            (1000, '1,000'),
+            (1234567, '1,234,567'),
+            (0, '0'),
+            (None, ''),
         ]
-        for (num, loc), expected in cases:
-            with self.subTest(num=num, loc=loc):
-                with utils.changing_locale(loc):
-                    actual = utils.format_number(num)
-
+        for num, expected in cases:
+            with self.subTest(num=num):
+                actual = utils.format_number(num)
                 self.assertEqual(actual, expected)
 
-    @unittest.skipUnless(IN_DOCKER, 'not running inside our Docker container')
-    def test_format_number__locale_de_DE(self):
-        """
-        Test a locale where the thousands separator is a period.
-
-        This doesn't work on Mac OS X for some reason.  More generally,
-        it's only guaranteed to work in our Docker container because we're
-        able to configure that environment correctly by installing the
-        needed locale.
-        """
-        num, loc, expected = 1000, 'de_DE.UTF-8', '1.000'
-
-        with utils.changing_locale(loc):
-            actual = utils.format_number(num)
-
-        self.assertEqual(actual, expected)
-
     def test_format_percent(self):
         cases = [
             (0, '0.00%'),
@@ -118,6 +99,31 @@ class UtilsModuleTest(TestCase):
                 actual = utils.strip_trailing_whitespace(text)
                 self.assertEqual(actual, expected)
 
+    def test_iter_stripped_text(self):
+        text = 'abc  \r\ndef \t\n\nghi\r\rjkl  '
+        expected = utils.strip_trailing_whitespace(text)
+        # Test splitting the text at each position, including between
+        # the "\r" and "\n" of a line ending.
+        for index in range(len(text) + 1):
+            chunks = [text[:index], text[index:]]
+            for chunk_chars in (1, 1000):
+                with self.subTest(chunks=chunks, chunk_chars=chunk_chars):
+                    texts = list(utils.iter_stripped_text(chunks, chunk_chars=chunk_chars))
+                    self.assertEqual(''.join(texts), expected)
+
+    def test_iter_stripped_text__long_line(self):
+        """
+        Test that a long line is yielded as it arrives, without splitting
+        words.
+        """
+        words = [f'word{i}' + ' ' * (i % 3) for i in range(1000)]
+        text = ''.join(words)
+        texts = list(utils.iter_stripped_text(words, chunk_chars=100))
+        self.assertEqual(''.join(texts), utils.strip_trailing_whitespace(text))
+        self.assertGreater(len(texts), 50)
+        for text in texts[:-1]:
+            self.assertRegex(text, r'^word.*\s$')
+
     def test_parse_datetime(self):
         cases = [
             ('2018-06-01 20:48:12', datetime(2018, 6, 1, 20, 48, 12)),
@@ -165,6 +171,29 @@ class UtilsModuleTest(TestCase):
             actual = utils.hash_file(path)
             self.assertEqual(actual, expected)
 
+    def test_read_json__compressed(self):
+        with TemporaryDirectory() as temp_dir:
+            for suffix, opener in utils.COMPRESSED_OPENERS.items():
+                with self.subTest(suffix=suffix):
+                    path = Path(temp_dir) / f'data.json{suffix}'
+                    with opener(path, mode='wt', encoding='utf-8') as f:
+                        f.write('{"name": "café"}')
+
+                    actual_path = utils.find_input_path(Path(temp_dir) / 'data.json')
+                    self.assertEqual(actual_path, path)
+                    actual = utils.read_json(actual_path)
+                    self.assertEqual(actual, {'name': 'café'})
+
+                    path.unlink()
+
+    def test_find_input_path__uncompressed_preferred(self):
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / 'data.json'
+            path.write_text('{}')
+            Path(temp_dir, 'data.json.gz').write_bytes(b'')
+
+            self.assertEqual(utils.find_input_path(path), path)
+
     # TODO: also test files inside directories.
     def test_directory_sha256sum(self):
         file_infos = [
@@ -43,7 +43,7 @@ TSV writing capability will be added later.
 
 from typing import Dict, Tuple, List, TextIO
 
-from orr.utils import UTF8_ENCODING
+import orr.utils as utils
 
 
 #--- Constants to map characters
@@ -93,19 +93,26 @@ def split_line(
 
 class TSVStream:
 
-    def __init__(self, stream, sep=None, read_header=True):
+    def __init__(self, stream, sep=None, read_header=True, header=None, line_num=0):
         """
         Args:
           stream: a file-like object.
+          header: the header, as a list of strings, if it was already
+            read.  This is for resuming reading a file partway through,
+            so read_header should be false.
+          line_num: the number of lines already read.
         """
         if sep is None:
             sep = '\t'
+        if header is not None:
+            assert not read_header
 
         self.stream = stream
 
-        self.header = None
-        self.num_columns = 0    # 0 means no column info
-        self.line_num = 0
+        self.header = header
+        # 0 means no column info
+        self.num_columns = 0 if header is None else len(header)
+        self.line_num = line_num
         self.line = None
         self.read_header = read_header
         self.sep = sep
@@ -185,14 +192,16 @@ class TSVReader:
         read) to automatically set the separator, otherwise tab is assumed.
 
         Args:
-          path: the path to open, as a path-like object.
+          path: the path to open, as a path-like object.  If the file
+            is compressed (e.g. with a ".gz" suffix), it is decompressed
+            as it is read.
         """
         self.path = path
         self.sep = sep
         self.read_header = read_header
 
     def __enter__(self):
-        stream = open(self.path, encoding=UTF8_ENCODING)
+        stream = utils.open_input(self.path)
         self.stream = stream
 
         return TSVStream(stream)
@@ -22,12 +22,14 @@
 Simple helper functions.
 """
 
+import bz2
 from contextlib import contextmanager
 from datetime import datetime
+import gzip
 import hashlib
 import json
-import locale
 import logging
+import lzma
 import os
 from pathlib import Path
 import subprocess
@@ -36,29 +38,49 @@ import sys
 import babel.dates
 from jinja2 import Environment
 
+# See the comment on the import of this module in orr.buildtracking.
+from orr import buildtracking
+import orr.numberformat as numberformat
 
-_log = logging.getLogger(__name__)
-
-try:
-    # See the Dockerfile for where we create this module.
-    import orr.in_docker
-except ModuleNotFoundError:
-    IN_DOCKER = False
-else:
-    IN_DOCKER = True
 
+_log = logging.getLogger(__name__)
 
 UTF8_ENCODING = 'utf-8'
-US_LOCALE = 'en_US.UTF-8'
 
 # The buffer size to use when hashing files.
 HASH_BYTES = 2 ** 12  # 4K
+# The approximate number of characters of rendered template output to
+# collect before stripping trailing whitespace and writing it out.
+RENDER_CHUNK_CHARS = 2 ** 16  # 64K
+# The buffer size to use when writing rendered templates.
+RENDER_BUFFER_BYTES = 2 ** 18  # 256K
+
+# The names of the directories in the orr package that don't contain
+# code used when running (see get_package_source_hash()).
+NON_RUNTIME_DIR_NAMES = ('tests', 'testing')
+
+# The value returned by get_package_source_hash(), once computed.
+_package_source_hash = None
 
 # Our options for pretty-printing JSON for increased human readability.
 DEFAULT_JSON_DUMPS_ARGS = dict(sort_keys=True, indent=4, ensure_ascii=False)
 
 SHA256SUMS_FILENAME = 'SHA256SUMS'
 
+# The names of the values in the "options" namespace that are set when
+# creating the Jinja2 Environment (see configlib.create_jinja_env()) or
+# the objects rendering it, rather than by the templates.
+SETTING_OPTION_NAMES = ('output_dir', 'deterministic', 'render_scheduler', 'fragment_cache')
+
+# A dict mapping the file suffix of each supported compression format to
+# the function to use to open such a file.  Each function has the same
+# signature as the built-in open().
+COMPRESSED_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+
 
 def get_output_dir(env):
     """
@@ -73,6 +95,24 @@ def get_output_dir(env):
     return output_dir
 
 
+def get_template_options(env):
+    """
+    Return the values in the "options" namespace that can be set by the
+    templates (e.g. with "{% set options.contest = contest %}"), as a
+    dict.
+
+    Args:
+      env: a Jinja2 Environment object.
+    """
+    options = env.globals['options']
+    # Jinja2's Namespace class doesn't provide a way to iterate over the
+    # values it holds.
+    values = options._Namespace__attrs
+
+    return {name: value for name, value in values.items()
+            if name not in SETTING_OPTION_NAMES}
+
+
 def get_output_path(env, rel_path):
     """
     Return the output path, as a Path object.
@@ -103,46 +143,40 @@ def truncate(obj):
 
 
 @contextmanager
-def changing_cwd(dir_path):
+def no_op_context():
     """
-    Temporarily change the current working directory.
+    A context manager that does nothing.
+
+    This is a stand-in for contextlib.nullcontext(), which requires
+    Python 3.7.
     """
-    initial_cwd = os.getcwd()
-    try:
-        os.chdir(dir_path)
-        yield
-    finally:
-        # Change back.
-        os.chdir(initial_cwd)
+    yield
 
 
 @contextmanager
-def changing_locale(loc):
+def changing_cwd(dir_path):
     """
-    Temporarily change locale.LC_ALL.
+    Temporarily change the current working directory.
     """
+    initial_cwd = os.getcwd()
     try:
-        try:
-            locale.setlocale(locale.LC_ALL, loc)
-        except Exception:
-            raise RuntimeError(f'error while setting locale to: {loc}')
+        os.chdir(dir_path)
         yield
     finally:
         # Change back.
-        locale.resetlocale()
+        os.chdir(initial_cwd)
 
 
 # TODO: rename to format_integer()?
 def format_number(num):
     """
-    Format a number for display using the current locale, e.g.
+    Format a number for display using the default locale (see
+    numberformat.DEFAULT_LOCALE), e.g.
 
     >>> format_number(9999)
     '9,999'
     """
-    # The "n" option adds a locale-aware thousands separator.
-    if num is None: return ''
-    return f'{num:n}'
+    return numberformat.get_formatter().format_number(num)
 
 
 def format_percent(percent):
@@ -152,9 +186,7 @@ def format_percent(percent):
     >>> format_percent(12.4)
     '12.40%'
     """
-    if percent is None:
-        return ''
-    return f'{percent:.2f}%'
+    return numberformat.get_formatter().format_percent(percent)
 
 def format_percent2(num, denom):
     """
@@ -165,12 +197,51 @@ def format_percent2(num, denom):
     else:
         return(format_percent(100 * num/denom))
 
+def find_input_path(path):
+    """
+    Return the path to an input file, allowing for a compressed variant.
+
+    If the path doesn't exist but a compressed variant does (e.g. with
+    ".gz" appended), the path to the compressed variant is returned.
+    Otherwise, the path is returned as is.
+
+    Args:
+      path: a Path object.
+    """
+    if path.exists():
+        return path
+
+    for suffix in COMPRESSED_OPENERS:
+        compressed_path = path.with_name(path.name + suffix)
+        if compressed_path.exists():
+            return compressed_path
+
+    return path
+
+
+def open_input(path):
+    """
+    Open a UTF-8 input file for reading as text.
+
+    If the file name ends in the suffix of a compressed format (see
+    COMPRESSED_OPENERS), the file is decompressed as it is read.
+
+    Args:
+      path: a path-like object.
+    """
+    opener = COMPRESSED_OPENERS.get(Path(path).suffix, open)
+
+    return opener(path, mode='rt', encoding=UTF8_ENCODING)
+
+
 def read_json(filepath):
     """
     Data Loader: Reads the specified json file into a python data structure
+
+    The file can be compressed (see open_input()).
     """
     _log.debug(f'load_json({filepath})')
-    with open(filepath) as f:
+    with open_input(filepath) as f:
         data = json.load(f)
 
     return data
@@ -198,6 +269,148 @@ def strip_trailing_whitespace(text):
     return text
 
 
+# The characters str.splitlines() treats as line breaks.
+_LINE_BREAK_CHARS = '\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029'
+
+
+class _LineStripper:
+
+    """
+    Strips trailing whitespace from the end of each line of text given a
+    piece at a time (see iter_stripped_text()).
+
+    Only the current line's last word and any whitespace after it are
+    held back.  This way a long line is written out as it arrives
+    (without being copied for each piece), and words (e.g. the hash
+    placeholders of renderscheduler) aren't split across the returned
+    strings.
+    """
+
+    def __init__(self):
+        # The pieces of the current line's last word, and of the
+        # whitespace after it, that haven't been returned.
+        self._word = []
+        self._spaces = []
+        # Whether part of the current line has been seen.
+        self._in_line = False
+        # Whether the previous piece ended with "\r", in which case a "\n"
+        # starting the next piece is part of the same line break.
+        self._after_cr = False
+
+    def _add_partial_line(self, text, parts):
+        self._in_line = True
+        core = text.rstrip()
+        if core:
+            # The start of the last word.
+            word_start = len(core) - len(core.rsplit(maxsplit=1)[-1])
+            if word_start:
+                parts.extend(self._word)
+                parts.extend(self._spaces)
+                parts.append(core[:word_start])
+                self._word = [core[word_start:]]
+            elif self._spaces:
+                parts.extend(self._word)
+                parts.extend(self._spaces)
+                self._word = [core]
+            else:
+                self._word.append(core)
+            self._spaces = []
+
+        if len(core) < len(text):
+            self._spaces.append(text[len(core):])
+
+    def _end_line(self, text, parts):
+        rest = text.rstrip()
+        parts.extend(self._word)
+        if rest:
+            parts.extend(self._spaces)
+            parts.append(rest)
+        parts.append('\n')
+
+        self._word = []
+        self._spaces = []
+        self._in_line = False
+
+    def add(self, text):
+        """
+        Add the next piece of text, and return the stripped text that can
+        be written out.
+        """
+        if self._after_cr and text:
+            self._after_cr = False
+            if text.startswith('\n'):
+                text = text[1:]
+
+        if not text:
+            return ''
+
+        parts = []
+        lines = text.splitlines(keepends=True)
+        if lines[-1][-1] in _LINE_BREAK_CHARS:
+            last_line = None
+        else:
+            # Then the last line isn't complete.
+            last_line = lines.pop()
+
+        for line in lines:
+            self._end_line(line, parts)
+        if last_line is not None:
+            self._add_partial_line(last_line, parts)
+
+        self._after_cr = text.endswith('\r')
+
+        return ''.join(parts)
+
+    def finish(self):
+        """
+        Return the stripped text remaining after the last piece.
+        """
+        if not self._in_line:
+            return ''
+
+        parts = []
+        self._end_line('', parts)
+
+        return ''.join(parts)
+
+
+def iter_stripped_text(chunks, chunk_chars=None):
+    """
+    Strip trailing whitespace from the end of each line of text given as
+    an iterable of strings (e.g. from Jinja2's Template.generate()).
+
+    Yields strings whose concatenation equals the return value of
+    strip_trailing_whitespace() for the concatenated chunks.  The yielded
+    strings don't split words (i.e. runs of non-whitespace characters).
+
+    Args:
+      chunks: an iterable of strings.
+      chunk_chars: the approximate number of characters to collect before
+        processing them.  Defaults to RENDER_CHUNK_CHARS.
+    """
+    if chunk_chars is None:
+        chunk_chars = RENDER_CHUNK_CHARS
+
+    stripper = _LineStripper()
+    pending = []
+    pending_chars = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_chars += len(chunk)
+        if pending_chars < chunk_chars:
+            continue
+
+        text = stripper.add(''.join(pending))
+        pending = []
+        pending_chars = 0
+        if text:
+            yield text
+
+    text = stripper.add(''.join(pending)) + stripper.finish()
+    if text:
+        yield text
+
+
 def parse_datetime(dt_string):
     """
     Parse a string in a standard format representing a datetime, and
@@ -240,6 +453,33 @@ def hash_file(path):
     return sha
 
 
+def get_package_source_hash():
+    """
+    Return a SHA-256 hash of the source files of the orr package
+    (excluding the tests), as a hexadecimal string.
+
+    This changes whenever ORR's code changes (e.g. after an upgrade), so
+    it can be used to invalidate data cached by other versions of the
+    code.
+    """
+    global _package_source_hash
+    if _package_source_hash is not None:
+        return _package_source_hash
+
+    package_dir = Path(__file__).parent
+    hasher = hashlib.sha256()
+    for path in sorted(package_dir.rglob('*.py')):
+        rel_path = path.relative_to(package_dir)
+        if any(name in NON_RUNTIME_DIR_NAMES for name in rel_path.parts[:-1]):
+            continue
+        hasher.update(rel_path.as_posix().encode(UTF8_ENCODING) + b'\0')
+        hasher.update(path.read_bytes())
+
+    _package_source_hash = hasher.hexdigest()
+
+    return _package_source_hash
+
+
 # TODO: test this.
 def get_files_recursive(dir_path):
     """
@@ -312,7 +552,7 @@ def directory_sha256sum(dir_path, exclude_paths=None):
 
 
 def process_template(env:Environment, template_name:str, rel_output_path:Path,
-    context:dict=None, test_mode:bool=False):
+    context:dict=None, test_mode:bool=False, params:str=None):
     """
     Write (aka render) a template file to the given relative path.
 
@@ -324,6 +564,9 @@ def process_template(env:Environment, template_name:str, rel_output_path:Path,
       rel_output_path: the output path (relative to the output directory
         configured in the Jinja2 Environment object), or else '-'.
       context: optional context data.
+      params: the parameters of the output for the active build tracker
+        (see buildtracking.BuildTracker.make_params()), if not just the
+        template and language.
     """
     if context is None:
         context = {}
@@ -340,16 +583,43 @@ def process_template(env:Environment, template_name:str, rel_output_path:Path,
     template = env.get_template(template_name)
 
     output_dir = output_path.parent
-    if not output_dir.exists():
-        output_dir.mkdir()
+    # Pass exist_ok=True since worker processes can create the same
+    # directory concurrently.
+    output_dir.mkdir(exist_ok=True)
 
-    rendered = template.render(context)
+    tracker = buildtracking.get_tracker()
+    if tracker is None:
+        tracking = no_op_context()
+    else:
+        if params is None:
+            params = tracker.make_params(template=template_name)
+        tracking = tracker.tracking_output(rel_output_path, params=params,
+                                           template_name=template_name)
 
+    # Render the template a chunk at a time so that large pages don't
+    # need to be held in memory.
     # Strip trailing whitespace as a normalization step to simplify
     # testing.  For example, this way we don't have to check files in
     # to our repository that have trailing whitespace.
-    rendered = strip_trailing_whitespace(rendered)
-    output_path.write_text(rendered)
+    texts = iter_stripped_text(template.generate(context))
+
+    scheduler = env.globals['options'].render_scheduler
+    if scheduler is not None:
+        # Fill in the hashes of any files created by worker processes.
+        # See renderscheduler.RenderScheduler for details.  Placeholders
+        # don't contain whitespace, so they aren't split across texts.
+        texts = (scheduler.resolve_placeholders(text) for text in texts)
+
+    with tracking, open(output_path, 'w', buffering=RENDER_BUFFER_BYTES) as f:
+        try:
+            for text in texts:
+                f.write(text)
+        except BaseException:
+            # Don't leave a partially written file behind.
+            f.close()
+            output_path.unlink()
+            raise
+
     _log.info(f'Created {output_path} from template {template_name}')
 
     return output_path
@@ -241,11 +241,6 @@ def make_table(choice_totals, summary_totals, last_round):
 
 # TODO: remove this when no longer needed.
 if __name__ == '__main__':
-    import locale
-
-    from orr.utils import US_LOCALE
-
-    locale.setlocale(locale.LC_ALL, US_LOCALE)
     logging.basicConfig(level=logging.INFO)
 
     try: